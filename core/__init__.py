@@ -0,0 +1,22 @@
+import typing as t
+import os
+import tempfile
+from pathlib import Path
+
+def cache_directory() -> Path:
+  '''
+  `XDF_CACHE_DIR` environment variable, or the user cache folder.
+  '''
+  return Path(os.environ.get('XDF_CACHE_DIR', Path.home() / '.cache' / 'ecushark'))
+
+def write_cache_file(path: Path, write: t.Callable[[t.IO], t.Any], mode: str = 'w'):
+  path.parent.mkdir(parents = True, exist_ok = True)
+  # write then rename, so concurrent readers never see a partial file
+  descriptor, temp_path = tempfile.mkstemp(dir = path.parent, suffix = '.tmp')
+  try:
+    with os.fdopen(descriptor, mode) as file:
+      write(file)
+    os.replace(temp_path, path)
+  except BaseException:
+    os.remove(temp_path)
+    raise
@@ -9,11 +9,12 @@ from core.equation_parser.transformations.FunctionCallTransformer import Convers
 from core.equation_parser.transformations.Replacer import NumericFunctionTree
 from .Base import (
   Base, CyclicReferenceException, Quantified, Formatted,
-  UnitRegistry, XmlAbstractBaseMeta, xml_type_map, Array, RefersCyclically
+  UnitRegistry, XmlAbstractBaseMeta, xml_type_map, Array, RefersCyclically,
+  compiled_xpath
 )
 from . import Xdf as xdf
 from .EmbeddedData import Embedded
-from .Math import Math, null_accumulator
+from .Math import Math, null_accumulator, equation_trees
 import numpy as np
 from collections import ChainMap
 from lxml import etree as xml
@@ -25,7 +26,7 @@ from ..equation_parser.transformations.FunctionCallTransformer import (
 from ..equation_parser.transformations import Replacer
 import lark
 
-EmbedFormat: ChainMap[int, str] = xml_type_map(
+EmbedFormat: t.Mapping[int, str] = xml_type_map(
   'embed_type'
 )
 
@@ -33,19 +34,22 @@ class AxisFormatted(Formatted):
   '''
   Axes have the addition of an index count (when using manual labeling), or a link reference.
   '''
+  _indexcount = compiled_xpath('./indexcount/text()')
+  _embedinfo = compiled_xpath('./embedinfo')
+
   @property
   def length(self) -> int:
     '''
     Axes set their length, which is also set in the <EMBEDDEDDATA> to render the value. Setter will modify both.
     '''
-    return int(self.xpath('./indexcount/text()')[0])
+    return int(self._indexcount(self)[0])
   
   @property
   def source(self) -> str:
     '''
     Corresponds to `<embedinfo>` XML element - when `@type` is 2 or 3, the link is either a Function or linkable Parameter value.
     '''
-    info = self.xpath('./embedinfo')
+    info = self._embedinfo(self)
     # defaults to manual XML <LABEL>s
     name = EmbedFormat[int(info[0].attrib['type'])] if info else EmbedFormat[0]
     # if no embedinfo element, using the external manual <LABEL>s
@@ -53,6 +57,8 @@ class AxisFormatted(Formatted):
     return name
 
 class EmbeddedAxisMath(Math):
+  provides = frozenset({'CELL', 'INDEX', 'INDEXES'})
+
   @property
   def _Axis(self) -> 'EmbeddedAxis':
     return self.getparent()
@@ -90,6 +96,16 @@ class EmbeddedAxisMath(Math):
       }
     )
 
+  def _evaluate(self, kwargs: t.Dict[str, t.Any]) -> NumericArg:
+    '''
+    Equations calling `CELL`, `INDEX` or `INDEXES` are compiled once, with the calls as arguments - see `Cell.CellForm`. Those calling `CELL` with other than literal arguments are evaluated over their tree, see `EmbeddedAxis.cell_partial`.
+    '''
+    equation = self.attrib['equation']
+    form = equation_trees.cell_form(equation) if equation_trees.shape(equation) else None
+    if form is None:
+      return super()._evaluate(kwargs)
+    return form(self._Axis.memory_map, **kwargs)
+
   def index(self):
     return np.arange(self._Axis.EmbeddedData.shape[0])
 
@@ -153,44 +169,6 @@ class UnbindCell(TypeTransformer[NumericFunctionTree, MaskedFunctionTree]):
   def __default__(self, data, children, meta):
     return MaskedFunctionTree(data, children, meta)
 
-class CellCounter(TypeTransformer[NumericFunctionTree, int]):
-  '''
-  This Transformer counts all instances of the `CELL` function having `precalc = False`, 
-  because having more than one `CELL(idx, precalc=False)` is undefined behavior (UB) and crashes TunerPro.
-  '''
-  count: int
-
-  def __init__(self) -> None:
-    self.count = 0
-    super().__init__(visit_tokens = False)
-
-  def function(self, args):
-    func, func_args = args
-    if func.__name__ == 'cell':
-      # TODO: using __closure__ is kinda dirty and not portable (Cython specific), 
-      # but its the only structured way to get the class who made the cell partial
-      closer = func.__closure__[-1].cell_contents
-      if type(closer) is XYEmbeddedAxis:
-        index, precalc = func_args
-      elif type(closer) is Table.ZAxis:
-        row, col, precalc = func_args
-      else:
-        raise NotImplementedError()
-      
-      if precalc is False:
-        self.count += 1
-      
-      return lark.visitors.Discard
-
-  def transform(self, tree):
-    # do the transformation....
-    self._transform_tree(tree)
-    # ..but return the final count
-    return self.count
-
-  def __default__(self, data, children, meta):
-    return MaskedFunctionTree(data, children, meta)
-
 class CellEquationCalculationError(ValueError):
   '''
   TunerPro `CELL(index: int, precalc: bool)` function does not allow for multiple
@@ -232,6 +210,7 @@ class EmbeddedAxis(Axis, Embedded):
   # embedded Axis provides conversion namespace additions
 
   Math: 'EmbeddedAxisMath' = Base.xpath_synonym('./MATH')
+  one_shot = True
   
   thinker = Evaluator().transform
 
@@ -275,6 +254,7 @@ class EmbeddedAxis(Axis, Embedded):
     # unmasking done by parent, we are only returning the "CELL" part
     return thunk
 
+  # only bound for `CELL` calls with other than literal arguments - others are compiled, see `EmbeddedAxisMath._evaluate`
   def cell_partial(self, initial: npt.NDArray):
     def cell(index: int, precalc: bool):
       '''
@@ -341,7 +321,7 @@ class AxisInterdependence(CyclicReferenceException):
   
   def __str__(self):
         # fancy printing
-    message = f"""In Xdf "{self.xdf._path}",
+    message = f"""In Xdf "{self.xdf._context.path}",
 
 Table axis "{self.cycle.title}".{self.axis.id} refers to itself.
 """
@@ -363,12 +343,13 @@ class AxisLinked(RefersCyclically[AxisInterdependence, Axis, Axis], Axis, ABC, m
     pass
 
   exception = AxisInterdependence
+  _has_link = compiled_xpath(
+    "./XDFTABLE/XDFAXIS[@id='x' or @id='y'][.//embedinfo[@type='3' or @type='2']]"
+  )
   
   @classmethod
   def dependency_graph(cls, xdf):
-    has_link = xdf.xpath(
-      f"./XDFTABLE/XDFAXIS[@id='x' or @id='y'][.//embedinfo[@type='3' or @type='2']]"
-    )
+    has_link = cls._has_link(xdf)
     graph = {
       # XML parent will be table, which must not be circular
       axis.linked: [axis.getparent()]
@@ -388,10 +369,7 @@ class XYFunctionLinkAxis(AxisLinked, Quantified):
   
   @property
   def linked(self) -> Function.Function:
-    function_query = f"""
-      //XDFFUNCTION[@uniqueid='{self.link_id}']
-    """
-    return self.xpath(function_query)[0]
+    return self._xdf.parameter(self.link_id, 'XDFFUNCTION')
 
   @property
   def value(self) -> pint.Quantity:
@@ -407,11 +385,7 @@ class XYTableLinkAxis(AxisLinked, Quantified):
   # they can be linked multiple times, e.g. 
   # linked -> linked -> linked -> label | embedded
   def linked(self) -> Table.Table:
-    table_query = f"""
-      //XDFTABLE[@uniqueid='{self.link_id}']
-    """
-    out = self.xpath(table_query)
-    return out[0]
+    return self._xdf.parameter(self.link_id, 'XDFTABLE')
 
   @property
   def value(self) -> pint.Quantity:
@@ -440,12 +414,14 @@ class XYEmbeddedAxis(QuantifiedEmbeddedAxis):
   pass
 
 class FunctionAxis(QuantifiedEmbeddedAxis):
+  _units = compiled_xpath('./units/text()')
+
   @property
   def unit(self) -> t.Optional[pint.Unit]:
     '''
     E.g. RPM, Quarts, Seconds, Percent, etc.
     '''
-    units: t.List[str] = self.xpath('./units/text()')
+    units: t.List[str] = self._units(self)
     key = units[0] if len(units)  > 0 else None
     invalid = UnitRegistry[None]
     # TODO: throw invalid unit error?
@@ -15,7 +15,12 @@ from pathlib import Path
 import os
 import re
 import graphlib
+import hashlib
+import json
+from .. import cache_directory, write_cache_file
 from . import Xdf as xdf
+if t.TYPE_CHECKING:
+  from . import Context
 from ..equation_parser.transformations.FunctionCallTransformer import FunctionRegistry, FunctionCallTransformer
 
 XmlBase = xml.ElementBase
@@ -48,6 +53,25 @@ class XmlClassMeta(type):
     klass = super().__new__(cls, name, bases, dikt | new_dict)
     return klass
 
+# `element.xpath(str)` compiles its expression on every call - entities instead
+# declare their queries once, at class definition, and evaluate the compiled form.
+xpath_registry: t.Dict[str, xml.XPath] = {}
+
+def compiled_xpath(expression: str) -> xml.XPath:
+  '''
+  Process-wide compiled `XPath` for `expression`, e.g.:
+  ```
+  _unittype = compiled_xpath('./unittype/text()')
+  ...
+  self._unittype(self)
+  ```
+  Dynamic parts are passed as XPath variables rather than formatted in, so each query compiles once - e.g. `compiled_xpath('//*[@uniqueid=$id]')(self, id=...)`.
+  '''
+  compiled = xpath_registry.get(expression)
+  if compiled is None:
+    compiled = xpath_registry[expression] = xml.XPath(expression)
+  return compiled
+
 class Base(XmlBase, metaclass=XmlClassMeta): # type: ignore
   '''
   LXML ElementBase custom base class entities.
@@ -56,8 +80,8 @@ class Base(XmlBase, metaclass=XmlClassMeta): # type: ignore
   - read/write binding to XML structure
   '''
   @staticmethod
-  def __xpath_dispatch(element, xpath_expression, many):
-    result = element.xpath(xpath_expression)
+  def __xpath_dispatch(element, xpath: xml.XPath, many):
+    result = xpath(element)
     if len(result) == 0 and not many:
       return None
     elif len(result) == 1 and not many:
@@ -70,9 +94,10 @@ class Base(XmlBase, metaclass=XmlClassMeta): # type: ignore
     '''
     type-generic binding to lxml element, e.g. Axes -> XDFAXIS
     '''
+    xpath = compiled_xpath(xpath_expression)
     return property(
       # getter
-      lambda self: Base.__xpath_dispatch(self, xpath_expression, many),
+      lambda self: Base.__xpath_dispatch(self, xpath, many),
       # setter
       lambda self, val: setattr(self, '', val)
       # deleter
@@ -94,6 +119,48 @@ class Base(XmlBase, metaclass=XmlClassMeta): # type: ignore
   def __repr__(self):
     return self.getroottree().getpath(self)
 
+T = t.TypeVar('T')
+def context_cached(func: t.Callable[[t.Any], T]) -> property:
+  '''
+  Like `functools.cached_property`, but the value is kept in the document's `Context.SideTable` rather than on the lxml proxy, which lxml may recycle. Entity must be an `XdfRefMixin`.
+  '''
+  name = func.__qualname__
+  @functools.wraps(func)
+  def getter(self) -> T:
+    return self._context.side_table.get(self, name, func)
+  return property(getter)
+
+def definition(element: xml._Element) -> bytes:
+  '''
+  The element as written, with its children - e.g. a `<MATH>` with its equation and `<VAR>`s.
+  '''
+  return xml.tostring(element, with_tail = False)
+
+def edits(entity: t.Any) -> int:
+  '''
+  Edits to the tree of `entity` so far, see `Xdf.edited` - a `context_cached_by` stamp for state derived from it.
+  '''
+  return entity._context.edits
+
+def revision(entity: t.Any) -> t.Tuple[int, int]:
+  '''
+  Edits to the tree, and writes to the binary, of `entity` so far - a `context_cached_by` stamp for state derived from its values.
+  '''
+  context = entity._context
+  return context.edits, context.writes
+
+def context_cached_by(stamp: t.Callable[[t.Any], t.Hashable]) -> t.Callable[[t.Callable[[t.Any], T]], property]:
+  '''
+  Like `context_cached`, but computed again whenever `stamp` of the entity changes - for state derived from XML that may be edited, e.g. an equation grid, stamped by `edits`. Stamps are taken on every read, so must be cheap.
+  '''
+  def decorator(func: t.Callable[[t.Any], T]) -> property:
+    name = func.__qualname__
+    @functools.wraps(func)
+    def getter(self) -> T:
+      return self._context.side_table.get_stamped(self, name, stamp(self), func)
+    return property(getter)
+  return decorator
+
 class XmlAbstractBaseMeta(type(Base), type(ABC)): #type: ignore
   '''
   For Python class weirdness - see [this StackOverFlow answer](https://stackoverflow.com/a/61350480).
@@ -113,11 +180,16 @@ class XmlAbstractBaseMeta(type(Base), type(ABC)): #type: ignore
 
 class XdfRefMixin:
   '''
-  Utility Mixin class that provides the `_xdf` reference to the containing document.
+  Utility Mixin class that provides the `_xdf` reference to the containing document, and its shared `_context`.
   '''
+  @property
+  def _context(self: t.Any) -> Context.DocumentContext:
+    return self.getroottree().parser.context
+
   @property
   def _xdf(self: t.Any) -> xdf.Xdf:
-    return self.xpath("/XDFFORMAT")[0]
+    root = self._context.root
+    return root if root is not None else self.getroottree().getroot()
 
 # stolen from numpy.typing
 ScalarType = t.TypeVar("ScalarType", bound=np.generic, covariant=True)
@@ -139,23 +211,99 @@ class Array(np.ndarray, t.Generic[ScalarType]):
   def __repr__(self):
     return np.array2string(self, max_line_width=np.inf)
 
-# measurements/units singleton instantiated at import-time
+# TunerPro enumerations and units, from the type schema. Reading the schema and
+# defining units is deferred to first use, and its result cached per schema hash
 core_path = Path(__file__).parent.parent
 schemata_path = os.path.join(core_path, 'schemata')
 type_schema_path = 'tunerpro_types.xsd'
-type_schema = xml.parse(os.path.join(schemata_path, type_schema_path))
-namespaces = type_schema.getroot().nsmap
+# bump when `SchemaEnumeration` or the table file layout changes
+TYPE_TABLES_VERSION = 1
 
-def friendly_schemadef_name(el: xml.Element) -> str:
-  return el.xpath("./xs:annotation/xs:appinfo[1]/text()", namespaces=namespaces)[0]
+class SchemaEnumeration(t.NamedTuple):
+  '''
+  `<xs:enumeration>` of a TunerPro type, as plain data.
+  '''
+  # enum key, e.g. unit index - float prefix values are truncated
+  key: int
+  # first `<xs:appinfo>`
+  friendly_name: t.Optional[str]
+  # second `<xs:appinfo>` - newline seperated list of pint definitions, for units and prefixes
+  definitions: t.Optional[t.List[str]]
+
+def read_type_schema(schema_path: str) -> t.Dict[str, t.List[SchemaEnumeration]]:
+  '''
+  Enumerations of every named `<xs:simpleType>` in the type schema.
+  '''
+  schema = xml.parse(schema_path)
+  namespaces = schema.getroot().nsmap
+  def first(el: xml.Element, query: str) -> t.Optional[str]:
+    out = el.xpath(query, namespaces = namespaces)
+    return out[0] if out else None
+  tables = {}
+  for simple_type in schema.xpath("//xs:simpleType[@name]", namespaces = namespaces):
+    entries = []
+    for el in simple_type.xpath(".//xs:enumeration", namespaces = namespaces):
+      base = first(el, "./ancestor::xs:restriction/@base")
+      definitions = first(el, "./xs:annotation/xs:appinfo[2]/text()")
+      entries.append(SchemaEnumeration(
+        key = int(el.attrib['value']) if base == 'xs:integer' else int(float(el.attrib['value'])),
+        friendly_name = first(el, "./xs:annotation/xs:appinfo[1]/text()"),
+        # ...there may be no defs if option is a unitless value like Percent or Duty Cycle
+        definitions = [line.strip() for line in definitions.strip().split("\n")] if definitions else None
+      ))
+    tables[simple_type.attrib['name']] = entries
+  return tables
+
+@functools.cache
+def type_schema_hash() -> str:
+  return hashlib.sha256(
+    str(TYPE_TABLES_VERSION).encode() + Path(schemata_path, type_schema_path).read_bytes()
+  ).hexdigest()
+
+@functools.cache
+def type_tables() -> t.Dict[str, t.List[SchemaEnumeration]]:
+  '''
+  `read_type_schema` of `tunerpro_types.xsd`, kept as JSON in the `cache_directory` - it is only read again when the schema changes.
+  '''
+  cached = cache_directory() / f'types-{type_schema_hash()}.json'
+  try:
+    return {
+      name: [SchemaEnumeration(*entry) for entry in entries]
+      for name, entries in json.loads(cached.read_text()).items()
+    }
+  # missing or unreadable - treat as a miss
+  except (OSError, ValueError, TypeError):
+    pass
+  tables = read_type_schema(os.path.join(schemata_path, type_schema_path))
+  try:
+    write_cache_file(cached, lambda file: json.dump(tables, file))
+  except OSError:
+    # read-only cache folder - keep going uncached
+    pass
+  return tables
 
-def schemadef_index(el: xml.Element) -> int:
-  base = el.xpath("./ancestor::xs:restriction/@base", namespaces = namespaces)[0]
-  if base == 'xs:integer':
-    return int(el.attrib['value'])
-  #elif base == 'xs:float':
-  # convert to integer prefix value
-  return int(float(el.attrib['value']))
+class LazyTypeMap(t.Mapping[int, t.Any]):
+  '''
+  `xml_type_map` result - a `ChainMap` of enum key to value, built on first lookup.
+  '''
+  def __init__(self, build: t.Callable[[], ChainMap[int, t.Any]]):
+    self._build = build
+
+  @functools.cached_property
+  def _map(self) -> ChainMap[int, t.Any]:
+    return self._build()
+
+  def __getitem__(self, key: int) -> t.Any:
+    return self._map[key]
+
+  def __iter__(self) -> t.Iterator[int]:
+    return iter(self._map)
+
+  def __len__(self) -> int:
+    return len(self._map)
+
+  def __repr__(self):
+    return repr(self._map)
 
 class UnitDef(t.NamedTuple):
   friendly_name: str
@@ -164,82 +312,103 @@ class UnitDef(t.NamedTuple):
 def xml_type_map(
   xml_type: str, 
   # for enum key, use index
-  key: t.Callable[[xml.Element], t.Any] = schemadef_index,
+  key: t.Callable[[SchemaEnumeration], t.Any] = lambda entry: entry.key,
   # by default, use friendly name
-  val: t.Callable[[xml.Element], t.Any] = friendly_schemadef_name,
-  extends: t.Iterable[ChainMap[int, t.Any]] = [],
-) -> ChainMap[int, t.Any]:
-  elements = type_schema.xpath(
-    f"//xs:simpleType[@name='{xml_type}']//xs:enumeration", 
-    namespaces=namespaces
-  )
-  # pint unit - key is (index, friendly): unit
-  self_members = {key(el): val(el) for el in elements}
-  return ChainMap(self_members, *extends)
-
-# construct Pint definitions here...
-UnitRegistry = pint.UnitRegistry(
-  # don't use default Pint definitions
-  filename=None,
-  case_sensitive=False
-)
+  val: t.Callable[[SchemaEnumeration], t.Any] = lambda entry: entry.friendly_name,
+  extends: t.Iterable[t.Mapping[int, t.Any]] = [],
+) -> LazyTypeMap:
+  def build() -> ChainMap[int, t.Any]:
+    self_members = {key(entry): val(entry) for entry in type_tables()[xml_type]}
+    return ChainMap(self_members, *extends)
+  return LazyTypeMap(build)
+
 pint_first_def_regex = rf"(?:(?P<alias>@alias) )?(?P<name>\w+)-?.*"
-def pintify(el: xml.Element, unit = True) -> t.Optional[pint.Unit]:
-  # second appinfo - newline seperated list of definitions, to append friendly alias to
-  defs = el.xpath("./xs:annotation/xs:appinfo[2]/text()", namespaces=namespaces)
-  # ...there may be no defs if option is a unitless value like Percent or Duty Cycle
-  if len(defs) > 0:
-    lines = list(map(
-      lambda l: l.strip(),
-      defs[0].strip().split("\n")
-    ))
-    # add friendly alias to last definition, implicity the final def
-    last_def = lines[-1]
-    # ...TODO: INDEX UNIT WITH FRIENDLY NAME, NOT INTEGER
-    # with_friendly = f"{last_def} = {friendly_name}"
-    # lines[-1] = with_friendly
-    # GET PINT UNIT
-    matches = re.search(pint_first_def_regex, last_def)
+def pint_name(entry: SchemaEnumeration) -> t.Optional[str]:
+  '''
+  Name of the unit or prefix an enumeration defines, i.e. that of its last definition.
+  '''
+  if not entry.definitions:
+    return None
+  # ...TODO: INDEX UNIT WITH FRIENDLY NAME, NOT INTEGER
+  matches = re.search(pint_first_def_regex, entry.definitions[-1])
+  if not matches:
+    raise ValueError
+  return matches.group('name')
+
+def unit_definitions() -> t.List[str]:
+  '''
+  Pint definitions of the TunerPro prefixes and units, in order.
+  '''
+  tables = type_tables()
+  lines = []
+  # prefixes first, units use them
+  for entry in tables['unitPrefix'] + tables['unit']:
+    if not entry.definitions:
+      continue
+    matches = re.search(pint_first_def_regex, entry.definitions[-1])
     if not matches:
       raise ValueError
-    groups = matches.groupdict()
-    last_def_name = groups['name']
-    for line in lines:
-      # register module-level definition
-      try:
-        # not an alias - define unit
-        if not groups['alias']:
-          UnitRegistry.define(line)
-      except pint.DefinitionSyntaxError as e:
-        raise e
-    # return tuple if unit, else nothing. index will be integer if unit
-    if unit:
-      try:
-        unit = getattr(UnitRegistry, last_def_name)
-      except pint.UndefinedUnitError as e:
-        raise e
-      return unit
-  return None
+    # not an alias - define unit
+    if not matches.group('alias'):
+      lines.extend(entry.definitions)
+  return lines
+
+class LazyUnitRegistry:
+  '''
+  Pint registry of the TunerPro units and prefixes - the definitions are made on first use.
+
+  They are loaded from a definitions file generated into the `cache_directory`, so pint's own cache of parsed definitions applies, rather than calling `define` per unit.
+  '''
+  @functools.cached_property
+  def _registry(self) -> pint.UnitRegistry:
+    # don't use default Pint definitions
+    options: t.Dict[str, t.Any] = dict(case_sensitive = False)
+    definitions = cache_directory() / f'units-{type_schema_hash()}.txt'
+    try:
+      if not definitions.exists():
+        write_cache_file(definitions, lambda file: file.write('\n'.join(unit_definitions()) + '\n'))
+      return pint.UnitRegistry(
+        filename = str(definitions),
+        cache_folder = cache_directory() / 'pint',
+        **options
+      )
+    # read-only cache folder - define them one by one
+    except OSError:
+      registry = pint.UnitRegistry(filename = None, **options)
+      for line in unit_definitions():
+        registry.define(line)
+      return registry
+
+  def __getattr__(self, name: str) -> t.Any:
+    return getattr(self._registry, name)
+
+  def __getitem__(self, key: t.Any) -> t.Any:
+    return self._registry[key]
+
+  def __contains__(self, key: t.Any) -> bool:
+    return key in self._registry
+
+UnitRegistry = LazyUnitRegistry()
 
 # for tunerpro Unknown/Undefined/External/None to Python None - cast all to None, for Enum alias
-NullOptions: ChainMap[int, t.Tuple[str, None]] = xml_type_map(
+NullOptions: t.Mapping[int, t.Tuple[str, None]] = xml_type_map(
   'null_option',
-  val = lambda el: (friendly_schemadef_name(el), None)
+  val = lambda entry: (entry.friendly_name, None)
 )
-Prefixes: ChainMap[int, t.Tuple[str, None]] = xml_type_map(
+Prefixes: t.Mapping[int, t.Tuple[str, None]] = xml_type_map(
   'unitPrefix',
-  val = lambda el: (friendly_schemadef_name(el), pintify(el, unit=False))
+  val = lambda entry: (entry.friendly_name, None)
 )
 # really, only these two are used
-Measurements: ChainMap[int, str] = xml_type_map(
+Measurements: t.Mapping[int, str] = xml_type_map(
   'data',
   extends = [NullOptions]
 )
-Units: ChainMap[int, UnitDef] = xml_type_map(
+Units: t.Mapping[int, UnitDef] = xml_type_map(
   'unit',
-  val = lambda el: UnitDef(
-    friendly_name=friendly_schemadef_name(el), 
-    unit = pintify(el)
+  val = lambda entry: UnitDef(
+    friendly_name = entry.friendly_name, 
+    unit = getattr(UnitRegistry, name) if (name := pint_name(entry)) else None
   ),
   extends = [NullOptions]
 )
@@ -251,12 +420,15 @@ class Quantified(Base):
   '''
   Provides `data_type` and `unit_type` properties, e.g. vehicle speed in kilometers per second.
   '''
+  _datatype = compiled_xpath('./datatype/text()')
+  _unittype = compiled_xpath('./unittype/text()')
+
   @property
   def data_type(self) -> t.Optional[str]:
     '''
     E.g. Engine Speed, Exhaust Temp, Fuel Trim.
     '''
-    index = int(self.xpath('./datatype/text()')[0])
+    index = int(self._datatype(self)[0])
     return Measurements[index]
 
   @property
@@ -264,7 +436,7 @@ class Quantified(Base):
     '''
     E.g. RPM, Quarts, Seconds, Percent, etc.
     '''
-    index = int(self.xpath('./unittype/text()')[0])
+    index = int(self._unittype(self)[0])
     definition = Units[index]
     if definition[1] is not None:
       return Units[index].unit # type: ignore
@@ -275,6 +447,8 @@ class ReferenceQuantified(Quantified):
   '''
   `XDFTABLE/XDFAXIS[id = z]` and `XDFFUNCTION` have this key-reference unit, overriding `Quantified.unit`
   '''
+  _units = compiled_xpath('./units/text()')
+
   @property
   def data_type(self) -> t.Optional[str]:
     return None
@@ -284,7 +458,7 @@ class ReferenceQuantified(Quantified):
     '''
     E.g. RPM, Quarts, Seconds, Percent, etc.
     '''
-    units: t.List[str] = self.xpath('./units/text()')
+    units: t.List[str] = self._units(self)
     key = units[0] if len(units) else None
     # default: return 'none' unit
     # TODO: not allow with strict mode, if unit not found?
@@ -293,7 +467,7 @@ class ReferenceQuantified(Quantified):
     except pint.DefinitionSyntaxError:
       return UnitRegistry[None]
 
-FormatOutput: ChainMap[int, str] = xml_type_map(
+FormatOutput: t.Mapping[int, str] = xml_type_map(
   'formatting_output'
 )
 
@@ -306,11 +480,13 @@ class Formatted(Base):
     - `output_type`
       * float, int, hex, or ASCII string.
   '''
+  _outputtype = compiled_xpath('./outputtype/text()')
+  _decimalpl = compiled_xpath('./decimalpl/text()')
 
   # TODO - use some sort of numpy memmap type?
   @property
   def output_type(self) -> str:
-    out = self.xpath('./outputtype/text()')
+    out = self._outputtype(self)
     # if no XML element exists, default to float. `Table.XAxis`, `Table.YAxis`, `Constant` all do this.
     return FormatOutput[(int(out[0]))] if out else FormatOutput[1]
 
@@ -328,7 +504,7 @@ class Formatted(Base):
       - `Constant` - 2
       - `Function` - 2
     '''
-    out = self.xpath('./decimalpl/text()')
+    out = self._decimalpl(self)
     return int(out[0]) if out else self.DEFAULT_DIGITS
 
 X = t.TypeVar('X', covariant=True)
@@ -378,6 +554,18 @@ class RefersCyclically(t.Generic[E, K, V], ABC, XdfRefMixin, metaclass=XmlAbstra
       cycle = set(error.args[1])
       raise cls.exception(xdf, *cycle)
 
+  @classmethod
+  def acyclic_paths(cls, xdf: xdf.Xdf, graph: t.Mapping[str, t.Iterable[str]]) -> bool:
+    '''
+    `acyclic`, over a dependency graph of element paths like the one kept in `Cache.CompiledDefinition`. Only a cycle is resolved back to elements.
+    '''
+    try:
+      out = list(graphlib.TopologicalSorter(graph).static_order())
+      return True
+    except graphlib.CycleError as error:
+      cycle = set(xdf._element_at(path) for path in error.args[1])
+      raise cls.exception(xdf, *cycle)
+
   @classmethod
   def eval_order(cls, xdf: xdf.Xdf) -> t.Iterable[V]:
     graph = cls.dependency_graph(xdf) # type: ignore
@@ -0,0 +1,172 @@
+from __future__ import annotations
+import typing as t
+import os
+import functools
+import pickle
+import hashlib
+import tempfile
+from pathlib import Path
+import lark
+from .. import equation_parser as eq, cache_directory
+from . import Math, Axis, EmbeddedData
+from .Base import core_path, compiled_xpath
+if t.TYPE_CHECKING:
+  from . import Xdf as xdf
+
+# bump when `CompiledDefinition` changes shape, so stale pickles are never loaded
+CACHE_VERSION = 3
+# compiled definitions depend on these as much as on the XDF itself
+cache_dependencies = [
+  os.path.join(core_path, 'schemata', 'xdf_schema.xsd'),
+  eq.grammar_path,
+]
+# content hashes of sources that passed schema validation in this process
+validated: t.Set[str] = set()
+
+_all_math = compiled_xpath('//MATH')
+_all_embedded = compiled_xpath('//EMBEDDEDDATA')
+
+LayoutKey = t.Tuple[t.Tuple[str, str], ...]
+
+def layout_key(embedded_data: EmbeddedData.EmbeddedData) -> LayoutKey:
+  '''
+  Attributes of an `<EMBEDDEDDATA>` - all its layout is made from, so the key follows the element wherever the tree is edited, and changes when the element is.
+  '''
+  return tuple(embedded_data.attrib.items())
+
+class CompiledDefinition(t.NamedTuple):
+  '''
+  Load-time work done on an XDF, in plain data - elements are referred to by their path in the document, e.g. `/XDFFORMAT/XDFTABLE[4]/XDFAXIS[3]/MATH`. Paths only hold until the tree is edited, so what is looked up from elements afterwards is keyed by, or checked against, their content - see `layout_key` and `Math.analysis`.
+
+  Only definitions that passed schema validation are compiled, so a cache hit also stands in for validation.
+  '''
+  digest: str
+  # grammar parse tree per equation string, see `equation_parser.parse`
+  equations: t.Dict[str, lark.Tree]
+  # `<MATH>` path to its analysis, see `Math.analyze`
+  maths: t.Dict[str, Math.MathAnalysis]
+  # `AxisLinked.dependency_graph`
+  axis_graph: t.Dict[str, t.List[str]]
+  # `<EMBEDDEDDATA>` attributes to memory map layout, see `layout_key`
+  layouts: t.Dict[LayoutKey, EmbeddedData.Layout]
+
+  @property
+  def math_graph(self) -> t.Dict[str, t.List[str]]:
+    '''
+    `Math.dependency_graph`, from the analyses of `<MATH>` elements with linked Vars.
+    '''
+    return {
+      path: list(analysis.dependencies)
+      for path, analysis in self.maths.items() if analysis.links
+    }
+
+@functools.cache
+def _salt() -> t.Any:
+  hasher = hashlib.sha256(str(CACHE_VERSION).encode())
+  for dependency in cache_dependencies:
+    hasher.update(Path(dependency).read_bytes())
+  return hasher
+
+def digest(source: bytes) -> str:
+  '''
+  Content hash of an XDF, salted with the cache version, schema and grammar.
+  '''
+  hasher = _salt().copy()
+  hasher.update(source)
+  return hasher.hexdigest()
+
+def is_valid(digest: str, cache: t.Optional[DefinitionCache] = None) -> bool:
+  '''
+  Whether the source with this content hash is known to pass schema validation, in this process or in `cache`.
+  '''
+  if digest in validated:
+    return True
+  if cache is not None and cache.is_valid(digest):
+    validated.add(digest)
+    return True
+  return False
+
+def mark_valid(digest: str, cache: t.Optional[DefinitionCache] = None):
+  validated.add(digest)
+  if cache is not None:
+    cache.mark_valid(digest)
+
+def compile_definition(xdf: xdf.Xdf, digest: str) -> CompiledDefinition:
+  '''
+  Does the load-time passes over a freshly parsed `Xdf` once, keeping their results as plain data.
+  '''
+  tree = xdf.getroottree()
+  path = tree.getpath
+  equations: t.Dict[str, lark.Tree] = {}
+  maths: t.Dict[str, Math.MathAnalysis] = {}
+  # one pass over every `<MATH>` - each distinct equation is parsed and walked once
+  for math in _all_math(xdf):
+    equation = math.attrib['equation']
+    maths[path(math)] = math.analyze(path)
+    equations[equation] = eq.parse(equation)
+  axis_graph = Axis.AxisLinked.dependency_graph(xdf)
+  return CompiledDefinition(
+    digest = digest,
+    equations = equations,
+    maths = maths,
+    axis_graph = {
+      path(linked): [path(dependency) for dependency in dependencies]
+      for linked, dependencies in axis_graph.items()
+    },
+    layouts = {
+      layout_key(embedded): embedded.layout
+      for embedded in _all_embedded(xdf)
+    }
+  )
+
+class DefinitionCache:
+  '''
+  On-disk store of `CompiledDefinition`s, one pickle per XDF content hash, and of which hashes passed schema validation.
+  Reopening a known definition then skips schema validation, equation parsing and the dependency passes.
+  '''
+  directory: Path
+
+  def __init__(self, directory: t.Optional[Path] = None):
+    self.directory = Path(directory) if directory is not None else cache_directory()
+
+  def _path(self, digest: str) -> Path:
+    return self.directory / f'{digest}.pickle'
+
+  def _valid_path(self, digest: str) -> Path:
+    return self.directory / f'{digest}.valid'
+
+  def load(self, digest: str) -> t.Optional[CompiledDefinition]:
+    try:
+      with open(self._path(digest), 'rb') as file:
+        compiled = pickle.load(file)
+    # missing, unreadable or from an incompatible version - treat all as a miss
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+      return None
+    if not isinstance(compiled, CompiledDefinition) or compiled.digest != digest:
+      return None
+    # warm the process-wide parse tree table
+    for equation, parsed in compiled.equations.items():
+      eq.parse_trees.setdefault(equation, parsed)
+    return compiled
+
+  def is_valid(self, digest: str) -> bool:
+    '''
+    Whether the source with this content hash passed schema validation before - lazily loaded definitions are validated, but not compiled.
+    '''
+    return self._valid_path(digest).exists() or self._path(digest).exists()
+
+  def mark_valid(self, digest: str):
+    self.directory.mkdir(parents = True, exist_ok = True)
+    self._valid_path(digest).touch()
+
+  def store(self, compiled: CompiledDefinition):
+    self.directory.mkdir(parents = True, exist_ok = True)
+    # write then rename, so concurrent readers never see a partial pickle
+    descriptor, temp_path = tempfile.mkstemp(dir = self.directory, suffix = '.tmp')
+    try:
+      with os.fdopen(descriptor, 'wb') as file:
+        pickle.dump(compiled, file, protocol = pickle.HIGHEST_PROTOCOL)
+      os.replace(temp_path, self._path(compiled.digest))
+    except BaseException:
+      os.remove(temp_path)
+      raise
@@ -1,23 +1,27 @@
 import typing as t
 from enum import Enum
-from .Base import Base, XdfRefMixin
+from .Base import Base, XdfRefMixin, compiled_xpath
 
 class Category(Base):
   name = Base.xpath_synonym('./@name')
+  _index = compiled_xpath('./@index')
 
   @property
   def index(self) -> int:
-    return int(self.xpath('./@index'))
+    # hex literal, e.g. '0x1'
+    return int(self._index(self)[0], 16)
 
 class Categorized(Base, XdfRefMixin):
   '''
   Exposes XML `<CATEGORYMEM>` reference to Xdf header's `<CATEGORY>`s
   as an opaque list of Enum tokens.
   '''
+  _members = compiled_xpath('./CATEGORYMEM')
+
   # TODO: T.List[CategoryEnum]?
   @property
   def categories(self) -> t.List[Category]:
-    refs = self.xpath('./CATEGORYMEM')
+    refs = self._members(self)
     return list(map(
       lambda el: self._xdf.Categories[int(el.attrib['category']) - 1],
       refs
@@ -16,14 +16,17 @@ class ConstantMath(Math.Math):
 
 # weird TunerPro bullshit - only Constant needs to override min/max with rangehigh/rangelow
 class ConstantClamped(Clamped):
+  _rangelow = Base.compiled_xpath('./rangelow/text()')
+  _rangehigh = Base.compiled_xpath('./rangehigh/text()')
+
   @property
   def min(self) -> t.Optional[float]:
-    out = self.xpath('./rangelow/text()')
+    out = self._rangelow(self)
     return float(out[0]) if out else None
 
   @property
   def max(self) -> t.Optional[float]:
-    out = self.xpath('./rangehigh/text()')
+    out = self._rangehigh(self)
     return float(out[0]) if out else None
 
 class Constant(Parameter, Embedded, Base.Formatted, Base.Quantified, ConstantClamped):
@@ -31,6 +34,7 @@ class Constant(Parameter, Embedded, Base.Formatted, Base.Quantified, ConstantCla
   XDF Constant, a.k.a. Scalar.
   '''
   Math: ConstantMath = Base.Base.xpath_synonym('./MATH')
+  one_shot = True
 
   @property
   def value(self) -> pint.Quantity:
@@ -41,7 +45,7 @@ class Constant(Parameter, Embedded, Base.Formatted, Base.Quantified, ConstantCla
     return Embedded.value.fset(self, value)
   
   def to_embedded(self, x: npt.NDArray):
-    return self.Math.conversion_func(x)
+    return self.Math.inverse_conversion_func(x)
   
   def from_embedded(self, x: npt.NDArray):
-    return self.Math.inverse_conversion_func(x)
+    return self.Math.conversion_func(x)
@@ -0,0 +1,118 @@
+from __future__ import annotations
+import typing as t
+from pathlib import Path
+from collections import Counter
+from lxml import etree as xml
+if t.TYPE_CHECKING:
+  from . import Xdf as xdf
+  from . import Cache, Lazy, Validation
+  from .Parameter import Parameter
+
+T = t.TypeVar('T')
+
+class CacheStats(t.NamedTuple):
+  hits: int
+  misses: int
+  # entries currently held
+  size: int
+
+  @property
+  def hit_rate(self) -> float:
+    total = self.hits + self.misses
+    return self.hits / total if total else 0.0
+
+class SideTable:
+  '''
+  Computed per-element state - memory maps, bounds, conversion functions - for the life of a document, see `Base.context_cached`.
+
+  lxml drops an element's Python proxy when nothing references it, and makes a new one on next access, so state kept on the proxy silently disappears. Entries here are keyed by the proxy itself: holding it keeps lxml from recycling it, so the element keeps coming back as the same proxy, with the same entries.
+  '''
+  _entries: t.Dict[t.Tuple[xml._Element, str], t.Any]
+  hits: t.Counter[str]
+  misses: t.Counter[str]
+
+  def __init__(self):
+    self._entries = {}
+    self.hits = Counter()
+    self.misses = Counter()
+
+  def get(self, element: xml._Element, name: str, compute: t.Callable[[t.Any], T]) -> T:
+    key = (element, name)
+    try:
+      value = self._entries[key]
+      self.hits[name] += 1
+    except KeyError:
+      value = self._entries[key] = compute(element)
+      self.misses[name] += 1
+    return value
+
+  def get_stamped(self, element: xml._Element, name: str, stamp: t.Hashable, compute: t.Callable[[t.Any], T]) -> T:
+    '''
+    As `get`, but computed again whenever `stamp` differs from the one it was computed with - see `Base.context_cached_by`.
+    '''
+    key = (element, name)
+    held = self._entries.get(key)
+    if held is not None and held[0] == stamp:
+      self.hits[name] += 1
+      return held[1]
+    value = compute(element)
+    self._entries[key] = (stamp, value)
+    self.misses[name] += 1
+    return value
+
+  def invalidate(self, element: t.Optional[xml._Element] = None, name: t.Optional[str] = None):
+    '''
+    Drops entries of `element` and/or `name`, or all of them - e.g. after editing an `<EMBEDDEDDATA>` in place.
+    '''
+    self._entries = {
+      (held, held_name): value for (held, held_name), value in self._entries.items()
+      if not (element is None or held is element) or not (name is None or held_name == name)
+    }
+
+  def stats(self) -> t.Dict[str, CacheStats]:
+    sizes = Counter(name for _, name in self._entries)
+    return {
+      name: CacheStats(self.hits[name], self.misses[name], sizes[name])
+      for name in sorted(self.hits.keys() | self.misses.keys())
+    }
+
+class DocumentContext:
+  '''
+  State shared by every entity of one `Xdf` document - the root, the binary, load-time results and indexes.
+  Entities reach it through the parser that built their tree, see `XdfRefMixin._context`, rather than querying the document for it.
+  '''
+  root: t.Optional[xdf.Xdf] = None
+  path: t.Optional[Path] = None
+  binfile: t.Optional[t.BinaryIO] = None
+  compiled: t.Optional[Cache.CompiledDefinition] = None
+  # content hash of the source, and where to store its compiled definition - see `Xdf.check`
+  digest: t.Optional[str] = None
+  cache: t.Optional[Cache.DefinitionCache] = None
+  lazy: t.Optional[Lazy.LazyDefinition] = None
+  # uniqueid to `Parameter` - or to its position under the root, while it is an
+  # unmaterialized stub. see `Xdf.reindex`
+  ids: t.Optional[t.Dict[str, t.Union[int, Parameter]]] = None
+  # `<XDFHEADER>` binary details, see `Xdf._bin_internals`
+  bin_internals: t.Optional[t.Dict[str, t.Any]] = None
+  # schema validation of the source, see `Xdf.validation`
+  validation: t.Optional[Validation.Validation] = None
+  side_table: SideTable
+  # edits to the tree so far - state derived from it is computed again after one, see `Xdf.edited`
+  edits: int = 0
+  # ...and writes to the binary, by `value` or patches
+  writes: int = 0
+
+  def __init__(self):
+    self.side_table = SideTable()
+
+class XdfParser(xml.XMLParser):
+  '''
+  Parser holding the `DocumentContext` of the document it builds - lxml keeps a document's parser for its lifetime, so every element can get back to it in O(1) with `getroottree().parser`.
+
+  One per document, see `Xdf.xdf_parser`.
+  '''
+  context: DocumentContext
+
+  def __init__(self, *args, **kwargs):
+    super().__init__(*args, **kwargs)
+    self.context = DocumentContext()
@@ -2,7 +2,7 @@ from abc import abstractmethod
 import typing as t
 import numpy.typing as npt
 # for entities
-from .Base import ArrayLike, Base, XdfRefMixin, XmlAbstractBaseMeta
+from .Base import ArrayLike, Base, XdfRefMixin, XmlAbstractBaseMeta, context_cached
 # general stuff
 import functools as ft
 import numpy as np
@@ -46,6 +46,18 @@ class TypeFlags(Flag):
   FLOAT = 65536
   COLUMN_MAJOR = 4
 
+class Layout(t.NamedTuple):
+  '''
+  Everything `np.memmap` needs to map an `<EMBEDDEDDATA>` onto the binary. Plain data, so it can be cached with the compiled definition.
+  '''
+  offset: int
+  shape: t.Tuple[int] | t.Tuple[int, int]
+  # numpy dtype string, e.g. '>u2'
+  dtype: str
+  # 'C' for C-style row-major, 'F' for Fortran-style col major 
+  order: str
+  strides: t.Optional[t.Tuple[int] | t.Tuple[int, int]]
+
 class EmbeddedData(Base):
   '''
   Used under Math elements, providing details on parsing internal binary data.
@@ -115,8 +127,8 @@ class EmbeddedData(Base):
       - https://numpy.org/doc/stable/reference/generated/numpy.ndarray.strides.html
       - https://numpy.org/doc/stable/reference/generated/numpy.lib.stride_tricks.as_strided.html
     '''
-    major = int(self.attrib['mmedmajorstridebits']) // 8
-    minor = int(self.attrib['mmedminorstridebits']) // 8
+    major = int(self.attrib.get('mmedmajorstridebits', 0)) // 8
+    minor = int(self.attrib.get('mmedminorstridebits', 0)) // 8
     default = None
     if len(self.shape) == 2:
       #default = (1, 1)
@@ -129,6 +141,17 @@ class EmbeddedData(Base):
     else:
       raise ValueError
 
+  @property
+  def layout(self) -> Layout:
+    return Layout(
+      # see TunerPro docs - base offset not applied here
+      offset = self.address if self.address else 0,
+      shape = self.shape,
+      dtype = np.dtype(self.data_type).str,
+      order = 'F' if TypeFlags.COLUMN_MAJOR in self.type_flags else 'C',
+      strides = self.strides
+    )
+
 def pad_with(vector, pad_width, iaxis, kwargs):
   '''
   Numpy padding utility function. See https://numpy.org/doc/stable/reference/generated/numpy.pad.html.
@@ -264,6 +287,15 @@ class Embedded(XdfRefMixin, metaclass=XmlAbstractBaseMeta):
   '''
   EmbeddedData: EmbeddedData = Base.xpath_synonym('./EMBEDDEDDATA')
   Math: Math = Base.xpath_synonym('./MATH')
+  # `from_embedded` is exactly `Math.conversion_func`, see `batch_from_embedded`
+  one_shot: bool = False
+
+  @property
+  def one_shot_Math(self) -> t.Optional[Math]:
+    '''
+    The `Math` whose conversion `from_embedded` is, if `one_shot` - see `batch_from_embedded`.
+    '''
+    return self.Math if self.one_shot else None
 
   @abstractmethod
   def from_embedded(self, x: npt.NDArray) -> ArrayLike:
@@ -293,28 +325,27 @@ class Embedded(XdfRefMixin, metaclass=XmlAbstractBaseMeta):
   def value(self, value): 
     matrix = value
     min, max = self.logical_bounds
-    out = self.to_embedded(matrix)
     if Embedded.out_of_bounds(matrix, min, max):
-      e = EmbeddedValueError(min, max, matrix)
+      shape = np.shape(matrix)
+      e = EmbeddedValueError(np.broadcast_to(min, shape), np.broadcast_to(max, shape), matrix)
       raise e
     else:
+      out = self.to_embedded(matrix)
       # silently fail, write to map
       # see https://numpy.org/devdocs/reference/generated/numpy.memmap.html
       # this will implicitly truncate floats
       self.memory_map[:] = np.array([out])[:]
+      self._context.writes += 1
       # flush ? 
       #self.memory_map.flush()
 
-  @ft.cached_property
-  def logical_bounds(self):
+  @property
+  def logical_bounds(self) -> t.Tuple[ArrayLike, ArrayLike]:
     '''
-    Logical bounds of this value by its `numpy` data type, to raise `EmbeddedValueError` with and draw UI with
+    Logical bounds of this value by its `numpy` data type, to raise `EmbeddedValueError` with and draw UI with - the range of its conversion over the raw values of the type, see `Math.logical_bounds`.
     '''
-    min, max = map(
-      self.to_embedded,
-      self.memmap_bounds
-    )
-    return min, max
+    bounds = self.Math.logical_bounds
+    return bounds.low, bounds.high
 
   def clip_to_memmap_bounds(self, x: ArrayLike):
     min, max = self.memmap_bounds
@@ -329,24 +360,24 @@ class Embedded(XdfRefMixin, metaclass=XmlAbstractBaseMeta):
     '''
     When writing back 'real' data to memory, there is a "max" value that can be converted back as a practical bound, e.g.
     [int] -> [255] * byte_width
-    [float] -> [1]
+    [float] -> [largest finite float]
     '''
-    dtype_bounds = np.iinfo(self.EmbeddedData.data_type)
+    data_type = np.dtype(self.EmbeddedData.data_type)
+    dtype_bounds = np.finfo(data_type) if data_type.kind == 'f' else np.iinfo(data_type)
     min = np.full(self.EmbeddedData.shape, dtype_bounds.min)
     max = np.full(self.EmbeddedData.shape, dtype_bounds.max)
     return min, max
   
-  @ft.cached_property
+  @context_cached
   def memory_map(self) -> np.memmap:
-    embedded_data = self.EmbeddedData
+    xdf = self._xdf
+    layout = xdf._layout(self.EmbeddedData)
     map = np.memmap(
-      self._xdf._binfile,
-      shape = embedded_data.shape,
-      # see TunerPro docs - base offset not applied here
-      offset = embedded_data.address if embedded_data.address else 0,
-      dtype = embedded_data.data_type,
-      # 'C' for C-style row-major, 'F' for Fortran-style col major 
-      order = 'F' if TypeFlags.COLUMN_MAJOR in embedded_data.type_flags else 'C',
+      self._context.binfile,
+      shape = layout.shape,
+      offset = layout.offset,
+      dtype = np.dtype(layout.dtype),
+      order = layout.order,
       # enable write - `value` setters must explicitly flush
       mode='w+'
     )
@@ -356,19 +387,53 @@ class Embedded(XdfRefMixin, metaclass=XmlAbstractBaseMeta):
     # NumPy allows for negative stride, but it does not match up to this meaning.
     # see `EmbeddedData.strides`
     
-    if (embedded_data.strides is None):
+    if (layout.strides is None):
       return map
-    elif len(embedded_data.strides) == 2:
-      map.strides = embedded_data.strides
+    elif len(layout.strides) == 2:
+      map.strides = layout.strides
       return map
     # ...len 1, normal Axis, Constant, etc.
     else:
       # interpret negative as TunerPro "backwards stride"
-      stride = embedded_data.strides[0]
+      stride = layout.strides[0]
       map.strides = (abs(stride), )
       # ...return 'backwards' - ignore because this returns a map, but mypy thinks it returns array
       return map[::-1] if stride < 0 else map # type: ignore
     
   @property
   def map_hex(self) -> npt.NDArray[np.unicode_]:
-    return print_array(self.memory_map, hex)
\ No newline at end of file
+    return print_array(self.memory_map, hex)
+
+def batch_from_embedded(embeddeds: t.Iterable[Embedded]) -> t.List[ArrayLike]:
+  '''
+  Unitless `Embedded.value` of each of `embeddeds`, in order. Those converted by a single affine `Math`, e.g. most `Constant`s, embedded axes and tables, are gathered into one array and converted in one vectorized pass, rather than one call each - the rest are converted one by one.
+  '''
+  embeddeds = list(embeddeds)
+  out: t.List[t.Optional[ArrayLike]] = [None] * len(embeddeds)
+  gathered: t.List[t.Tuple[int, npt.NDArray]] = []
+  factors: t.List[float] = []
+  divides: t.List[bool] = []
+  offsets: t.List[float] = []
+  for index, embedded in enumerate(embeddeds):
+    math = embedded.one_shot_Math
+    affine = math.affine if math is not None else None
+    if affine is None:
+      out[index] = Embedded.value.fget(embedded)
+      continue
+    data = embedded.memory_map.astype(np.float_)
+    gathered.append((index, data))
+    factors.append(affine.factor if affine.factor is not None else 1)
+    divides.append(affine.divides)
+    offsets.append(affine.offset if affine.offset is not None else np.nan)
+  if gathered:
+    sizes = [data.size for _, data in gathered]
+    flat = np.concatenate([data.ravel() for _, data in gathered])
+    # each divided or multiplied, then summed, as its equation does - x * 1 is exact, so this matches converting one by one
+    repeated = np.repeat(factors, sizes)
+    converted = np.multiply(flat, repeated)
+    np.divide(flat, repeated, out = converted, where = np.repeat(divides, sizes))
+    repeated = np.repeat(offsets, sizes)
+    np.add(converted, repeated, out = converted, where = ~np.isnan(repeated))
+    for (index, data), chunk in zip(gathered, np.split(converted, np.cumsum(sizes)[:-1])):
+      out[index] = chunk.reshape(data.shape)
+  return t.cast(t.List[ArrayLike], out)
@@ -2,7 +2,8 @@ from __future__ import annotations
 import typing as t
 from .EmbeddedData import Embedded
 from .Parameter import Parameter
-from .EmbeddedData import TypeFlags, hex_to_array
+from .Base import compiled_xpath, context_cached
+from .EmbeddedData import hex_to_array
 import numpy as np
 import numpy.typing as npt
 import functools as ft
@@ -11,6 +12,8 @@ class Flag(Embedded, Parameter):
   '''
   Flag, a.k.a bitmask. In one byte, there are 8 possible locations for a bitmask.
   '''
+  _mask = compiled_xpath('./mask/text()')
+
   def __repr__(self):
     val = self.memory_map[0]
     return f"{Parameter.__repr__(self)}: {bin(val)}"
@@ -32,7 +35,7 @@ class Flag(Embedded, Parameter):
     
     This should be set using bit selection, like TunerPro.
     '''
-    hex_str = self.xpath('./mask/text()')[0]
+    hex_str = self._mask(self)[0]
     bytes = hex_to_array(hex_str, self.EmbeddedData.length)
     binary = np.unpackbits(bytes)
     return binary
@@ -64,26 +67,27 @@ class Flag(Embedded, Parameter):
     # back into bytes
     new_bytes = np.packbits(new)
     self.memory_map[:] = new_bytes[:]
+    self._context.writes += 1
     # TODO: flushpool?
     self.memory_map.flush()
     return
 
 
-  @ft.cached_property
+  @context_cached
   def memory_map(self) -> np.memmap:
-    embedded_data = self.EmbeddedData
+    xdf = self._xdf
+    layout = xdf._layout(self.EmbeddedData)
     # intrinsic dtype is np.uint8 - we want an array of individual bytes to join later
-    orig_t = embedded_data.data_type
+    orig_t = np.dtype(layout.dtype)
     uint8_arr = np.dtype(f"{orig_t.byteorder}u1") # type: ignore
     map = np.memmap(
-      self._xdf._binfile,
+      self._context.binfile,
       # we want an array of uint8 bytes this long
-      shape = embedded_data.length,
-      # see TunerPro docs - base offset not applied here
-      offset = embedded_data.address if embedded_data.address else 0,
+      shape = orig_t.itemsize,
+      offset = layout.offset,
       # we always use intrinsic np.uint8, so we can have the collection of bytes
       dtype = uint8_arr,
-      order = 'F' if TypeFlags.COLUMN_MAJOR in embedded_data.type_flags else 'C',
+      order = layout.order,
       mode='w+'
     )
     return map
\ No newline at end of file
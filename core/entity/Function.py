@@ -1,10 +1,12 @@
 from __future__ import annotations
 import typing as t
-from .Base import Base, Array
+from .Base import Base, context_cached_by, edits, revision
 if t.TYPE_CHECKING:
   from . import Axis
 
 from .Parameter import Parameter
+from . import Lookup
+import pint
 import numpy as np
 import numpy.typing as npt
 from decimal import Decimal, ROUND_HALF_UP
@@ -17,40 +19,6 @@ def round_off(number, ndigits=None):
     exp = Decimal('1.{}'.format(ndigits * '0')) if ndigits else Decimal('1')
     return type(number)(Decimal(number).quantize(exp, ROUND_HALF_UP))
 
-def increasing(a: npt.ArrayLike) -> np.ma.masked_array:
-  '''
-  Retain monotonically-increasing subset by masking out values that fall below the max, e.g.
-  `[0, 1, 2, 0, -2, 4, 0, -5, 6, 7, 8]` => 
-  `[0, 1, 2, -,  -, 4, -,  -, 6, 7, 8]`
-  '''
-  # https://stackoverflow.com/a/28563925
-  high_water = np.maximum.accumulate(a)
-  fall_under = high_water - a > 0
-  out: np.ma.masked_array = np.ma.masked_array(a, fall_under)
-  return out
-
-def gaps(indices: np.ma.masked_array, vals: np.ma.masked_array) -> np.ma.masked_array:
-  # [[idx1, val1], [idx2, val2]...]
-  idxVal = np.stack(
-    (
-      round(indices.compressed()),
-      vals.compressed()  
-    ),
-    axis = 1
-  )
-  # ...indices paired, e.g. [0, 1, 2] -> [0, 1], [1, 2], [2, 3]
-  pairs = np.lib.stride_tricks.sliding_window_view(
-    np.rot90(idxVal)[1],
-    2
-  )
-  # ...list of idx, val, slice width - greater than one means this is a discontinuity
-  boundsAndDiff = np.hstack((pairs, np.diff(pairs)))
-  # ...(start, end, diff > 2) means out[start + 1: end] is the non-inclusive empty slice, e.g. [1, 2, 0, -1, 3] 
-  gaps = boundsAndDiff[boundsAndDiff[:, 2] > 1]
-  return gaps
-
-# TODO: rewrite using `np.ma.flatnonmasked_contiguous?` 
-# see https://numpy.org/doc/stable/reference/generated/numpy.ma.flatnotmasked_contiguous.html
 def monotone_interpolated(values: npt.NDArray, indices: npt.NDArray) -> npt.NDArray:
   '''
   TunerPro uses a unique interpolation strategy when using `Function` as an axis. 
@@ -74,28 +42,14 @@ def monotone_interpolated(values: npt.NDArray, indices: npt.NDArray) -> npt.NDAr
   150 -2 -    158.82
          -    159.41
   160 15 |   160
+
+  Vectorized - every gap is filled in one pass, with the tail of its `np.linspace` computed as `np.linspace` does.
   '''
-  # ...segregate increasing subsequences in indices
-  monotonic_idx = increasing(indices)
-  monotonic_val: np.ma.masked_array = np.ma.masked_array(values, monotonic_idx.mask)
-  non_monotonic_idx: np.ma.masked_array = np.ma.masked_array(
-    data=indices,
-    mask=np.logical_not(monotonic_idx.mask)
-  )
-  #non_monotonic_val = np.ma.masked_array(
-  #  data=values,
-  #  mask=non_monotonic_idx.mask
-  #)
-  #  FILL IN THE BLANKS
-  out: Array = Array(np.zeros(values.shape))
+  # ...segregate increasing subsequences in indices - values falling below the max so far are dropped, e.g. [0, 1, 2, 0, -2, 4] => [0, 1, 2, 4]
+  monotonic = np.logical_not(np.maximum.accumulate(indices) - indices > 0)
   # ...list of idx, val, e.g. [[0, 10], [1, 20]]
-  uninterpolated = np.stack(
-    (
-      round(monotonic_idx.compressed()),
-      monotonic_val.compressed()  
-    ),
-    axis = 1
-  )
+  at = round(indices[monotonic])
+  at_values = values[monotonic]
   # WEIRD TUNERPRO EDGE CASE
   # if 0 is in indices, but not in the leading non-monotonic segment, fill in the first value with index 0.
   # e.g:
@@ -104,45 +58,42 @@ def monotone_interpolated(values: npt.NDArray, indices: npt.NDArray) -> npt.NDAr
   # out:  [ 0 10 20 30 60 70 80 118 120 130 140 157 158 158.6 159 160]
   # done: [90 10 20 30 60 70 80 118 120 130 140 157 158 158.6 159 160]
   # the "90" was filled in, because it was the first index-0 val
-  if monotonic_idx[0] != 0:
-    first_zero_idx = np.argwhere(indices == 0)[0]
-    first_zero_val = values[first_zero_idx]
-    uninterpolated = np.vstack((np.column_stack((0, first_zero_val)), uninterpolated))
-
-  # ...indices paired, e.g. [0, 1, 2] -> [0, 1], [1, 2], [2, 3]
-  pairs = np.lib.stride_tricks.sliding_window_view(
-    np.rot90(uninterpolated)[1],
-    2
-  )
-  # ...list of idx, val, slice width - greater than one means this is a discontinuity
-  boundsAndDiff = np.hstack((pairs, np.diff(pairs)))
-  # ...(start, end, diff > 2) means out[start + 1: end] is the non-inclusive empty slice, e.g. [1, 2, 0, -1, 3] 
-  gaps = boundsAndDiff[boundsAndDiff[:, 2] > 1]
-  adjust_start = np.full_like(np.zeros(gaps.shape), [1, 0, 0])
-  gaps = gaps + adjust_start
-  # fill output with each index's matching value from function
-  for index, val in uninterpolated:
-    out[int(index)] = val
-  # traverse gaps backwards
-  #gaps = np.hstack((enumerated, np.flipud(gaps)))
-  # for interpolation, fill in empty parts
-  clean_indices = round(indices).astype(np.integer)
-  for start, end, diff in gaps.astype(np.integer):
-    gap = out[start:end]
-    rising = np.flatnonzero(values == out[end])[0] - 1, end
-    length = abs(
-      clean_indices[rising[0] + 1] - clean_indices[rising[0]]
-    )
-    interpolant = np.linspace(
-    # interpolate between end-of-dip value and indexed value
-      values[rising[0]], out[rising[1]],
-      # length between end of dip coords
-      length,
-      endpoint = False
-    )
-    # now take the tail of the full interpoland to fill the gap
-    filler = interpolant[-(diff - 1):]
-    out[start: end] = filler    
+  if indices[0] != 0:
+    first_zero = np.flatnonzero(indices == 0)[0]
+    at = np.concatenate(([0.0], at))
+    at_values = np.concatenate((values[[first_zero]], at_values))
+  # fill output with each index's matching value from function - the last of repeated indices wins
+  out = np.zeros(values.shape)
+  positions = at.astype(np.int_)
+  written = np.append(positions[1:] != positions[:-1], True)
+  out[positions[written]] = at_values[written]
+  # ...indices paired, e.g. [0, 1, 2] -> [0, 1], [1, 2], [2, 3] - a slice width greater than one is a gap, out[start + 1: end]
+  widths = np.diff(at)
+  gap = widths > 1
+  if not np.any(gap):
+    return out
+  start = positions[:-1][gap] + 1
+  end = positions[1:][gap]
+  cells = widths[gap].astype(np.int_) - 1
+  # interpolate between the value before the one indexed at the end of the gap, and that value
+  stop = out[end]
+  rising = np.argmax(values == stop[:, np.newaxis], axis = 1) - 1
+  clean_indices = round(indices).astype(np.int_)
+  length = np.abs(clean_indices[rising + 1] - clean_indices[rising])
+  # ...a shorter interpolant than its gap only fills it when it is one value, broadcast
+  if np.any((length < cells) & (length != 1)):
+    raise ValueError(f'interpolants of lengths {length} do not fill gaps of {cells} cells')
+  # ...now take the tail of each full interpolant to fill its gap
+  gap_of = np.repeat(np.arange(len(cells)), cells)
+  offset = np.arange(len(gap_of)) - np.repeat(np.cumsum(cells) - cells, cells)
+  step_index = np.maximum(length[gap_of] - cells[gap_of] + offset, 0)
+  low = values[rising][gap_of]
+  delta = stop[gap_of] - low
+  div = length[gap_of]
+  step = delta / div
+  # ...as `np.linspace`, which divides first for steps that underflow
+  filler = np.where(step == 0, step_index / div * delta, step_index * step) + low
+  out[np.repeat(start, cells) + offset] = filler
   return out
 
 # TODO: use tunerpro round? 0.5 => 1 always
@@ -164,10 +115,33 @@ class Function(Parameter):
     '''
     return np.dstack([self.x.value, self.y.value])
 
-  @property
-  def interpolated(self):
-    out = monotone_interpolated(self.x.value.magnitude, self.y.value.magnitude)
+  @context_cached_by(revision)
+  def interpolated(self) -> npt.NDArray:
+    '''
+    `monotone_interpolated` x values over the y indices, as TunerPro shows a `Function` used as an axis - made again only after a write to the binary, or `Xdf.edited`, and read-only, as it is shared between accesses.
+    '''
     # extremely annoying "feature" of tunerpro - 
+    out = monotone_interpolated(self.x.value.magnitude, self.y.value.magnitude)
+    out.flags.writeable = False
     return out
 
+  # unit of `lookup` results, as `Table._lookup_unit`
+  @context_cached_by(edits)
+  def _lookup_unit(self) -> t.Optional[pint.Unit]:
+    return self.y.unit
+
+  @context_cached_by(revision)
+  def grid(self) -> Lookup.Grid:
+    '''
+    Y values over the x breakpoints, for `lookup` - made again only after a write to the binary, or `Xdf.edited`.
+    '''
+    return Lookup.Grid.build(self.y.value.magnitude, self.x.value.magnitude)
+
+  def lookup(self, x: npt.ArrayLike, method: Lookup.Method = 'linear') -> pint.Quantity:
+    '''
+    Y values at each of `x` - `nearest`, or interpolated `linear`ly, and clamped to the first and last points, as TunerPro does.
+    '''
+    out = self.grid(Lookup.magnitude(x, self.x), method = method)
+    return pint.Quantity(out, self._lookup_unit)
+
 __all__ = ['Function']  
\ No newline at end of file
@@ -0,0 +1,156 @@
+from __future__ import annotations
+import typing as t
+import re
+import contextlib
+import numpy as np
+import numpy.typing as npt
+from lxml import etree as xml
+if t.TYPE_CHECKING:
+  from . import Xdf as xdf, Context
+  from .Parameter import Parameter
+
+class ParameterEntry(t.NamedTuple):
+  '''
+  What an `Xdf` knows about a `Parameter` without materializing it.
+  '''
+  tag: str
+  uniqueid: t.Optional[str]
+  title: t.Optional[str]
+  # `<CATEGORYMEM>` indices into the header `<CATEGORY>`s, see `Category.Categorized`
+  categories: t.Tuple[int, ...]
+  sourceline: t.Optional[int]
+  # byte range of the element in the XDF file, when lazily loaded
+  offset: t.Optional[int] = None
+  end: t.Optional[int] = None
+
+def entry_from_element(element: xml._Element, offset: t.Optional[int] = None, end: t.Optional[int] = None) -> ParameterEntry:
+  return ParameterEntry(
+    tag = element.tag,
+    uniqueid = element.get('uniqueid'),
+    title = element.findtext('title'),
+    categories = tuple(
+      int(member.attrib['category']) for member in element.iterfind('CATEGORYMEM')
+    ),
+    sourceline = element.sourceline,
+    offset = offset,
+    end = end
+  )
+
+class LazyDefinition:
+  '''
+  Source and parameter index of a lazily loaded XDF.
+
+  The `Xdf` tree starts out with the full `<XDFHEADER>`, and a stub per `Parameter` holding only its attributes, `<title>` and `<CATEGORYMEM>`s. A stub is swapped for its full subtree the first time a Python proxy is made for it - see `Parameter._init` - so XPath that only looks at stubs (e.g. `//MATH`) sees the parameters materialized so far.
+  '''
+  source: bytes
+  entries: t.List[ParameterEntry]
+  # unmaterialized stubs, by (sourceline, uniqueid)
+  _pending: t.Dict[t.Tuple[t.Optional[int], t.Optional[str]], ParameterEntry]
+  _fragment_parser: xml.XMLParser
+  # set while the `Xdf` walks its own stubs, e.g. to index them
+  _suspended: bool = False
+
+  def __init__(self, source: bytes, entries: t.List[ParameterEntry], encoding: t.Optional[str]):
+    self.source = source
+    self.entries = entries
+    self._pending = {(entry.sourceline, entry.uniqueid): entry for entry in entries}
+    # subtrees are parsed as plain elements, and take on `XdfTyper` classes once moved into the `Xdf` tree
+    self._fragment_parser = xml.XMLParser(remove_blank_text = True, encoding = encoding)
+
+  @property
+  def pending(self) -> int:
+    return len(self._pending)
+
+  def is_pending(self, stub: xml._Element) -> bool:
+    return (stub.sourceline, stub.get('uniqueid')) in self._pending
+
+  @contextlib.contextmanager
+  def suspended(self):
+    '''
+    Proxies made within are left as stubs. They must not be kept - lxml reuses a live proxy rather than making a new one, so a kept stub is never materialized.
+    '''
+    self._suspended = True
+    try:
+      yield
+    finally:
+      self._suspended = False
+
+  def materialize(self, stub: Parameter) -> bool:
+    '''
+    Replaces the content of `stub` with its full subtree from the source. Returns `False` if already materialized.
+    '''
+    if self._suspended:
+      return False
+    entry = self._pending.pop((stub.sourceline, stub.get('uniqueid')), None)
+    if entry is None:
+      return False
+    # pad with newlines, so `sourceline`s in the subtree match the file
+    fragment = xml.fromstring(
+      b'\n' * (t.cast(int, entry.sourceline) - 1) + self.source[entry.offset:entry.end],
+      self._fragment_parser
+    )
+    stub.text = fragment.text
+    stub[:] = list(fragment)
+    return True
+
+def _line_offsets(source: bytes) -> npt.NDArray[np.intp]:
+  # byte offset of the start of each line, 0-indexed
+  newlines = np.flatnonzero(np.frombuffer(source, dtype = np.uint8) == ord('\n'))
+  return np.concatenate(([0], newlines + 1))
+
+def _tag_offset(source: bytes, tag: str, start: int) -> int:
+  match = re.compile(rb'<' + tag.encode() + rb'[\s/>]').search(source, start)
+  if match is None:
+    raise ValueError(f"'<{tag}>' not found in XDF source after byte {start}.")
+  return match.start()
+
+def index_definition(source: bytes, events: xml.iterparse, parser: Context.XdfParser) -> xdf.Xdf:
+  '''
+  Streams over the XDF once (validating, if `events` has a schema) and returns an `Xdf` skeleton of parameter stubs, bound to `parser`'s classes. The lazy definition is kept in `parser`'s document context.
+  '''
+  root: t.Optional[xml._Element] = None
+  # top-level elements in document order: (element summary, tag, sourceline)
+  found: t.List[t.Tuple[t.Optional[ParameterEntry], str, int]] = []
+  for event, element in events:
+    parent = element.getparent()
+    if parent is None:
+      root = element
+    # top-level element - XDFHEADER or a Parameter
+    elif parent.getparent() is None:
+      if element.tag == 'XDFHEADER':
+        found.append((None, element.tag, element.sourceline))
+      else:
+        found.append((entry_from_element(element), element.tag, element.sourceline))
+        # the stub keeps title and categories, drop the rest as we go
+        for child in list(element):
+          if child.tag != 'title' and child.tag != 'CATEGORYMEM':
+            element.remove(child)
+  if root is None or root.find('XDFHEADER') is None:
+    raise ValueError('XDF has no <XDFHEADER>.')
+  # byte range of each top-level element runs up to the next one
+  lines = _line_offsets(source)
+  offsets: t.List[int] = []
+  position = -1
+  for _, tag, sourceline in found:
+    position = _tag_offset(source, tag, max(int(lines[sourceline - 1]), position + 1))
+    offsets.append(position)
+  root_end = source.rindex(b'</' + root.tag.encode())
+  entries = [
+    summary._replace(offset = offset, end = end)
+    for (summary, _, _), offset, end in zip(found, offsets, offsets[1:] + [root_end])
+    if summary is not None
+  ]
+  # ...build the typed skeleton
+  skeleton: xdf.Xdf = parser.makeelement(root.tag, dict(root.attrib))
+  for element in list(root):
+    # skip comments and processing instructions
+    if not isinstance(element.tag, str):
+      continue
+    elif element.tag == 'XDFHEADER':
+      skeleton.append(element)
+    else:
+      stub = xml.SubElement(skeleton, element.tag, dict(element.attrib))
+      stub.sourceline = element.sourceline
+      stub.extend(list(element))
+  parser.context.lazy = LazyDefinition(source, entries, root.getroottree().docinfo.encoding)
+  return skeleton
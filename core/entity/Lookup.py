@@ -0,0 +1,103 @@
+import typing as t
+import itertools as it
+import numpy as np
+import numpy.typing as npt
+import pint
+
+# `linear` is linear along each axis - the same as `bilinear` on a 2D table
+Method = t.Literal['nearest', 'linear', 'bilinear']
+
+class NotMonotonic(ValueError):
+  '''
+  Raised when looking up over an axis whose breakpoints neither only rise nor only fall - TunerPro cannot interpolate over it either.
+  '''
+  pass
+
+class Breakpoints(t.NamedTuple):
+  '''
+  Ascending breakpoints of an axis, located with `np.searchsorted` - a descending axis is taken in reverse, along with the values over it, see `Grid.build`.
+  '''
+  values: npt.NDArray[np.float_]
+  # width of each interval between breakpoints - infinite for repeated ones, which have no width, so each point in them is at the lower
+  spans: npt.NDArray[np.float_]
+  descending: bool
+
+  @classmethod
+  def of(cls, values: npt.ArrayLike) -> 'Breakpoints':
+    values = np.asarray(values, dtype = np.float_).ravel()
+    steps = np.diff(values)
+    descending = bool(np.all(steps <= 0) and np.any(steps < 0))
+    if descending:
+      values = values[::-1]
+      steps = np.diff(values)
+    elif not np.all(steps >= 0):
+      raise NotMonotonic(f'{values} is not monotonic')
+    return cls(values, np.where(steps > 0, steps, np.inf), descending)
+
+  def locate(self, at: npt.NDArray[np.float_]) -> t.Tuple[npt.NDArray[np.int_], npt.NDArray[np.int_], npt.NDArray[np.float_]]:
+    '''
+    Breakpoints below and above each of `at`, and how far between them it is, from 0 to 1 - clamped to the first and last breakpoints, as TunerPro does.
+    '''
+    if len(self.values) == 1:
+      zeros = np.zeros(at.shape, dtype = np.int_)
+      return zeros, zeros, np.zeros(at.shape)
+    clamped = np.clip(at, self.values[0], self.values[-1])
+    upper = np.clip(np.searchsorted(self.values, clamped, side = 'right'), 1, len(self.values) - 1)
+    lower = upper - 1
+    return lower, upper, (clamped - self.values[lower]) / self.spans[lower]
+
+class Grid(t.NamedTuple):
+  '''
+  Values over the breakpoints of one or two axes, for vectorized lookups - each a `np.searchsorted` per axis, and a gather of the values around each point.
+  '''
+  axes: t.Tuple[Breakpoints, ...]
+  # over ascending breakpoints, one dimension per axis
+  values: npt.NDArray[np.float_]
+
+  @classmethod
+  def build(cls, values: npt.ArrayLike, *axes: npt.ArrayLike) -> 'Grid':
+    breakpoints = tuple(Breakpoints.of(axis) for axis in axes)
+    grid = np.asarray(values, dtype = np.float_).reshape(tuple(len(axis.values) for axis in breakpoints))
+    for dimension, axis in enumerate(breakpoints):
+      if axis.descending:
+        grid = np.flip(grid, dimension)
+    grid = np.ascontiguousarray(grid)
+    grid.flags.writeable = False
+    return cls(breakpoints, grid)
+
+  def __call__(self, *at: npt.ArrayLike, method: Method = 'linear') -> npt.NDArray[np.float_]:
+    '''
+    Values at the coordinates `at`, one array per axis, broadcast together.
+    '''
+    if method == 'bilinear' and len(self.axes) != 2:
+      raise ValueError(f'bilinear lookup over {len(self.axes)} axes')
+    coordinates = np.broadcast_arrays(*(np.asarray(a, dtype = np.float_) for a in at))
+    located = [axis.locate(a) for axis, a in zip(self.axes, coordinates)]
+    # gathered from the flat grid, by offset
+    flat = self.values.ravel()
+    strides = [stride // self.values.itemsize for stride in self.values.strides]
+    if method == 'nearest':
+      # halfway rounds up, as TunerPro indexing does - see `Function.round_off`
+      return flat.take(sum(np.where(weight >= 0.5, upper, lower) * stride for (lower, upper, weight), stride in zip(located, strides)))
+    elif method not in ('linear', 'bilinear'):
+      raise ValueError(f"'{method}' is not a lookup method")
+    # values at the corners around each point - the upper breakpoint is the next, but on axes of one
+    base = sum(lower * stride for (lower, _, _), stride in zip(located, strides))
+    steps = [stride if len(axis.values) > 1 else 0 for axis, stride in zip(self.axes, strides)]
+    corners = [
+      flat.take(base + sum(step for high, step in zip(corner, steps) if high))
+      for corner in it.product((False, True), repeat = len(self.axes))
+    ]
+    # ...weighted by how near each is, one axis at a time from the last - exact at the breakpoints
+    for _, _, near in reversed(located):
+      corners = [low * (1 - near) + high * near for low, high in zip(corners[0::2], corners[1::2])]
+    return corners[0]
+
+def magnitude(value: t.Any, axis: t.Any) -> t.Any:
+  '''
+  Coordinates in the unit of `axis`, if given as a `pint.Quantity` - otherwise, as they are. The unit is only looked up then, see `Table._lookup_unit`.
+  '''
+  if isinstance(value, pint.Quantity):
+    unit = axis.unit
+    return value.m_as(unit) if unit is not None else value.magnitude
+  return value
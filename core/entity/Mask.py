@@ -1,6 +1,6 @@
 import typing as t
 from abc import ABC, abstractmethod
-from .Base import XmlAbstractBaseMeta, Array
+from .Base import XmlAbstractBaseMeta, Array, compiled_xpath
 from .EmbeddedData import EmbeddedData
 from .Math import Math
 import numpy as np
@@ -24,15 +24,26 @@ class MaskedMath(Math, ABC, metaclass=XmlAbstractBaseMeta):
   - col `Math` has column attirbute,
   - cell `Math` has both row and column.
   '''
+  _embedded_data = compiled_xpath('./preceding-sibling::EMBEDDEDDATA')
+
   @property
   def shape(self):
-    embedded_data: EmbeddedData = self.xpath('./preceding-sibling::EMBEDDEDDATA')[0]
+    embedded_data: EmbeddedData = self._embedded_data(self)[0]
     return embedded_data.shape
   
   @property
   @abstractmethod
+  def region(self) -> t.Tuple[t.Any, ...]:
+    '''
+    Index of the cells this equation is defined over, before precedence - e.g. `(row, slice(None))`.
+    '''
+    pass
+
+  @property
   def mask(self) -> Mask:
     '''
     Numpy boolean mask array, following convention of `False` meaning valid data, and `True` meaning invalid data..
     '''
-    pass
\ No newline at end of file
+    out = np.ones(self.shape, dtype = np.ma.MaskType)
+    out[self.region] = False
+    return Mask(out)
\ No newline at end of file
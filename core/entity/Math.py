@@ -3,21 +3,27 @@ from abc import abstractmethod
 import typing as t
 import numpy.typing as npt
 import numpy as np
+import lark
 # for entities
-from .Base import Base, RefersCyclically, CyclicReferenceException, ExtendsParser
+from .Base import Base, RefersCyclically, CyclicReferenceException, ExtendsParser, compiled_xpath, context_cached_by, definition, edits
 # for Math equation parsing
 from .. import equation_parser as eq
 from ..equation_parser.transformations import (
   Replacer,
   Evaluator,
-  FunctionCallTransformer
+  FunctionCallTransformer,
+  Compiler,
+  Cell,
+  Affine,
+  Inverse,
+  Interval,
+  Optimizer
 )
 from .Var import Var, BoundVar, FreeVar, LinkedVar, AddressVar
 # general stuff
 import functools
-from pynverse import inversefunc
-from itertools import chain
 from . import Xdf as xdf
+from .Context import CacheStats
 import lxml as xml
 
 class MathInterdependence(CyclicReferenceException):
@@ -31,12 +37,10 @@ class MathInterdependence(CyclicReferenceException):
     printouts: t.List[str] = []
     for math in self.cycle:
       # var.linked.Math may be a list in case of `Table.ZAxis`, when you have many conversion equation masks
-      linked_Maths = set(
-        chain.from_iterable(var.linked.Math for var in math.LinkedVars)
-      )
+      linked_Maths = set(Math._linked_Maths(math.LinkedVars))
       dependent = next(iter(linked_Maths.intersection(self.cycle)))
       dependent_Var = next(filter(
-        lambda var: dependent in var.linked.Math, math.LinkedVars
+        lambda var: dependent in Math._linked_Maths([var]), math.LinkedVars
       ))
       # set printout
       printout = "  "
@@ -44,7 +48,7 @@ class MathInterdependence(CyclicReferenceException):
       printout += f"\n    {dependent_Var.id}: {root_tree.getpath(dependent)}"
       printouts.append(printout)
       seperator = ',\n'
-    message = f"""Parameter conversion equations in file `{self.xdf._path}`
+    message = f"""Parameter conversion equations in file `{self.xdf._context.path}`
     
 {seperator.join(printouts)}
 
@@ -53,7 +57,215 @@ are mutually interdependent.
     return message
     #Exception.__init__(self, message)
 
+class MathNamespaceError(FunctionCallTransformer.NamespaceError):
+  '''
+  Raised at tune init (i.e. file open) when an equation calls functions its `<MATH>` does not provide, e.g. `ROW` in a Constant - rather than on its first conversion.
+  '''
+  def __init__(self, xdf: xdf.Xdf, bad_math: Math, *args: object) -> None:
+    self.math = bad_math
+    self.xdf = xdf
+    super().__init__(*args)
+
+  def __str__(self) -> str:
+    root_tree: xml.ElementTree = self.xdf.getroottree()
+    undefined = ', '.join(f'`{name}`' for name in sorted(self.math.analysis.undefined))
+    return f'''{undefined} not in the namespace of {self.math.__class__.__name__}.
+
+{root_tree.getpath(self.math)} (line {self.math.sourceline})
+
+"{self.math.attrib['equation']}"
+    '''
+
+class MathAnalysis(t.NamedTuple):
+  '''
+  Load-time facts about one `<MATH>`, from a single walk over its equation and Vars - see `Math.analyze`. Elements are referred to by path, as in `Cache.CompiledDefinition`.
+  '''
+  # the `<MATH>` analyzed, as written - see `Math.analysis`
+  definition: bytes
+  # shared by every `<MATH>` of the same equation string
+  equation: eq.EquationAnalysis
+  # uniqueids of the parameters linked Vars refer to
+  links: t.Tuple[str, ...]
+  # `<MATH>` elements the linked parameters convert with, see `Math.dependency_graph`
+  dependencies: t.Tuple[str, ...]
+  # functions called that are neither default nor provided by the `<MATH>`
+  undefined: t.FrozenSet[str]
+
 DefaultParser = FunctionCallTransformer.FunctionCallTransformer()
+# `ExtendsParser._parser` without entity namespaces, for equations that only call default functions
+SharedParser = FunctionCallTransformer.FunctionCallTransformer(suppress_rounding = True)
+
+class EquationTrees:
+  '''
+  Function-call trees of `Math.equation`, and their `Compiler` functions, interned process-wide by (equation string, namespace shape). Definitions repeat the same few equations hundreds of times, e.g. `X`.
+
+  The namespace shape is the set of entity-provided functions an equation calls (`CELL`, `ROW`, `INDEX`, `THIS`...). Those are bound into the tree when it is built, and `CELL` closes over the accumulator of that moment - so only trees of the empty shape are shared, others are built per access and counted as `bound`. Transformers build new trees, so shared ones are never modified.
+  '''
+  _trees: t.Dict[t.Tuple[str, t.FrozenSet[str]], FunctionCallTransformer.FunctionTree]
+  _compiled: t.Dict[t.Tuple[str, t.FrozenSet[str]], Compiler.CompiledEquation]
+  _affine: t.Dict[str, t.Optional[Affine.Affine]]
+  _inverses: t.Dict[t.Tuple[str, str], t.Optional[t.Callable[..., FunctionCallTransformer.NumericArg]]]
+  # equations inverted numerically, with the reason they have no closed-form inverse
+  numeric_inverses: t.Dict[str, str]
+  _domain_inverses: t.Dict[t.Tuple[str, str], t.Optional[Inverse.DomainInverse]]
+  _bounds: t.Dict[t.Tuple[str, str], Interval.Interval]
+  _shapes: t.Dict[str, t.FrozenSet[str]]
+  _cell_forms: t.Dict[str, t.Optional[Cell.CellForm]]
+  hits: int
+  misses: int
+  bound: int
+
+  def __init__(self):
+    self._trees = {}
+    self._compiled = {}
+    self._affine = {}
+    self._inverses = {}
+    self.numeric_inverses = {}
+    self._domain_inverses = {}
+    self._bounds = {}
+    self._shapes = {}
+    self._cell_forms = {}
+    self.hits = self.misses = self.bound = 0
+
+  def shape(self, equation: str) -> t.FrozenSet[str]:
+    shape = self._shapes.get(equation)
+    if shape is None:
+      shape = self._shapes[equation] = frozenset(
+        name for name in eq.analyze(equation).calls if name not in FunctionCallTransformer.default_numeric
+      )
+    return shape
+
+  def get(self, equation: str, parser: t.Callable[[], FunctionCallTransformer.FunctionCallTransformer]) -> FunctionCallTransformer.FunctionTree:
+    '''
+    Function-call tree of `equation`, with `parser` supplying the entity namespace if the equation needs one.
+    '''
+    shape = self.shape(equation)
+    if shape:
+      self.bound += 1
+      return parser().transform(eq.parse(equation))
+    key = (equation, shape)
+    tree = self._trees.get(key)
+    if tree is None:
+      self.misses += 1
+      tree = self._trees[key] = SharedParser.transform(eq.parse(equation))
+    else:
+      self.hits += 1
+    return tree
+
+  def compiled(self, equation: str, parser: t.Callable[[], FunctionCallTransformer.FunctionCallTransformer]) -> Compiler.CompiledEquation:
+    '''
+    `get`, optimized and compiled - see `Optimizer` and `Compiler`. Equations of a non-empty shape are compiled per access, like their trees - others once, with intermediate results in reusable buffers, see `ArenaCompiler`.
+    '''
+    shape = self.shape(equation)
+    if shape:
+      return Compiler.compile_tree(Optimizer.optimize(self.get(equation, parser)))
+    key = (equation, shape)
+    compiled = self._compiled.get(key)
+    if compiled is None:
+      compiled = self._compiled[key] = Compiler.compile_tree(Optimizer.optimize(self.get(equation, parser)), arena = True)
+    else:
+      self.hits += 1
+    return compiled
+
+  def cell_form(self, equation: str) -> t.Optional[Cell.CellForm]:
+    '''
+    `Cell.CellForm` of an axis equation, compiled once whatever its shape - or `None` if it calls `CELL` with other than literal arguments.
+    '''
+    try:
+      return self._cell_forms[equation]
+    except KeyError:
+      try:
+        form = Cell.CellForm.build(eq.parse(equation))
+      except Cell.NotCompiled:
+        form = None
+      self._cell_forms[equation] = form
+      return form
+
+  def affine(self, equation: str) -> t.Optional[Affine.Affine]:
+    '''
+    `Affine` form of `equation`, if it has one - only equations of the empty shape can.
+    '''
+    try:
+      return self._affine[equation]
+    except KeyError:
+      form = self._affine[equation] = None if self.shape(equation) else Affine.affine_form(
+        self.get(equation, lambda: SharedParser)
+      )
+      return form
+
+  def inverse(self, equation: str, variable: str) -> t.Optional[t.Callable[..., FunctionCallTransformer.NumericArg]]:
+    '''
+    Closed-form inverse of `equation` in `variable`, see `Inverse.inverse_form` - or `None`, recording the equation in `numeric_inverses`.
+    '''
+    key = (equation, variable)
+    if key in self._inverses:
+      return self._inverses[key]
+    inverse = None
+    shape = self.shape(equation)
+    if shape:
+      self.numeric_inverses[equation] = f"calls {', '.join(sorted(shape))}"
+    else:
+      try:
+        inverse = Inverse.inverse_form(self.get(equation, lambda: SharedParser), variable)
+      except Inverse.NotInvertible as e:
+        self.numeric_inverses[equation] = str(e)
+    self._inverses[key] = inverse
+    return inverse
+
+  def variables(self, equation: str) -> t.FrozenSet[str]:
+    '''
+    Variables `equation` refers to, by first character - see `Replacer`.
+    '''
+    tree = self.get(equation, lambda: SharedParser)
+    return frozenset(
+      token[0] for token in tree.scan_values(lambda v: isinstance(v, lark.Token) and v.type == 'NAME')
+    )
+
+  def domain_inverse(
+    self,
+    equation: str,
+    dtype: np.dtype,
+    forward: FunctionCallTransformer.ConversionFunc
+  ) -> t.Optional[Inverse.DomainInverse]:
+    '''
+    `Inverse.DomainInverse` of `forward`, shared by every `Math` of `equation` over `dtype` - the equation must refer to no Vars but the one it is inverted in.
+    '''
+    key = (equation, dtype.str)
+    if key not in self._domain_inverses:
+      self._domain_inverses[key] = Inverse.DomainInverse.build(forward, dtype)
+    return self._domain_inverses[key]
+
+  def bounds(
+    self,
+    equation: str,
+    variable: t.Optional[str],
+    dtype: np.dtype,
+    forward: FunctionCallTransformer.ConversionFunc
+  ) -> Interval.Interval:
+    '''
+    `Interval.conversion_bounds` of `equation` over `dtype`, shared by every `Math` of `equation` - the equation must refer to no Vars but `variable`.
+    '''
+    key = (equation, dtype.str)
+    if key not in self._bounds:
+      self._bounds[key] = Interval.conversion_bounds(self.get(equation, lambda: SharedParser), variable, dtype, forward)
+    return self._bounds[key]
+
+  def stats(self) -> CacheStats:
+    return CacheStats(self.hits, self.misses, len(self._trees))
+
+  def clear(self):
+    self._trees.clear()
+    self._compiled.clear()
+    self._affine.clear()
+    self._inverses.clear()
+    self.numeric_inverses.clear()
+    self._domain_inverses.clear()
+    self._bounds.clear()
+    self._shapes.clear()
+    self._cell_forms.clear()
+    self.hits = self.misses = self.bound = 0
+
+equation_trees = EquationTrees()
 
 # typeof np.nan
 NanType = np.float_
@@ -80,26 +292,58 @@ class Math(ExtendsParser, RefersCyclically[MathInterdependence, "Math", t.Iterab
     pass
 
   _accumulator = null_accumulator((1), )
+  _has_link = compiled_xpath("//MATH[./VAR[@type='link']]")
+  # names of the functions `_namespace` adds to the default ones, known without
+  # an instance - see `analyze`
+  provides: t.ClassVar[t.FrozenSet[str]] = frozenset()
 
   @classmethod
   def dependency_graph(cls, xdf) -> t.Mapping[Math, t.Iterable[Math]]:
-    has_link: t.Iterable[Math] = xdf.xpath("//MATH[./VAR[@type='link']]")
-    # see `Var.LinkedVar`
-    #graph = {math:  
-    #  list(map(lambda id: self.xpath(f"""
-    #    //XDFTABLE[@uniqueid='{id}']/XDFAXIS[@id='z']/MATH | 
-    #    //XDFCONSTANT[@uniqueid='{id}']/MATH
-    #    """)[0],
-    #    math.linked_ids.values()
-    #  )) for math in has_link
-    #}
+    has_link: t.Iterable[Math] = cls._has_link(xdf)
     graph = {
-      # TODO: flatten math 
-      math: list(chain.from_iterable(var.linked.Math for var in math.LinkedVars))
+      math: math._linked_Maths(math.LinkedVars)
       for math in has_link
     }
     return graph
 
+  @staticmethod
+  def _linked_Maths(linked_vars: t.Iterable[LinkedVar]) -> t.List[Math]:
+    # see `Var.LinkedVar` - a Table links all of its Z-axis `Math`, a Constant its only one
+    out: t.List[Math] = []
+    for var in linked_vars:
+      Maths = var.linked.Math
+      out.extend(Maths if isinstance(Maths, list) else [Maths])
+    return out
+
+  def analyze(self, path: t.Callable[[Math], str]) -> MathAnalysis:
+    '''
+    `MathAnalysis` of this `<MATH>`, with elements referred to by `path` - e.g. `getroottree().getpath`. Each distinct equation is parsed and walked once per process, see `equation_parser.analyze`.
+    '''
+    equation = eq.analyze(self.attrib['equation'])
+    linked = self.LinkedVars
+    return MathAnalysis(
+      definition = definition(self),
+      equation = equation,
+      links = tuple(var.link_id for var in linked),
+      dependencies = tuple(path(math) for math in self._linked_Maths(linked)),
+      undefined = frozenset(
+        name for name in equation.calls
+        if name not in FunctionCallTransformer.default_numeric and name not in self.provides
+      )
+    )
+
+  @property
+  def analysis(self) -> MathAnalysis:
+    '''
+    `analyze`, as kept by the compiled definition - or done now, for one that is not compiled yet, or when the `<MATH>` kept at this path is not this one as written, e.g. after an edit to the tree.
+    '''
+    path = self.getroottree().getpath(self)
+    compiled = self._context.compiled
+    analysis = compiled.maths.get(path) if compiled is not None else None
+    if analysis is not None and analysis.definition == definition(self):
+      return analysis
+    return self.analyze(self.getroottree().getpath)
+
   Vars: t.List[Var] = Base.xpath_synonym('./VAR', many=True)
 
   # TODO: PROBLEM WITH LINKED VARS
@@ -124,15 +368,112 @@ class Math(ExtendsParser, RefersCyclically[MathInterdependence, "Math", t.Iterab
     curried.__doc__ = parameterized.__doc__
     return curried # type: ignore
 
+  @property
+  def affine(self) -> t.Optional[Affine.Affine]:
+    '''
+    `(scale, offset)` form of the equation, if it is affine in its bound Var - e.g. `X*0.0078125`, or just `X`.
+    '''
+    form = equation_trees.affine(self.attrib['equation'])
+    if form is None or form.variable not in (var.id for var in self.Vars if type(var) == BoundVar):
+      return None
+    return form
+
   @property
   def inverse_conversion_func(self) -> FunctionCallTransformer.ConversionFunc:
     '''
     Inverse conversion func, such that inverse(conversion(bin)) = bin.
     This is used to save values to the binary.
+
+    For 8- and 16-bit integer data, this is the `domain_inverse` lookup table. Otherwise it is exact when the equation can be inverted in closed form, see `EquationTrees.inverse` - or solved numerically by `bisection_inverse`, and listed in `EquationTrees.numeric_inverses`.
+    '''
+    domain = self.domain_inverse
+    if domain is not None:
+      return domain
+    affine = self.affine
+    if affine is not None and affine.scale != 0:
+      return affine.inverse
+    forward = self.conversion_func
+    bound = [var.id for var in self.Vars if type(var) == BoundVar]
+    inverse = equation_trees.inverse(self.attrib['equation'], bound[0]) if len(bound) == 1 else None
+    if inverse is not None:
+      return functools.partial(inverse, **forward.keywords)
+    if not bound:
+      equation_trees.numeric_inverses[self.attrib['equation']] = 'no bound Var'
+    elif len(bound) > 1:
+      equation_trees.numeric_inverses[self.attrib['equation']] = f"bound Vars {', '.join(bound)}"
+    bisection = self.bisection_inverse
+    if bisection is not None:
+      return bisection
+    # pulls in scipy, which is most of the import time - only load it when needed
+    from pynverse import inversefunc
+    return inversefunc(forward)
+
+  @property
+  def bisection_inverse(self) -> t.Optional[Inverse.BisectionInverse]:
+    '''
+    Numeric inverse bracketed by the parent's `memmap_bounds`, solving whole arrays at once - when the conversion is elementwise, i.e. calls no entity functions like `CELL`.
     '''
-    return inversefunc(self.conversion_func)
+    parent = self.getparent()
+    embedded_data = getattr(parent, 'EmbeddedData', None)
+    if embedded_data is None or equation_trees.shape(self.attrib['equation']):
+      return None
+    low, high = parent.memmap_bounds
+    return Inverse.BisectionInverse(self.conversion_func, np.dtype(embedded_data.data_type), np.min(low), np.max(high))
 
   @property
+  def domain_inverse(self) -> t.Optional[Inverse.DomainInverse]:
+    '''
+    Lookup table inverse over every raw value, when the parent `<EMBEDDEDDATA>` is an 8- or 16-bit integer and the conversion is strictly monotonic over it. Kept per equation and type when it only depends on the data - otherwise built again on each write, at the current values of its linked and address Vars.
+    '''
+    equation = self.attrib['equation']
+    embedded_data = getattr(self.getparent(), 'EmbeddedData', None)
+    if embedded_data is None or equation_trees.shape(equation):
+      return None
+    dtype = np.dtype(embedded_data.data_type)
+    if dtype.kind not in 'iu' or dtype.itemsize > 2:
+      return None
+    bound = [var.id for var in self.Vars if type(var) == BoundVar]
+    # without linked or address Vars, the table only depends on the equation
+    if equation_trees.variables(equation) <= set(bound):
+      return equation_trees.domain_inverse(equation, dtype, self.conversion_func)
+    return Inverse.DomainInverse.build(self.conversion_func, dtype)
+
+  @property
+  def logical_bounds(self) -> Interval.Interval:
+    '''
+    Range of the conversion over the raw values of the parent `<EMBEDDEDDATA>` type, see `Interval.conversion_bounds` - computed once per equation and type, unless it refers to linked or address Vars, which are taken at their current values. Unbounded for equations calling entity functions like `CELL`.
+    '''
+    equation = self.attrib['equation']
+    embedded_data = getattr(self.getparent(), 'EmbeddedData', None)
+    if embedded_data is None or equation_trees.shape(equation):
+      return Interval.Interval(-np.inf, np.inf)
+    dtype = np.dtype(embedded_data.data_type)
+    bound = [var.id for var in self.Vars if type(var) == BoundVar]
+    variable = bound[0] if bound else None
+    forward = self.conversion_func
+    if equation_trees.variables(equation) <= set(bound):
+      return equation_trees.bounds(equation, variable, dtype, forward)
+    ranges = {}
+    for id, value in forward.keywords.items():
+      try:
+        ranges[id] = Interval.Interval.of(value)
+      except Interval.NotBounded:
+        ranges[id] = Interval.Interval(-np.inf, np.inf)
+    return Interval.conversion_bounds(equation_trees.get(equation, lambda: self._parser), variable, dtype, forward, ranges)
+
+  def _evaluate(self, kwargs: t.Dict[str, t.Any]) -> FunctionCallTransformer.NumericArg:
+    # vars are passed straight to the compiled equation, rather than replaced
+    # and evaluated over the tree - see `Compiler`
+    compiled = equation_trees.compiled(self.attrib['equation'], lambda: self._parser)
+    # provide implicit context - when in table (and acyclic), this is last accumulation in the full conversion
+    return compiled(**kwargs)
+
+  def _converter_stamp(self) -> t.Tuple[int, t.Optional[str]]:
+    # edits to the equation itself are common enough to follow without `Xdf.edited`
+    return edits(self), self.get('equation')
+
+  # Var values are passed on each call, so the converter is only built again once the equation or its Vars are edited
+  @context_cached_by(_converter_stamp)
   def conversion_func_parameterized(self) -> FunctionCallTransformer.ConversionFunc:
     '''
     Binary conversion function with `**kwargs` of declared Linked/Address Vars. Python is nicer with circular references, and TunerPro itself warns of circular references - but to be explicit, evaluation order uses acyclic dependency order to pass Vars as kwargs.
@@ -151,6 +492,7 @@ class Math(ExtendsParser, RefersCyclically[MathInterdependence, "Math", t.Iterab
     kwargs_signature_str = ', '.join(
       f"{var.id}: {var.__class__.__qualname__}" for var in free
     )
+    affine = self.affine
     def converter(x: npt.NDArray, **kwargs) -> npt.ArrayLike:
       # assert arguments provided by keyword - 
       # TODO: set named args in typed function signature at runtime?
@@ -158,20 +500,12 @@ class Math(ExtendsParser, RefersCyclically[MathInterdependence, "Math", t.Iterab
         raise ValueError('Invalid variables provided to conversion function.')
       # update namespace with boundvars
       kwargs.update({var.id: x for var in bound})
-      # and do full replacement before evaluating
       # ...set accumulator, so parser will be constructed correctly.
       # TODO: move accumulator/parser logic?
       self.accumulate(x)
-      replaced = Replacer.Replacer(kwargs).transform(self.equation)
-      # provide implicit context - when in table (and acyclic), this is last accumulation in the full conversion
-      evaluated = Evaluator.Evaluator().transform(replaced)
-      # ReturnType<Evaluator.Evaluator()>
-      #evaluated: npt.ArrayLike = eq.apply_pipeline(
-      #  self.equation,
-      #  Replacer.Replacer(kwargs),
-      #  Evaluator.Evaluator()
-      #)
-      return evaluated
+      if affine is not None:
+        return affine(x)
+      return self._evaluate(kwargs)
     # set docstring
     if bound:
       first_bound, *duplicate_bound = bound
@@ -186,15 +520,12 @@ class Math(ExtendsParser, RefersCyclically[MathInterdependence, "Math", t.Iterab
     #converter.__doc__ = f'{signature}\n  {body}'
     return converter
     
-  #@functools.cached_property
+  # not cached on the element - equations calling `CELL` bind the accumulator at
+  # transform time, see `EquationTrees`
   @property
   def equation(self) -> FunctionCallTransformer.FunctionTree:
-    equation_str = self.attrib['equation']
     # transform into function-call AST
-    equation_ast = self._parser.transform(
-      eq.parser(equation_str)
-    )
-    return equation_ast
+    return equation_trees.get(self.attrib['equation'], lambda: self._parser)
 
   def __repr__(self):
     equation_str = self.attrib['equation']
@@ -1,4 +1,4 @@
-from .Base import Base, XmlAbstractBaseMeta, XdfRefMixin, ArrayLike
+from .Base import Base, XmlAbstractBaseMeta, XdfRefMixin, ArrayLike, compiled_xpath
 from abc import ABC
 import numpy as np
 import numpy.typing as npt
@@ -17,10 +17,19 @@ class Parameter(Categorized, Base, XdfRefMixin, ABC, metaclass=XmlAbstractBaseMe
   id: str = Base.xpath_synonym('./@uniqueid')
   title: str = Base.xpath_synonym('./title/text()')
   description: T.Optional[str] = Base.xpath_synonym('./description/text()')
+  _vislevel = compiled_xpath('./@vislevel')
+
+  def _init(self):
+    # lxml calls this whenever it makes a proxy for the element - a lazily 
+    # loaded `Xdf` materializes the parameter the first time that happens
+    lazy = self._context.lazy
+    if lazy is not None:
+      lazy.materialize(self)
+
   # when None, always visible. TODO: actually implement
   @property
   def visibiity(self) -> T.Optional[int]:
-    out = self.xpath('./@vislevel')
+    out = self._vislevel(self)
     return int(out[0]) if out else None
 
   def __repr__(self):
@@ -44,6 +53,9 @@ class Clamped(Base):
 
   TODO: implement defaults
   '''
+  _min = compiled_xpath('./min/text()')
+  _max = compiled_xpath('./max/text()')
+
   @property
   def flags(self) -> ParameterFlags:
     # if this was in Parameter class...
@@ -54,12 +66,12 @@ class Clamped(Base):
     
   @property
   def min(self) -> T.Optional[float]:
-    out = self.xpath('./min/text()')
+    out = self._min(self)
     return float(out[0]) if out and ParameterFlags.MIN_CLAMPED in self.flags else None
   
   @property
   def max(self) -> T.Optional[float]:
-    out = self.xpath('./max/text()')
+    out = self._max(self)
     return float(out[0]) if out and ParameterFlags.MAX_CLAMPED in self.flags else None
 
   def clamped(self, x: ArrayLike) -> ArrayLike:
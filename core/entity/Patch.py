@@ -1,6 +1,6 @@
 from __future__ import annotations
 import typing as t
-from .Base import Base, XdfRefMixin
+from .Base import Base, XdfRefMixin, compiled_xpath, context_cached_by
 from .Parameter import Parameter
 from .EmbeddedData import print_array, hex_to_array
 import numpy as np
@@ -30,6 +30,8 @@ class PatchEntry(Base, XdfRefMixin):
   for overwrting a section of binary data.
   '''
   name = Base.xpath_synonym('./@name')
+  _patchdata = compiled_xpath('./@patchdata')
+  _basedata = compiled_xpath('./@basedata')
 
   @property
   def address(self) -> int:
@@ -51,21 +53,24 @@ class PatchEntry(Base, XdfRefMixin):
     DE AD BE EF gh gh g -> DE AD BE EF 00 00 0
     
     '''
-    hex_str = self.xpath('./@patchdata')[0]
+    hex_str = self._patchdata(self)[0]
     #. e.g. ['D' 'E' 'A' 'D' 'B' 'E' 'E' 'F']
     return hex_to_array(hex_str, self.size)
 
   @property
   def original(self) -> t.Optional[npt.NDArray[np.uint8]]:
-    hex_str_query = self.xpath('./@basedata')
+    hex_str_query = self._basedata(self)
     hex_str = hex_str_query[0] if len(hex_str_query) > 0 else None
     return hex_to_array(hex_str, self.size) if hex_str else None
 
-  # see `EmbeddedData`.memory_map
-  @property
+  def _window(self) -> t.Tuple[t.Optional[str], t.Optional[str]]:
+    return self.get('address'), self.get('datasize')
+
+  # see `EmbeddedData`.memory_map - mapped again when the address or size is edited
+  @context_cached_by(_window)
   def memory_map(self) -> np.memmap:
     return np.memmap(
-      self._xdf._binfile,
+      self._context.binfile,
       shape = (self.size, ),
       # TODO - account for XDF header base offset?
       offset = self.address + self._xdf._bin_internals['base_offset'],
@@ -85,6 +90,7 @@ class PatchEntry(Base, XdfRefMixin):
     Applies the patch to the specifed map data.
     '''
     self.memory_map[:] = self.patch[:]
+    self._context.writes += 1
     # TODO: FlushPool mixin?
     self.memory_map.flush()
     pass
@@ -96,6 +102,7 @@ class PatchEntry(Base, XdfRefMixin):
     if self.original is None:
       raise UnpatchableError(self)
     self.memory_map[:] = self.original[:]
+    self._context.writes += 1
     self.memory_map.flush()
   
   def __repr__(self):
@@ -1,8 +1,8 @@
 import typing as t
 from core.equation_parser.transformations.Evaluator import Evaluator
-from core.equation_parser.transformations.FunctionCallTransformer import FunctionCallTransformer, NumericArg
-from .Base import Base, ArrayLike, ExtendsParser, ReferenceQuantified
-from .Math import Math
+from core.equation_parser.transformations.FunctionCallTransformer import FunctionCallTransformer, NumericArg, ConversionFunc
+from .Base import Base, ArrayLike, ExtendsParser, ReferenceQuantified, context_cached_by, edits, revision
+from .Math import Math, equation_trees
 from .Axis import QuantifiedEmbeddedAxis
 # to avoid circular import
 from .Axis import XYAxis
@@ -13,11 +13,13 @@ import functools
 from itertools import chain
 from collections import ChainMap
 from .Mask import Mask, MaskedMath
+from . import Lookup
 import pint
 
 _math = Math
 
 class ZAxisMath(MaskedMath):
+  provides = frozenset({'CELL', 'ROW', 'COL', 'ROWS', 'COLS'})
 
   def accumulate(self, x: npt.NDArray):
     '''
@@ -26,7 +28,7 @@ class ZAxisMath(MaskedMath):
     - 1 `GlobalMath`,
     - n `RowMath`, n `ColumnMath`
     - n*n `CellMath`
-    ...performed with mask exclusion. See `ZAxis.table_convert`, `ZAxis._mask_reduction`.
+    ...performed with mask exclusion. See `ZAxis.table_convert`, `ZAxis.owner_map`.
     '''
     self._accumulator = x
 
@@ -64,8 +66,8 @@ class ZAxisMath(MaskedMath):
 
 class GlobalMath(ZAxisMath):
   @property
-  def mask(self) -> Mask:
-    return Mask(np.zeros(self.shape).astype(np.ma.MaskType))
+  def region(self):
+    return (Ellipsis, )
 
 class RowMath(ZAxisMath):
   def row(self):
@@ -83,10 +85,8 @@ class RowMath(ZAxisMath):
     return int(self.attrib['row']) - 1
 
   @property
-  def mask(self) -> Mask:
-    out = np.zeros(self.shape)
-    out[self.row_idx] = np.ones(self.shape[0])
-    return Mask(np.logical_not(out))
+  def region(self):
+    return (self.row_idx, )
 
 class ColumnMath(ZAxisMath):
   
@@ -105,10 +105,8 @@ class ColumnMath(ZAxisMath):
     return int(self.attrib['col']) - 1
 
   @property
-  def mask(self) -> Mask:
-    out = np.zeros(self.shape)
-    out[ :, self.column_idx] = np.ones(self.shape[1])
-    return Mask(np.logical_not(out))
+  def region(self):
+    return (slice(None), self.column_idx)
 
 class CellMath(ZAxisMath):
   def row(self):
@@ -130,10 +128,21 @@ class CellMath(ZAxisMath):
     return int(self.attrib['col']) - 1
 
   @property
-  def mask(self) -> Mask:
-    out = np.zeros(self.shape)
-    out[self.row_idx][self.column_idx] = 1
-    return Mask(np.logical_not(out))
+  def region(self):
+    return (self.row_idx, self.column_idx)
+
+class OwnerMap(t.NamedTuple):
+  '''
+  Precedence of the `Math` of a `ZAxis`, resolved per cell - see `ZAxis.owner_map`.
+  '''
+  # in order of lowest to highest precedence
+  Maths: t.List[MaskedMath]
+  # per cell, the index into `Maths` of the one converting it - -1 where none does
+  owner: npt.NDArray[np.intp]
+  # per `Math`, flat indices of the cells it converts...
+  cells: t.List[npt.NDArray[np.intp]]
+  # ...and whether it can be evaluated on those cells alone
+  gathered: t.List[bool]
 
 class ZAxis(ReferenceQuantified, QuantifiedEmbeddedAxis, Clamped):
   # ZAxis doesn't extend parser directly, but provides pattern for axis math to use CELL
@@ -156,120 +165,124 @@ class ZAxis(ReferenceQuantified, QuantifiedEmbeddedAxis, Clamped):
   row_Math: t.List[RowMath] = Base.xpath_synonym('./MATH[@row and not(@col)]', many=True)
   cell_Math: t.List[CellMath] = Base.xpath_synonym('./MATH[@row and @col]', many=True)
 
-  @staticmethod
-  def _combine_masks(*masks: Mask, initial: t.Optional[Mask] = None) -> Mask:
-    # un-invert combined mask...
-    reducer = lambda a, b: np.logical_not(
-      # ... after inverting masks so that OR works
-      np.ma.mask_or(np.logical_not(a), np.logical_not(b), shrink=False)
-    )
-    if initial is not None:
-      return functools.reduce(reducer, masks, initial) # type: ignore
-    else:
-      return functools.reduce(reducer, masks) # type: ignore
-
-  def _mask_reduction(
-    self,
-    accumulator: np.ma.MaskedArray,
-    type_math: t.Tuple[t.Type[MaskedMath], MaskedMath],
-    group_masks: t.Dict[t.Type[MaskedMath], Mask],
-    inverse = False
-  ):
+  @context_cached_by(edits)
+  def owner_map(self) -> OwnerMap:
     '''
-    Used internally in `Table.ZAxis`'s binary conversion, where each `math: MaskedMath` takes a masked view of an original array and converts parts incrementally.
+    Which `Math` converts each cell, resolved again only after `Xdf.edited`. In order of lowest to highest precedence:
+    1. Global table equation
+    2. Column equations
+    3. Row equations
+    4. Cell equations
+
+    ...so a cell equation takes its cell from a row or column equation, and a row equation takes its cells from column equations. Of two equations for the same row or column, the later one in the definition wins. TunerPro represents this as an equation grid in the UI.
     '''
-    type, math = type_math
-    # do exclusion of current mask with group masks...
-    other_group_masks = {
-      klass: mask for klass, mask in group_masks.items()
-      if klass is not type
-    }
-    # construct final mask
-    overrides = [CellMath, RowMath]
-    # these are NOT excluded - they have to have their masks subtracted from others
-    if type not in overrides:
-      # other masks may be empty, in the case of only global equation
-      combined_exclusion: npt.NDArray = np.logical_not(
-        self._combine_masks(*other_group_masks.values())
-      ) if other_group_masks else np.ma.nomask
-      # ...combine other groups' exclusion with our own mask
-      final_mask = np.ma.mask_or(combined_exclusion, math.mask, shrink=False)
-    # these just use their own mask, they override
-    else:
-      final_mask = math.mask
-    # ...evaluate
-    converter = math.conversion_func if not inverse else math.inverse_conversion_func
-    converted = converter(accumulator)
-    # converted array may be Quantity or Array, depending on if referenced values had units or not.
-    # putmask uses opposite of convention, so True = valid
-    # TODO: subclass `pint.Quantity` to provide `np.putmask`?
-    to_put = np.array(converted)
-    np.putmask(accumulator, np.logical_not(final_mask), to_put)
-    return accumulator
+    Maths: t.List[MaskedMath] = [
+      *(math for math in [self.global_Math] if math is not None),
+      *self.column_Math,
+      *self.row_Math,
+      *self.cell_Math,
+    ]
+    owner = np.full(self.EmbeddedData.shape, -1, dtype = np.intp)
+    for index, math in enumerate(Maths):
+      owner[math.region] = index
+    # cells of each `Math` are runs of the cells sorted by owner
+    flat = owner.reshape(-1)
+    order = np.argsort(flat, kind = 'stable')
+    starts = np.searchsorted(flat[order], np.arange(len(Maths) + 1))
+    return OwnerMap(
+      Maths = Maths,
+      owner = owner,
+      cells = [order[start:end] for start, end in zip(starts[:-1], starts[1:])],
+      # entity functions (`CELL`, `ROW`...) and linked tables need the whole table
+      gathered = [
+        not math.analysis.links and not equation_trees.shape(math.attrib['equation'])
+        for math in Maths
+      ]
+    )
 
   def table_convert(self, x: npt.NDArray, inverse = False):
     '''
-    Equations are replaced by the following in order from lowest to highest priority:
-    1. Global table equation
-    2. Row equations
-    3. Column equations
-    4. Cell equations
+    Each `Math` converts only the cells it owns, see `owner_map` - in order of precedence, so `CELL(...; FALSE)` sees the cells converted before it. Elementwise equations are evaluated on their cells alone, others over the whole table with their cells gathered from the result.
+    '''
+    accumulator = np.ascontiguousarray(x)
+    # a view - cells are scattered into `accumulator`
+    flat = accumulator.reshape(-1)
+    owner_map = self.owner_map
+    for math, cells, gathered in zip(owner_map.Maths, owner_map.cells, owner_map.gathered):
+      # overridden everywhere
+      if not len(cells):
+        continue
+      converter = math.conversion_func if not inverse else math.inverse_conversion_func
+      # converted array may be Quantity or Array, depending on if referenced values had units or not.
+      # TODO: subclass `pint.Quantity` to provide `np.putmask`?
+      if len(cells) == flat.size:
+        converted = converter(accumulator)
+        np.copyto(accumulator, getattr(converted, 'magnitude', converted))
+      elif gathered:
+        converted = converter(flat[cells])
+        flat[cells] = getattr(converted, 'magnitude', converted)
+      else:
+        converted = converter(accumulator)
+        converted = np.broadcast_to(getattr(converted, 'magnitude', converted), accumulator.shape)
+        flat[cells] = converted.reshape(-1)[cells]
+    return accumulator
 
-    TunerPro represents an equation grid in the UI.
+  @property
+  def logical_bounds(self) -> t.Tuple[ArrayLike, ArrayLike]:
     '''
-    # see https://github.com/python/mypy/issues/1178 - linter can't discern the explicit length check here. "Table" could be 1D - remember numpy shape convention
-    #if len(self.EmbeddedData.shape) == 2:
-    #  cols = self.EmbeddedData.shape[1] # type: ignore
-    #elif len(self.EmbeddedData.shape) == 1:
-    #  cols = 1
-    #else:
-    #  raise ValueError(f"Incorrect shape {self.EmbeddedData.shape} for Table.ZAxis when constructing equation grid.")
-
-    # TABLE MATH CONVERSION
-    # ...in order of lowest to highest precedence
-    math_groups: t.Dict[t.Type[MaskedMath], t.List[MaskedMath]] = {
-      GlobalMath: [self.global_Math],
-      ColumnMath: self.column_Math,
-      RowMath: self.row_Math,
-      CellMath: self.cell_Math,
-    }
-    # ...only eval non-empty
-    math_groups_nonempty = {
-      klass: maths for klass, maths in math_groups.items()
-      if maths
-    }
-    # ...masks must be subtracted - combine masks amongst groups
-    combined_masks = {
-      klass: self._combine_masks(
-        *map(lambda math: math.mask, maths)
-      )
-      for klass, maths in math_groups_nonempty.items()
-      # global math doesn't belong here
-      if klass is not GlobalMath
-    }
-    # ...flatten out into tuple of (Type, MaskedMath instance)
-    flattened = (
-      ((type, math) for math in maths)
-      for type, maths in math_groups_nonempty.items()
-    )
-    # reduce, providing combined group masks
-    out = functools.reduce(
-      functools.partial(
-        self._mask_reduction,
-        group_masks = combined_masks,
-        inverse = inverse
-      ),
-      chain.from_iterable(flattened),
-      x
-    )
+    Logical bounds of each cell, by the `Math` converting it - scalars when one equation converts the whole table.
+    '''
+    if len(self.Math) == 1:
+      bounds = self.Math[0].logical_bounds
+      return bounds.low, bounds.high
+    low, high = np.full(self.EmbeddedData.shape, -np.inf), np.full(self.EmbeddedData.shape, np.inf)
+    owner_map = self.owner_map
+    for math, cells in zip(owner_map.Maths, owner_map.cells):
+      if len(cells):
+        bounds = math.logical_bounds
+        low.reshape(-1)[cells] = bounds.low
+        high.reshape(-1)[cells] = bounds.high
+    return low, high
+
+  @context_cached_by(edits)
+  def global_only(self) -> t.Optional[GlobalMath]:
+    '''
+    The global `Math` of a table converted by it alone - nearly every table is - or `None`. Resolved again after `Xdf.edited`.
+    '''
+    Maths = self.Math
+    return Maths[0] if len(Maths) == 1 and isinstance(Maths[0], GlobalMath) else None
+
+  @property
+  def one_shot_Math(self) -> t.Optional[Math]:
+    return self.global_only
+
+  @staticmethod
+  def _whole_table(x: npt.NDArray, converter: ConversionFunc) -> npt.NDArray:
+    # converted array may be Quantity or Array, depending on if referenced values had units or not
+    converted = converter(x)
+    out = np.asarray(getattr(converted, 'magnitude', converted), dtype = np.float_)
+    # e.g. `X` returns the data itself, and constant equations a scalar
+    if out.shape != x.shape or np.may_share_memory(out, x):
+      out = np.array(np.broadcast_to(out, x.shape))
     return out
 
   def to_embedded(self, x: npt.NDArray) -> ArrayLike:
+    math = self.global_only
+    if math is not None:
+      return self._whole_table(np.asarray(x, dtype = np.float_), math.inverse_conversion_func)
     copy = x.copy().astype(np.float_)
     out = self.table_convert(copy, inverse=True)
     return out
 
   def from_embedded(self, x: npt.NDArray) -> ArrayLike:
+    '''
+    Tables with only a global equation are converted in one call, straight from `x` - others through `table_convert`.
+    '''
+    math = self.global_only
+    if math is not None:
+      # `Affine` needs no Vars or accumulator, as in `batch_from_embedded`
+      affine = math.affine
+      return self._whole_table(np.asarray(x, dtype = np.float_), affine if affine is not None else math.conversion_func)
     copy = x.copy().astype(np.float_)
     out = self.table_convert(copy)
     return out
@@ -289,5 +302,25 @@ class Table(Parameter):
   @value.setter
   def value(self, value: pint.Quantity):
     self.z.value = value
+
+  # unit of `lookup` results, from the XML - parsed on every access of `z.unit`, which takes longer than most lookups
+  @context_cached_by(edits)
+  def _lookup_unit(self) -> t.Optional[pint.Unit]:
+    return self.z.unit
+
+  # axes may be linked to other parameters, so any write to the binary makes it again
+  @context_cached_by(revision)
+  def grid(self) -> Lookup.Grid:
+    '''
+    Z values over the y and x breakpoints, for `lookup` - made again only after a write to the binary, or `Xdf.edited`.
+    '''
+    return Lookup.Grid.build(self.z.value.magnitude, self.y.value.magnitude, self.x.value.magnitude)
+
+  def lookup(self, x: npt.ArrayLike, y: npt.ArrayLike, method: Lookup.Method = 'bilinear') -> pint.Quantity:
+    '''
+    Z values at each (`x`, `y`) coordinate, broadcast together - `nearest`, or interpolated `bilinear`ly, and clamped to the edges of the table, as TunerPro does. Coordinates given as quantities are taken in the units of their axis.
+    '''
+    out = self.grid(Lookup.magnitude(y, self.y), Lookup.magnitude(x, self.x), method = method)
+    return pint.Quantity(out, self._lookup_unit)
     
 __all__ = ['Table']
\ No newline at end of file
@@ -0,0 +1,98 @@
+from __future__ import annotations
+import typing as t
+import threading
+from enum import Enum
+from lxml import etree as xml
+
+class ValidationStatus(Enum):
+  PENDING = 'pending'
+  VALID = 'valid'
+  INVALID = 'invalid'
+
+class Validation:
+  '''
+  Schema validation of one XDF source, see `Xdf.validation`. Either done while parsing, known from a previous validation of the same content, or deferred to a background thread so the document is usable right away.
+  '''
+  status: ValidationStatus
+  # validity was known from the content hash, not checked this time
+  cached: bool
+  error: t.Optional[xml.DocumentInvalid] = None
+  _done: threading.Event
+
+  def __init__(self, status: ValidationStatus, cached: bool = False):
+    self.status = status
+    self.cached = cached
+    self._done = threading.Event()
+    if status is not ValidationStatus.PENDING:
+      self._done.set()
+
+  @classmethod
+  def deferred(
+    cls,
+    source: bytes,
+    schema: xml.XMLSchema,
+    on_valid: t.Callable[[], t.Any] = lambda: None
+  ) -> Validation:
+    '''
+    Validates `source` against `schema` on a daemon thread, calling `on_valid` from it on success.
+
+    The source is parsed again there rather than validating the loaded tree - lxml documents must not be used from two threads at once.
+    '''
+    validation = cls(ValidationStatus.PENDING)
+    thread = threading.Thread(
+      target = validation._run,
+      args = (source, schema, on_valid),
+      name = 'xdf-validation',
+      daemon = True
+    )
+    thread.start()
+    return validation
+
+  @classmethod
+  def run(
+    cls,
+    source: bytes,
+    schema: xml.XMLSchema,
+    on_valid: t.Callable[[], t.Any] = lambda: None
+  ) -> Validation:
+    '''
+    Validates `source` against `schema` now, on this thread - as `deferred`, but done when it returns.
+    '''
+    validation = cls(ValidationStatus.PENDING)
+    validation._run(source, schema, on_valid)
+    return validation
+
+  def _run(self, source: bytes, schema: xml.XMLSchema, on_valid: t.Callable[[], t.Any]):
+    # parsers are not shared between threads, this one is only used here
+    parser = xml.XMLParser(schema = schema, remove_blank_text = True)
+    try:
+      xml.fromstring(source, parser)
+    except xml.XMLSyntaxError as error:
+      self.error = xml.DocumentInvalid(str(error), parser.error_log.filter_domains(xml.ErrorDomains.SCHEMASV))
+      self.status = ValidationStatus.INVALID
+    else:
+      self.status = ValidationStatus.VALID
+      on_valid()
+    finally:
+      self._done.set()
+
+  @property
+  def done(self) -> bool:
+    return self._done.is_set()
+
+  def wait(self, timeout: t.Optional[float] = None) -> ValidationStatus:
+    '''
+    Blocks until validation finishes, or `timeout` seconds pass - then returns the status so far.
+    '''
+    self._done.wait(timeout)
+    return self.status
+
+  def result(self, timeout: t.Optional[float] = None):
+    '''
+    Blocks until validation finishes, raising its `DocumentInvalid` if the source did not validate.
+    '''
+    if self.wait(timeout) is ValidationStatus.INVALID:
+      raise t.cast(xml.DocumentInvalid, self.error)
+
+  def __repr__(self):
+    return f"<{self.__class__.__qualname__} {self.status.value}{' (cached)' if self.cached else ''}>"
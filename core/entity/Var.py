@@ -1,7 +1,7 @@
 from __future__ import annotations
 import typing as t
 from abc import ABC, abstractmethod
-from .Base import Base, XmlAbstractBaseMeta, XdfRefMixin, ArrayLike
+from .Base import Base, XmlAbstractBaseMeta, XdfRefMixin, ArrayLike, compiled_xpath
 import numpy as np
 import numpy.typing as npt
 
@@ -41,10 +41,10 @@ class LinkedVar(FreeVar):
 
   @property
   def linked(self) -> Mathable:
-      return self.xpath(f"""
-      //XDFTABLE[@uniqueid='{self.link_id}']/XDFAXIS[@id='z'] |
-      //XDFCONSTANT[@uniqueid='{self.link_id}']
-    """)[0]
+    # select the parameter itself, rather than a path into it - on a lazily 
+    # loaded `Xdf`, that is what materializes it
+    parameter = self._xdf.parameter(self.link_id, 'XDFTABLE', 'XDFCONSTANT')
+    return parameter.z if parameter.tag == 'XDFTABLE' else parameter
 
   @property
   def value(self) -> ArrayLike:
@@ -58,19 +58,22 @@ class AddressVar(FreeVar):
   Reference to raw binary data with toggles for endianness and bit length.
   This is similar to BoundVar context, but with global binary file scope and options belonging to the Var instance.
   '''
+  _address = compiled_xpath('./@address')
+  _flags = compiled_xpath('./@flags')
+
   @property
   def address(self) -> t.Optional[int]:
-    address = self.xpath('./@address')
+    address = self._address(self)
     return int(address[0], 16) if address else None
   
   @property
   def flags(self) -> int:
-    return int(self.xpath('./@flags')[0], 16)
+    return int(self._flags(self)[0], 16)
 
   @property
   def value(self):
     return np.memmap(
-      self._xdf._binfile,
+      self._context.binfile,
       shape = (1, ),
       offset = self.address,
       dtype = np.uint8
@@ -3,11 +3,14 @@ from types import NoneType
 import typing as t
 from lxml import etree as xml, objectify
 import os
+import io
+import contextlib
+import functools
 from pathlib import Path
 # import parameter classes
-from .Base import Base
+from .Base import ArrayLike, Base, XdfRefMixin, compiled_xpath
 from . import (
-  Parameter, Table, Constant, EmbeddedData, Var, Math, Axis, Function, Category, Patch, Flag
+  Parameter, Table, Constant, EmbeddedData, Var, Math, Axis, Function, Category, Patch, Flag, Cache, Lazy, Context, Validation
 )
 
 # export these errors for callers
@@ -15,26 +18,28 @@ Mathable = Axis.QuantifiedEmbeddedAxis | Table.ZAxis | Constant.Constant
 UnpatchableError = Patch.UnpatchableError
 EmbeddedValueError = EmbeddedData.EmbeddedValueError
 CellEquationCalculationError = Axis.CellEquationCalculationError
+MathNamespaceError = Math.MathNamespaceError
 # ... and allow these to be suppressed - mypy needs explicit `TypeAlias`
 # see https://mypy.readthedocs.io/en/stable/common_issues.html#variables-vs-type-aliases
-Ignorable: t.TypeAlias = EmbeddedData.EmbeddedValueError | Math.MathInterdependence | Axis.AxisInterdependence | Axis.CellEquationCalculationError
+Ignorable: t.TypeAlias = EmbeddedData.EmbeddedValueError | Math.MathInterdependence | Axis.AxisInterdependence | Axis.CellEquationCalculationError | Math.MathNamespaceError
 
-# this is import-time
 core_path = Path(__file__).parent.parent
 schemata_path = os.path.join(core_path, 'schemata')
 xdf_schema_path = 'xdf_schema.xsd'
-try:  
-  xdf_schema = xml.XMLSchema(
-    file = os.path.join(schemata_path, xdf_schema_path)
-  )
-except xml.XMLSchemaParseError as schema_error:
-  print(f"XDF: Invalid schema '{xdf_schema_path}'.")
-  raise schema_error
-
-class Xdf(Base):
-  # internals
-  _path: Path
-  _binfile: t.BinaryIO
+
+# compiled on first validation, rather than at import
+@functools.cache
+def xdf_schema() -> xml.XMLSchema:
+  try:  
+    return xml.XMLSchema(
+      file = os.path.join(schemata_path, xdf_schema_path)
+    )
+  except xml.XMLSchemaParseError as schema_error:
+    print(f"XDF: Invalid schema '{xdf_schema_path}'.")
+    raise schema_error
+
+class Xdf(Base, XdfRefMixin):
+  # internals - path, binary, load-time results are in `_context`
   # public
   title: str = Base.xpath_synonym('./XDFHEADER/deftitle/text()')
   description: str = Base.xpath_synonym('./XDFHEADER/description/text()')
@@ -50,72 +55,190 @@ class Xdf(Base):
     './XDFTABLE | ./XDFCONSTANT | ./XDFFUNCTION | ./XDFPATCH | ./XDFFLAG', 
     many=True
   )
+  _region = compiled_xpath('./XDFHEADER/REGION')
+  _base_offset = compiled_xpath('./XDFHEADER/BASEOFFSET')
+  _count_ids = compiled_xpath('count(./*[@uniqueid])')
 
   # TODO: type this
   @property
   def _bin_internals(self) -> t.Dict[str, t.Any]:
     '''
     Internal binary details - base offset, start address. Parameters use this to convert from binary to numerical data.
+    Read from the header once per document.
     '''
-    out = dict(self.xpath('./XDFHEADER/REGION')[0].attrib)
+    context = self._context
+    if context.bin_internals is not None:
+      return context.bin_internals
+    out = dict(self._region(self)[0].attrib)
     # cast and replace hex literals
     out['size'] = int(out['size'], base = 16)
     # base offset belongs here
-    base_offset_attr = self.xpath('./XDFHEADER/BASEOFFSET')[0].attrib
+    base_offset_attr = self._base_offset(self)[0].attrib
     magnitude = int(base_offset_attr['offset'], 16)
     base_offset = -magnitude if bool(int(base_offset_attr['subtract'])) else magnitude
     out['base_offset'] = base_offset
+    context.bin_internals = out
     return out
 
+  def _layout(self, embedded_data: EmbeddedData.EmbeddedData) -> EmbeddedData.Layout:
+    '''
+    `EmbeddedData.layout`, as compiled at load time - by its attributes, see `Cache.layout_key`.
+    '''
+    compiled = self._context.compiled
+    if compiled is None:
+      return embedded_data.layout
+    layout = compiled.layouts.get(Cache.layout_key(embedded_data))
+    return layout if layout is not None else embedded_data.layout
+
+  def _element_at(self, path: str) -> xml._Element:
+    '''
+    Element at a `getpath` path, like those in `Cache.CompiledDefinition`. On a lazily loaded definition, the parameter holding it is materialized first.
+    '''
+    tree = self.getroottree()
+    lazy = self._context.lazy
+    if lazy is not None:
+      # e.g. '/XDFFORMAT/XDFTABLE[4]/XDFAXIS[2]/MATH' -> '/XDFFORMAT/XDFTABLE[4]'
+      for owner in tree.xpath('/'.join(path.split('/')[:3])):
+        lazy.materialize(owner)
+    return tree.xpath(path)[0]
+
+  def edited(self):
+    '''
+    Records an edit to the tree made with lxml - e.g. a `<MATH>` or `<VAR>` added, removed or changed - or a write to a `memory_map`, so state derived from them is computed again: converters, equation grids and lookups. Only the `equation` of a `<MATH>` is followed without it, by its own converter; writes by `value` or patches are always followed.
+    '''
+    self._context.edits += 1
+    self._context.writes += 1
+
+  def materialize_all(self):
+    '''
+    Materializes everything indexed in a lazily loaded definition not yet materialized - every `Parameter`, and others like `<XDFCHECKSUM>`. Nothing to do for one loaded in full.
+    '''
+    lazy = self._context.lazy
+    if lazy is None:
+      return
+    for child in self:
+      lazy.materialize(child)
+
   @classmethod
   def from_path(
     cls, 
     path: Path, 
     binpath: Path, 
-    *ignore: t.Iterable[Ignorable]
+    *ignore: t.Iterable[Ignorable],
+    cache: t.Optional[Cache.DefinitionCache] = None,
+    lazy: bool = False,
+    defer_validation: bool = False,
+    check: bool = True
   ):
-    # ...validate
-    #xdf_tree = xml.fromstring(string)
-    xdf_tree = xml.parse(path)
+    '''
+    Opens an XDF definition against a binary.
+
+    With `lazy`, only the header and an index of `Parameter`s are read up front - each parameter is materialized on first use, see `Lazy.LazyDefinition`. Sanity checks need the whole definition, so unless `cache` has it compiled, every parameter is materialized for them on the first open, and the compiled definition stored for the next - pass `check = False` to skip them, and call `check` when needed.
+
+    Schema validation is skipped for content already known to be valid, see `Cache.is_valid`. With `defer_validation`, it runs on a background thread instead of during the parse - errors are then reported through `validation` rather than raised, including an invalid definition failing its load-time checks, which is then validated there and then.
+    '''
+    source = Path(path).read_bytes()
+    digest = Cache.digest(source)
+    # a compiled definition was validated when it was compiled
+    compiled = cache.load(digest) if cache is not None else None
+    known_valid = compiled is not None or Cache.is_valid(digest, cache)
+    schema = xdf_schema() if not (known_valid or defer_validation) else None
+    # ...parse, validate and objectify in one pass - the typed tree is built by the
+    # same parser that checks the schema, so the definition is only read once
+    parser = xdf_parser(schema = None if lazy else schema)
+    # lxml hands out copies of error logs, so keep what to read it from after a failure
+    logged: t.Union[xml.XMLParser, xml.iterparse] = parser
     try:
-      xdf_schema.assertValid(xdf_tree)
-    except xml.DocumentInvalid as error:
+      if lazy:
+        # ...or stream over it once, validating and indexing
+        events = xml.iterparse(io.BytesIO(source), schema = schema, remove_blank_text = True)
+        logged = events
+        xdf: Xdf = Lazy.index_definition(source, events, parser)
+        xdf.getroottree().docinfo.URL = str(path)
+      else:
+        xdf = xml.fromstring(source, parser, base_url = str(path))
+    except xml.XMLSyntaxError as error:
       print(f"XDF '{path}' not validated against schema '{xdf_schema_path}'.")
+      # schema violations found during the parse are reported as syntax errors
+      # by lxml - keep raising `DocumentInvalid` for them, like `assertValid` did
+      schema_errors = logged.error_log.filter_domains(xml.ErrorDomains.SCHEMASV)
+      if schema_errors:
+        raise xml.DocumentInvalid(str(error), schema_errors) from error
       raise error
-    # ...objectify - bind classes
-    parser = objectify.makeparser(schema = xdf_schema)
-    # TODO: singleton XdfTyper
-    parser.set_element_class_lookup(XdfTyper())
-    xdf: Xdf = objectify.fromstring(xml.tostring(xdf_tree), parser)    
-    # ...set python special vars
-    xdf._path = Path(path)
-    xdf._binfile = open(binpath, 'r+b')
-    # SANITY CHECKS 
-    # - check cyclical references, ignoring those specified. you may want to ignore acyclic references to open edit-only UI and prompt user to fix it.
-    # - multiple "CELL" funcs with precalc=False - this crashes TunerPro!
+    # ...set document context
+    context = xdf._context
+    context.root = xdf
+    xdf.reindex()
+    context.path = Path(path)
+    context.binfile = open(binpath, 'r+b')
+    context.digest = digest
+    context.cache = cache
+    deferred = not (known_valid or schema is not None)
+    loaded = compiled is not None
+    # ...only keep what passed validation - including a definition compiled by `check` in the meantime
+    def on_valid():
+      Cache.mark_valid(digest, cache)
+      if not loaded and context.compiled is not None and cache is not None:
+        cache.store(context.compiled)
+    # ...compile - equation analysis, dependency graphs and layouts, unless cached
+    context.compiled = compiled
+    try:
+      if not (loaded or lazy):
+        context.compiled = Cache.compile_definition(xdf, digest)
+      if check:
+        xdf.check(*ignore)
+    except Exception:
+      # not validated yet, an invalid definition fails anywhere in here instead -
+      # report it through `validation`, where the parse would raise `DocumentInvalid`
+      if not deferred:
+        raise
+      validation = Validation.Validation.run(source, xdf_schema(), lambda: Cache.mark_valid(digest, cache))
+      if validation.status is not Validation.ValidationStatus.INVALID:
+        raise
+      context.validation = validation
+      return xdf
+    if not deferred:
+      context.validation = Validation.Validation(Validation.ValidationStatus.VALID, cached = known_valid)
+      on_valid()
+    else:
+      context.validation = Validation.Validation.deferred(source, xdf_schema(), on_valid)
+    return xdf
+
+  def check(self, *ignore: t.Iterable[Ignorable]):
+    '''
+    SANITY CHECKS, done by `from_path` at load time:
+    - check cyclical references, ignoring those specified. you may want to ignore acyclic references to open edit-only UI and prompt user to fix it.
+    - multiple "CELL" funcs with precalc=False - this crashes TunerPro!
+    - calls to functions an equation's `<MATH>` does not provide, e.g. `ROW` in a Constant.
+
+    A lazily loaded definition is fully materialized to compile it, the first time this is called - and the compiled definition stored, once the source is known valid.
+    '''
+    context = self._context
+    if context.compiled is None:
+      self.materialize_all()
+      context.compiled = Cache.compile_definition(self, t.cast(str, context.digest))
+      validation = context.validation
+      if context.cache is not None and validation is not None and validation.status is Validation.ValidationStatus.VALID:
+        context.cache.store(context.compiled)
+    compiled = context.compiled
     try:
       # this must be fully evaluated to see if it is cyclical
-      math_ok = Math.Math.acyclic(xdf)
-      axes_ok = Axis.AxisLinked.acyclic(xdf)
+      math_ok = Math.Math.acyclic_paths(self, compiled.math_graph)
+      axes_ok = Axis.AxisLinked.acyclic_paths(self, compiled.axis_graph)
       # check for cell funcs with multiple precalc=False, to prevent UB/crashes in original TunerPro
-      all_math: t.Iterable[Math.Math] = xdf.xpath("//MATH")
-      #counter = Axis.CellCounter()
-      math_to_count = map(
-        # counter.transform
-        # new counter for each math
-        lambda m: (m, Axis.CellCounter().transform(m.equation)),
-        all_math
-      )
       invalid = next(
-        filter(
-          lambda math_count: math_count[1] > 1,
-          math_to_count
-        ),
+        (path for path, analysis in compiled.maths.items() if analysis.equation.uncalculated_cells > 1),
         None
       )
       if invalid is not None:
-        bad_math = invalid[0]
-        raise Axis.CellEquationCalculationError(xdf, bad_math)
+        bad_math = self._element_at(invalid)
+        raise Axis.CellEquationCalculationError(self, bad_math)
+      undefined = next(
+        (path for path, analysis in compiled.maths.items() if analysis.undefined),
+        None
+      )
+      if undefined is not None:
+        raise Math.MathNamespaceError(self, self._element_at(undefined))
       pass
     except Math.MathInterdependence as e:
       # TODO: math cleanup? mark invalid with special state?
@@ -127,11 +250,90 @@ class Xdf(Base):
     except Axis.CellEquationCalculationError as e:
       if Axis.CellEquationCalculationError not in ignore:
         raise(e)
-    return xdf
+    except Math.MathNamespaceError as e:
+      if Math.MathNamespaceError not in ignore:
+        raise(e)
+
+  @property
+  def index(self) -> t.List[Lazy.ParameterEntry]:
+    '''
+    Lightweight listing of `Parameter`s - uniqueid, title, categories - that does not materialize lazily loaded ones.
+    '''
+    lazy = self._context.lazy
+    if lazy is not None:
+      return lazy.entries
+    return [Lazy.entry_from_element(param) for param in self.Parameters]
+
+  def reindex(self):
+    '''
+    Rebuilds the uniqueid index, without materializing lazily loaded parameters. Done at load - lookups then repair the index themselves when parameters are added, removed or re-identified.
+    '''
+    lazy = self._context.lazy
+    ids: t.Dict[str, t.Union[int, Parameter.Parameter]] = {}
+    with lazy.suspended() if lazy is not None else contextlib.nullcontext():
+      for position, child in enumerate(self):
+        id = child.get('uniqueid')
+        # first in document order wins, like XPath would
+        if id is None or id in ids:
+          continue
+        ids[id] = position if lazy is not None and lazy.is_pending(child) else child
+    self._context.ids = ids
+
+  def _indexed(self, id: str) -> t.Optional[Parameter.Parameter]:
+    ids = t.cast(t.Dict[str, t.Union[int, Parameter.Parameter]], self._context.ids)
+    found = ids.get(id)
+    if isinstance(found, int):
+      # stub position - making the proxy materializes it, keep that from now on
+      found = ids[id] = self[found]
+    # edited since indexed?
+    if found is None or found.getparent() is not self or found.get('uniqueid') != id:
+      return None
+    return found
+
+  def parameter(self, id: str, *tags: str) -> Parameter.Parameter:
+    '''
+    `Parameter` by uniqueid, optionally only of the given tags. On a lazily loaded definition, only this one is materialized.
+    '''
+    if self._context.ids is None:
+      self.reindex()
+    found = self._indexed(id)
+    if found is None:
+      self.reindex()
+      found = self._indexed(id)
+    if found is None or (tags and found.tag not in tags):
+      raise KeyError(id)
+    return found
+
+  @property
+  def validation(self) -> Validation.Validation:
+    '''
+    Schema validation status - pending, until a deferred validation finishes. See `from_path`.
+    '''
+    return t.cast(Validation.Validation, self._context.validation)
+
+  @property
+  def cache_stats(self) -> t.Dict[str, Context.CacheStats]:
+    '''
+    Hits, misses and size per cached property, e.g. `'Embedded.memory_map'` - see `Base.context_cached`. `'Math.equation'` is the process-wide `Math.EquationTrees`.
+    '''
+    return {
+      **self._context.side_table.stats(),
+      'Math.equation': Math.equation_trees.stats()
+    }
 
   @property
   def parameters_by_id(self) -> t.Dict[str, Parameter.Parameter]:
-    return {param.id: param for param in self.Parameters}
+    context = self._context
+    if context.ids is None or len(context.ids) != self._count_ids(self):
+      self.reindex()
+    ids = t.cast(t.Dict[str, t.Union[int, Parameter.Parameter]], context.ids)
+    return {id: self.parameter(id) for id in list(ids)}
+
+  def values(self, embeddeds: t.Optional[t.Iterable[EmbeddedData.Embedded]] = None) -> t.List[ArrayLike]:
+    '''
+    Unitless values of `embeddeds`, every `Constant` by default - affine ones converted in one pass, see `EmbeddedData.batch_from_embedded`.
+    '''
+    return EmbeddedData.batch_from_embedded(self.Constants if embeddeds is None else embeddeds)
 
   def address(self, addr: int, bits: int, lsbfirst: bool, signed: bool):
     '''
@@ -278,4 +480,16 @@ class XdfTyper(xml.PythonElementClassLookup):
       klass = self.name_to_class[root.tag]
       return klass
     else:
-      return None
\ No newline at end of file
+      return None
+
+def xdf_parser(schema: t.Optional[xml.XMLSchema] = None) -> Context.XdfParser:
+  '''
+  Parser for one document, that binds `XdfTyper` classes and, when given a `schema`, validates while parsing.
+  '''
+  # same options as `objectify.makeparser`
+  parser = Context.XdfParser(remove_blank_text = True, schema = schema)
+  parser.set_element_class_lookup(xdf_typer)
+  return parser
+
+# lookup is stateless, so all parsers share it
+xdf_typer = XdfTyper()
@@ -1,8 +1,12 @@
 # tunerpro math equation parser, used for converting to and from binary representations
 import typing as t
 import os
+import sys
+import pickle
+import hashlib
 from pathlib import Path
 import lark
+from .. import cache_directory, write_cache_file
 # for printing
 from functools import reduce
 from operator import mul
@@ -13,8 +17,90 @@ schemata_path = os.path.abspath(os.path.join(Path(__file__).parent.parent, 'sche
 grammar_path = os.path.join(schemata_path, grammar_name)
 
 # parse math
-kwargs = dict(rel_to=__file__, start='statement')
-parser = lark.Lark.open(grammar_path, parser='lalr', **kwargs).parse
+kwargs = dict(parser='lalr', start='statement')
+
+def grammar_parser() -> lark.Lark:
+  '''
+  LALR parser of the grammar. Building the parse tables takes most of this module's import time, so they are serialized to the `cache_directory`, under the hash of the grammar, options and lark/Python versions - a changed grammar gets a new file.
+  '''
+  grammar = Path(grammar_path).read_text()
+  key = hashlib.sha256(
+    (grammar + repr(sorted(kwargs.items())) + lark.__version__ + str(sys.version_info[:2])).encode()
+  ).hexdigest()
+  cached = cache_directory() / f'{Path(grammar_name).stem}-{key}.lalr'
+  try:
+    with open(cached, 'rb') as file:
+      return lark.Lark.load(file)
+  # missing or unreadable - rebuild
+  except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+    pass
+  built = lark.Lark(grammar, source_path = grammar_path, **kwargs)
+  try:
+    write_cache_file(cached, built.save, mode = 'wb')
+  # read-only cache folder, parse tables are rebuilt next time
+  except OSError:
+    pass
+  return built
+
+parser = grammar_parser().parse
+
+# raw parse trees by equation string. Definitions repeat the same few equations
+# hundreds of times, and transformers build new trees rather than mutating these,
+# so they are shared process-wide. `Cache.DefinitionCache` seeds this on warm loads.
+parse_trees: t.Dict[str, lark.Tree] = {}
+
+def parse(equation: str) -> lark.Tree:
+  tree = parse_trees.get(equation)
+  if tree is None:
+    tree = parse_trees[equation] = parser(equation)
+  return tree
+
+class EquationAnalysis(t.NamedTuple):
+  '''
+  What an equation refers to, found in one walk over its parse tree - see `analyze`.
+  '''
+  # variables, by first character - see `Replacer`
+  variables: t.FrozenSet[str]
+  # functions called, by upper-case name
+  calls: t.FrozenSet[str]
+  # `CELL` calls, and those of them with a literal `FALSE` precalc argument
+  cells: int
+  uncalculated_cells: int
+
+# analyses by equation string, interned like `parse_trees`
+analyses: t.Dict[str, EquationAnalysis] = {}
+
+def _walk(tree: lark.Tree) -> EquationAnalysis:
+  variables: t.Set[str] = set()
+  calls: t.Set[str] = set()
+  cells = uncalculated_cells = 0
+  stack: t.List[t.Any] = [tree]
+  while stack:
+    node = stack.pop()
+    if isinstance(node, lark.Token):
+      if node.type == 'NAME':
+        variables.add(node[0])
+    # `None` for a call without arguments
+    elif isinstance(node, lark.Tree):
+      if node.data == 'func_call':
+        name, arguments = node.children
+        calls.add(name.value.upper())
+        if name.value.upper() == 'CELL':
+          cells += 1
+          # precalc is the last argument, e.g. `CELL(1; FALSE)` or `CELL(1; 2; FALSE)`
+          if arguments is not None and getattr(arguments.children[-1], 'data', None) == 'false':
+            uncalculated_cells += 1
+        # the function name is not a variable
+        stack.append(arguments)
+      else:
+        stack.extend(node.children)
+  return EquationAnalysis(frozenset(variables), frozenset(calls), cells, uncalculated_cells)
+
+def analyze(equation: str) -> EquationAnalysis:
+  analysis = analyses.get(equation)
+  if analysis is None:
+    analysis = analyses[equation] = _walk(parse(equation))
+  return analysis
 
 TransformLeaf = t.TypeVar('TransformLeaf')
 TransformReturn = t.TypeVar('TransformReturn')
@@ -0,0 +1,103 @@
+import typing as t
+import lark
+import numpy as np
+import numpy.typing as npt
+from .FunctionCallTransformer import FunctionTree, FunctionTreeNode, identity, sum_args
+
+class Affine(t.NamedTuple):
+  '''
+  An equation of at most one product or quotient of its variable, and one sum - `X`, `X*c`, `X/c`, `X±d`, `X*c±d` or `X/c±d`, e.g. `X*0.0078125` or `X*.00390625-40`. These are most equations in a definition, and convert without evaluating their tree - and invert exactly, without `pynverse`.
+
+  Each is done as the equation does, with its literals as written, so results match evaluating its tree to the bit. Equations of more operations, e.g. `(X+1472)/1600`, are left to the tree - folding them rounds differently.
+  '''
+  variable: str
+  # multiplied by, or divided by if `divides` - `None` for neither
+  factor: t.Optional[float]
+  divides: bool
+  # `None` for no sum
+  offset: t.Optional[float]
+
+  @property
+  def scale(self) -> float:
+    if self.factor is None:
+      return 1.0
+    return 1 / self.factor if self.divides else float(self.factor)
+
+  @property
+  def is_identity(self) -> bool:
+    return self.factor is None and self.offset is None
+
+  def __call__(self, x: npt.ArrayLike) -> npt.ArrayLike:
+    if self.factor is not None:
+      x = np.divide(x, self.factor) if self.divides else np.multiply(x, self.factor)
+    if self.offset is not None:
+      x = np.add(x, self.offset)
+    return x
+
+  def inverse(self, y: npt.ArrayLike) -> npt.ArrayLike:
+    if self.scale == 0:
+      raise ZeroDivisionError(f"Equation {self} is constant, and has no inverse.")
+    if self.offset is not None:
+      y = np.subtract(y, self.offset)
+    if self.factor is not None:
+      y = np.multiply(y, self.factor) if self.divides else np.divide(y, self.factor)
+    return y
+
+def _is_literal(node: FunctionTreeNode) -> bool:
+  # bool literals (TRUE/FALSE) are ints to Python, but not to equations
+  return isinstance(node, (int, float)) and not isinstance(node, bool)
+
+def _variable(node: FunctionTreeNode) -> t.Optional[str]:
+  # looked up by first character, see `Replacer`
+  return node[0] if isinstance(node, lark.Token) and node.type == 'NAME' else None
+
+def _term(node: FunctionTreeNode) -> t.Optional[t.Tuple[str, t.Optional[float], bool]]:
+  '''
+  `(variable, factor, divides)` of `X`, `X*c`, `c*X` or `X/c`.
+  '''
+  variable = _variable(node)
+  if variable is not None:
+    return variable, None, False
+  if not isinstance(node, lark.Tree) or len(node.children) != 2:
+    return None
+  a, b = node.children
+  if node.data is np.multiply:
+    if _is_literal(a):
+      a, b = b, a
+    variable = _variable(a)
+    return (variable, b, False) if variable is not None and _is_literal(b) else None
+  elif node.data is np.divide:
+    variable = _variable(a)
+    return (variable, b, True) if variable is not None and _is_literal(b) and b != 0 else None
+  return None
+
+def _offset(node: FunctionTreeNode) -> t.Optional[float]:
+  '''
+  Value of `d` or `-d` - as the tree evaluates it, see `np.negative`.
+  '''
+  if _is_literal(node):
+    return node # type: ignore
+  if isinstance(node, lark.Tree) and node.data is np.negative and len(node.children) == 1 and _is_literal(node.children[0]):
+    return np.negative(node.children[0])
+  return None
+
+def affine_form(tree: FunctionTree) -> t.Optional[Affine]:
+  '''
+  `Affine` form of a function-call tree, or `None` if it is not one of its forms - e.g. it calls other functions, has more than one variable, or more operations.
+  '''
+  if isinstance(tree, lark.Tree) and tree.data is identity and len(tree.children) == 1:
+    tree, = tree.children
+  offset = None
+  if isinstance(tree, lark.Tree) and tree.data is sum_args and len(tree.children) == 2:
+    a, b = tree.children
+    if _offset(a) is not None:
+      a, b = b, a
+    offset = _offset(b)
+    if offset is None:
+      return None
+    tree = a
+  term = _term(tree)
+  if term is None:
+    return None
+  variable, factor, divides = term
+  return Affine(variable, factor, divides, offset)
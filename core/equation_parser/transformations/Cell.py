@@ -0,0 +1,91 @@
+import typing as t
+import lark
+from lark.visitors import v_args
+import numpy as np
+import numpy.typing as npt
+from .FunctionCallTransformer import FunctionCallTransformer, FunctionTree, NumericArg
+from .Optimizer import optimize
+from .Compiler import ARGUMENT, compile_tree, CompiledEquation
+
+class NotCompiled(ValueError):
+  '''
+  Raised when an axis equation calls `CELL` with other than literal arguments - it is then evaluated over its tree, see `EmbeddedAxis.cell_partial`.
+  '''
+  pass
+
+class CellCall(t.NamedTuple):
+  # keyword argument of the compiled equation
+  name: str
+  index: int
+  precalc: bool
+
+class CellParser(FunctionCallTransformer):
+  '''
+  Transforms an axis equation as `FunctionCallTransformer`, but with its entity calls as `ARGUMENT` tokens, which `Compiler` makes keyword arguments - `CELL` calls by their order, and `INDEX`/`INDEXES` as `_index` and `_indexes`.
+  '''
+  cells: t.List[CellCall]
+
+  def __init__(self):
+    super().__init__(suppress_rounding = True)
+    self.cells = []
+
+  @v_args(inline = True)
+  def func_call(self, name: lark.Token, args_tree: FunctionTree = None):
+    key = name.value.upper()
+    if key in ('INDEX', 'INDEXES'):
+      return lark.Token(ARGUMENT, f'_{key.lower()}')
+    elif key != 'CELL':
+      return super().func_call(name, args_tree)
+    args = args_tree.children if args_tree is not None else []
+    if len(args) != 2 or not all(isinstance(arg, (bool, int)) for arg in args):
+      raise NotCompiled(f'CELL{tuple(args)} has other than literal arguments')
+    index, precalc = args
+    call = CellCall(f'_cell{len(self.cells)}', int(index), bool(precalc))
+    self.cells.append(call)
+    return lark.Token(ARGUMENT, call.name)
+
+class CellForm(t.NamedTuple):
+  '''
+  Axis equation compiled once, with its `CELL`, `INDEX` and `INDEXES` calls passed in as plain values - rather than bound into a tree per conversion. Conversion is as TunerPro's:
+  - `CELL(i; TRUE)` is the raw value of cell `i`
+  - `CELL(i; FALSE)` is the converted value of cell `i` - itself converted with `CELL(i; FALSE)` as 0, TunerPro's initial value. So equations calling it are evaluated twice, and once otherwise.
+
+  TunerPro crashes on more than one `CELL(i; FALSE)` per equation, see `CellEquationCalculationError` - here, each is taken as above.
+  '''
+  compiled: CompiledEquation
+  cells: t.Tuple[CellCall, ...]
+
+  @classmethod
+  def build(cls, tree: lark.Tree) -> 'CellForm':
+    '''
+    Raises `NotCompiled` unless every `CELL` call has literal arguments.
+    '''
+    parser = CellParser()
+    try:
+      transformed = parser.transform(tree)
+    except lark.exceptions.VisitError as e:
+      raise e.orig_exc if isinstance(e.orig_exc, NotCompiled) else e
+    return cls(compile_tree(optimize(transformed), arena = True), tuple(parser.cells))
+
+  def __call__(self, raw: npt.NDArray, **kwargs) -> NumericArg:
+    '''
+    Converted cells of an axis of `raw` data, given the Vars of the equation as `kwargs`.
+    '''
+    size = len(raw)
+    kwargs.update(_index = np.arange(size), _indexes = size)
+    uncalculated = [cell for cell in self.cells if not cell.precalc]
+    kwargs.update({cell.name: raw[cell.index] for cell in self.cells if cell.precalc})
+    if uncalculated:
+      kwargs.update({cell.name: 0.0 for cell in uncalculated})
+      initial = np.broadcast_to(self.compiled(**kwargs), raw.shape)
+      kwargs.update({cell.name: initial[cell.index] for cell in uncalculated})
+    out = self.compiled(**kwargs)
+    if uncalculated:
+      # ...and those cells keep their initial conversion
+      fixed = np.zeros(raw.shape, dtype = bool)
+      fixed[[cell.index for cell in uncalculated]] = True
+      out = np.where(fixed, initial, out)
+    elif np.shape(out) != raw.shape:
+      # e.g. `CELL(1; TRUE)`
+      out = np.array(np.broadcast_to(out, raw.shape))
+    return out
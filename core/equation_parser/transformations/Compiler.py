@@ -0,0 +1,302 @@
+import typing as t
+import threading
+import lark
+import numpy as np
+import numpy.typing as npt
+from .GenericTree import GenericTree
+from .TypeVisitors import func_printer
+from .FunctionCallTransformer import FunctionTree, FunctionTreeNode, NumericArg, identity, sum_args, product_args
+
+CompiledEquation = t.Callable[..., NumericArg]
+
+# token type of a keyword argument passed by its full name, rather than a variable - see `Cell`
+ARGUMENT = 'ARGUMENT'
+# token types compiled as arguments of the equation
+argument_types: t.FrozenSet[str] = frozenset({'NAME', ARGUMENT})
+
+# n-ary calls, and the ufunc they apply left to right
+n_ary_ufuncs: t.Dict[t.Callable, np.ufunc] = {
+  sum_args: np.add,
+  product_args: np.multiply,
+}
+
+class Compiler:
+  '''
+  Compiles a function-call tree, as made by `FunctionCallTransformer`, into a plain Python function - once, rather than walking the tree with `Replacer` and `Evaluator` on each calculation, e.g.:
+
+  "0.007813*X + Y + 2" ->
+  ```
+  def equation(X=_v0, Y=_v1, **_unused):
+    return _f0(_f1(X, _c0), Y, _c1)
+  ```
+  Functions and literals are bound as globals of the generated code, and variables become keyword arguments. As with `Replacer`, a variable is looked up by the first character of its name, and is left as its `lark.Token` when not given - `ARGUMENT` tokens by their full name. A subtree that is the child of more than one node, as made by `Optimizer`, is evaluated once into a local.
+  '''
+  _globals: t.Dict[str, t.Any]
+  # variable name to the default token
+  _variables: t.Dict[str, lark.Token]
+  # result arrays made per evaluation, by calls without `out=`
+  _allocations: int
+  # statements before the returned expression
+  _lines: t.List[str]
+  # number of parents of each subtree, by identity
+  _uses: t.Dict[int, int]
+  # expressions of subtrees with more than one parent, by identity
+  _shared: t.Dict[int, t.Any]
+
+  def __init__(self):
+    self._globals = {'_GenericTree': GenericTree}
+    self._variables = {}
+    self._allocations = 0
+    self._lines = []
+    self._uses = {}
+    self._shared = {}
+
+  def _count_uses(self, node: FunctionTreeNode):
+    if isinstance(node, lark.Tree):
+      self._uses[id(node)] = self._uses.get(id(node), 0) + 1
+      if self._uses[id(node)] == 1:
+        for child in node.children:
+          self._count_uses(child)
+
+  def _is_shared(self, node: FunctionTreeNode) -> bool:
+    return isinstance(node, lark.Tree) and self._uses.get(id(node), 0) > 1
+
+  def _local(self, expression: str) -> str:
+    name = f'_s{len(self._shared)}'
+    self._lines.append(f'{name} = {expression}')
+    return name
+
+  def _call(self, func: t.Callable, args: t.Sequence[str], node: FunctionTreeNode) -> str:
+    # only calls on variables make arrays - `identity` passes its argument through, and n-ary calls apply pairwise
+    on_data = isinstance(node, lark.Tree) and any(node.scan_values(lambda v: isinstance(v, lark.Token) and v.type in argument_types))
+    if not on_data or func is identity:
+      pass
+    elif func in n_ary_ufuncs:
+      self._allocations += max(len(args) - 1, 0)
+    else:
+      self._allocations += 1
+    return f'{self._bind("f", func)}({", ".join(args)})'
+
+  def _bind(self, prefix: str, value: t.Any) -> str:
+    name = f'_{prefix}{len(self._globals)}'
+    self._globals[name] = value
+    return name
+
+  def _expression(self, node: FunctionTreeNode) -> str:
+    if isinstance(node, lark.Token):
+      if node.type in argument_types:
+        name = node[0] if node.type == 'NAME' else str(node)
+        self._variables.setdefault(name, node)
+        return name
+      return self._bind('c', node)
+    elif isinstance(node, lark.Tree):
+      if id(node) in self._shared:
+        return self._shared[id(node)]
+      args = [self._expression(child) for child in node.children]
+      if callable(node.data):
+        expression = self._call(node.data, args, node)
+      else:
+        # not a function call - kept as a tree, as `Evaluator` does
+        expression = f'_GenericTree({self._bind("d", node.data)}, [{", ".join(args)}])'
+      if self._is_shared(node):
+        expression = self._shared[id(node)] = self._local(expression)
+      return expression
+    else:
+      return self._bind('c', node)
+
+  def _signature(self) -> str:
+    defaults = {variable: self._bind('v', token) for variable, token in self._variables.items()}
+    return ''.join(f'{variable}={default}, ' for variable, default in defaults.items())
+
+  def _define(self, name: str, lines: t.List[str]) -> CompiledEquation:
+    source = f'def {name}({self._signature()}**_unused):\n' + ''.join(f'  {line}\n' for line in lines)
+    namespace: t.Dict[str, t.Any] = {}
+    exec(compile(source, f'<equation {name}>', 'exec'), self._globals, namespace)
+    compiled = namespace[name]
+    compiled.__source__ = source
+    compiled.__allocations__ = self._allocations
+    return compiled
+
+  def compile(self, tree: FunctionTreeNode, name: str = 'equation') -> CompiledEquation:
+    self._count_uses(tree)
+    body = self._expression(tree)
+    return self._define(name, [*self._lines, f'return {body}'])
+
+# elementwise ufuncs giving float64 for float64 input, that can write into float64 buffers
+arena_ufuncs: t.FrozenSet[np.ufunc] = frozenset({
+  np.add, np.subtract, np.multiply, np.divide, np.floor_divide, np.mod, np.negative, np.absolute,
+  np.float_power, np.exp, np.log, np.log10, np.sqrt, np.floor, np.ceil, np.radians, np.degrees,
+  np.sin, np.cos, np.tan, np.arcsin, np.arccos, np.arctan,
+  np.sinh, np.cosh, np.tanh, np.arcsinh, np.arccosh, np.arctanh,
+})
+
+class Arena:
+  '''
+  Reusable float64 buffers of an `ArenaCompiler` equation, `size` per broadcast shape of its variables - allocated on the first evaluation of each shape, and written over on every one after.
+
+  Buffers are per thread, so an equation evaluated concurrently does not write over the intermediate results of another thread.
+  '''
+  size: int
+  # `buffers` by shape, on each thread
+  _local: threading.local
+
+  def __init__(self, size: int):
+    self.size = size
+    self._local = threading.local()
+
+  @property
+  def _buffers(self) -> t.Dict[t.Tuple[int, ...], t.List[npt.NDArray[np.float_]]]:
+    try:
+      return self._local.buffers
+    except AttributeError:
+      buffers = self._local.buffers = {}
+      return buffers
+
+  def buffers(self, *variables: t.Any) -> t.Optional[t.List[npt.NDArray[np.float_]]]:
+    '''
+    Buffers for the broadcast shape of `variables` - or `None` unless they are float64 arrays or floats, and at least one is an array, as results would be of another type.
+    '''
+    shapes = []
+    for variable in variables:
+      if isinstance(variable, np.ndarray):
+        if variable.dtype != np.float_:
+          return None
+        shapes.append(variable.shape)
+      elif type(variable) not in (float, np.float_):
+        return None
+    if not shapes:
+      return None
+    shape = np.broadcast_shapes(*shapes)
+    held = self._buffers
+    buffers = held.get(shape)
+    if buffers is None:
+      buffers = held[shape] = [np.empty(shape) for _ in range(self.size)]
+    return buffers
+
+  def owned(self, result: NumericArg) -> NumericArg:
+    # a result passed through a call like `IF` may be a buffer, or a view of one, which the next evaluation writes over
+    if isinstance(result, np.ndarray) and any(np.shares_memory(result, buffer) for buffers in self._buffers.values() for buffer in buffers):
+      return np.copy(result)
+    return result
+
+  def clear(self):
+    '''
+    Drops the buffers of every thread.
+    '''
+    self._local = threading.local()
+
+class ArenaCompiler(Compiler):
+  '''
+  Compiles as `Compiler`, but with intermediate results written into the buffers of an `Arena` with `out=` - so only the result is allocated on each evaluation, e.g.:
+
+  "X*0.5 + X*X - 40" ->
+  ```
+  def equation(X=_v5, **_unused):
+    _buffers = _a6.buffers(X)
+    if _buffers is None:
+      return _p7(X=X)
+    _b0, _b1, = _buffers
+    _f1(X, _c2, out=_b0)
+    _f3(X, X, out=_b1)
+    _f4(_b0, _b1, out=_b0)
+    return _a6.owned(_f4(_b0, _c8))
+  ```
+  Buffer lifetimes are planned over the tree: a call writes into the buffer of one of its arguments where it can, and the buffers of its other arguments are free once it is made. Calls outside `arena_ufuncs`, and calls on literals alone, allocate as before - and buffers they are given are kept, as they may pass them through, as are buffers of shared subtrees. When the variables are not float64 data, the equation is evaluated as by `Compiler`.
+  '''
+  # buffers free to be written over, and buffers that never are
+  _free: t.List[int]
+  _pinned: t.Set[int]
+  _size: int
+
+  def __init__(self):
+    super().__init__()
+    self._free = []
+    self._pinned = set()
+    self._size = 0
+
+  def _take(self) -> int:
+    if self._free:
+      return self._free.pop()
+    self._size += 1
+    return self._size - 1
+
+  def _planned(self, node: FunctionTreeNode, root: bool = False) -> t.Tuple[str, t.Optional[int], bool]:
+    '''
+    Expression of `node` and the buffer holding it, if any - and whether it is float data, i.e. a variable or a buffer.
+    '''
+    if id(node) in self._shared:
+      return self._shared[id(node)]
+    expression, buffer, is_float = planned = self._plan(node, root)
+    if self._is_shared(node):
+      if buffer is None:
+        expression = self._local(expression)
+      else:
+        self._pinned.add(buffer)
+      planned = self._shared[id(node)] = (expression, buffer, is_float)
+    return planned
+
+  def _plan(self, node: FunctionTreeNode, root: bool) -> t.Tuple[str, t.Optional[int], bool]:
+    if isinstance(node, lark.Token):
+      return self._expression(node), None, node.type in argument_types
+    elif not isinstance(node, lark.Tree) or not callable(node.data):
+      return self._expression(node), None, False
+    func, children = node.data, node.children
+    if func is identity or (func in n_ary_ufuncs and len(children) == 1):
+      return self._planned(children[0], root)
+    planned = [self._planned(child) for child in children]
+    args = [expression for expression, _, _ in planned]
+    buffers = [buffer for _, buffer, _ in planned if buffer is not None]
+    floats = any(is_float for _, _, is_float in planned)
+    if not floats or not (func in arena_ufuncs or func in n_ary_ufuncs) or (root and (func not in n_ary_ufuncs or len(args) < 3)):
+      self._pinned.update(buffers)
+      return self._call(func, args, node), None, False
+    if func in n_ary_ufuncs:
+      ufunc = self._bind('f', n_ary_ufuncs[func])
+      # applied left to right, so only the first argument's buffer can be written over
+      first = planned[0][1]
+      output = first if first is not None and first not in self._pinned else self._take()
+      self._lines.append(f'{ufunc}({args[0]}, {args[1]}, out=_b{output})')
+      # the result is the last call, made into a new array
+      self._lines.extend(f'{ufunc}(_b{output}, {arg}, out=_b{output})' for arg in args[2:len(args) - root])
+      if root:
+        self._pinned.update(buffers)
+        return self._call(n_ary_ufuncs[func], [f'_b{output}', args[-1]], node), None, False
+    else:
+      writable = [buffer for buffer in buffers if buffer not in self._pinned]
+      output = writable[0] if writable else self._take()
+      self._lines.append(f'{self._bind("f", func)}({", ".join(args)}, out=_b{output})')
+    self._free.extend(buffer for buffer in buffers if buffer != output and buffer not in self._pinned)
+    return f'_b{output}', output, True
+
+  def compile(self, tree: FunctionTreeNode, name: str = 'equation') -> CompiledEquation:
+    self._count_uses(tree)
+    body, _, _ = self._planned(tree, root = True)
+    if not self._size:
+      return Compiler().compile(tree, name)
+    arena = self._bind('a', Arena(self._size))
+    plain = self._bind('p', Compiler().compile(tree, name))
+    variables = list(self._variables)
+    return self._define(name, [
+      f'_buffers = {arena}.buffers({", ".join(variables)})',
+      f'if _buffers is None:',
+      f'  return {plain}({", ".join(f"{variable}={variable}" for variable in variables)})',
+      f'{"".join(f"_b{index}, " for index in range(self._size))}= _buffers',
+      *self._lines,
+      f'return {arena}.owned({body})',
+    ])
+
+def compile_tree(tree: FunctionTreeNode, arena: bool = False) -> CompiledEquation:
+  '''
+  Compiled `tree` - with intermediate results in reusable buffers if `arena`, see `ArenaCompiler`.
+  '''
+  return (ArenaCompiler() if arena else Compiler()).compile(tree)
+
+def compiled_printer(compiled: CompiledEquation) -> str:
+  '''
+  Generated source of a compiled equation, with bound functions named, for debugging.
+  '''
+  source: str = compiled.__source__ # type: ignore
+  for name, value in compiled.__globals__.items():
+    if name.startswith('_f'):
+      source = source.replace(f'{name}(', f'{func_printer(value)}(')
+  return source
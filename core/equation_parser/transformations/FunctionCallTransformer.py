@@ -29,6 +29,10 @@ def if_func(condition: bool, true_val: EquationArg, false_val: EquationArg) -> E
 def sum_args(*args) -> npt.ArrayLike:
   return functools.reduce(np.add, args)
 
+# ...and of product, for products flattened by `Optimizer`
+def product_args(*args) -> npt.ArrayLike:
+  return functools.reduce(np.multiply, args)
+
 class RoundingError(ValueError):
   '''
   By default, TunerPro rounds float values (like engine map data) to integer, 
@@ -115,6 +119,8 @@ class FunctionCallTransformer(Transformer[lark.Token, FunctionTree]):
     def inner(a: NumericArg, b: NumericArg) -> npt.NDArray:
       a, b = self._int_truncate(a, b)
       return bitwise(a, b)
+    # print as the operation, e.g. 'bitwise_and'
+    inner.__name__ = bitwise.__name__
     return inner
   
   def __init__(self, namespaces: t.Iterable[FunctionRegistry] = [], suppress_rounding = False):
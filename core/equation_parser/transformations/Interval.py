@@ -0,0 +1,205 @@
+import typing as t
+import lark
+import numpy as np
+import numpy.typing as npt
+from .FunctionCallTransformer import FunctionTree, FunctionTreeNode, NumericArg, identity, if_func, sum_args, product_args
+
+class NotBounded(ValueError):
+  '''
+  Raised when a function-call tree has no interval form here - e.g. it calls bitwise or entity functions.
+  '''
+  pass
+
+class Interval(t.NamedTuple):
+  '''
+  Closed range of real values, `low` to `high` - possibly infinite.
+  '''
+  low: float
+  high: float
+
+  @classmethod
+  def hull(cls, *values: float) -> 'Interval':
+    '''
+    Smallest interval holding `values`, ignoring undefined (NaN) ones.
+    '''
+    defined = [value for value in values if not np.isnan(value)]
+    if not defined:
+      raise NotBounded('undefined over the interval')
+    return cls(min(defined), max(defined))
+
+  @classmethod
+  def of(cls, value: NumericArg) -> 'Interval':
+    '''
+    Interval of an array, or quantity, of values.
+    '''
+    values = np.asarray(getattr(value, 'magnitude', value), dtype = np.float_)
+    if np.all(np.isnan(values)):
+      raise NotBounded('undefined over the interval')
+    return cls(float(np.nanmin(values)), float(np.nanmax(values)))
+
+  def __contains__(self, value: float) -> bool: # type: ignore
+    return self.low <= value <= self.high
+
+  def clipped(self, low: float, high: float) -> 'Interval':
+    if self.high < low or self.low > high:
+      raise NotBounded(f'outside of [{low}, {high}]')
+    return Interval(max(self.low, low), min(self.high, high))
+
+# functions of one argument, non-decreasing over their domain
+increasing: t.Dict[t.Callable, t.Tuple[float, float]] = {
+  identity: (-np.inf, np.inf),
+  np.exp: (-np.inf, np.inf),
+  np.log: (0, np.inf),
+  np.log10: (0, np.inf),
+  np.sqrt: (0, np.inf),
+  np.arcsin: (-1, 1),
+  np.arctan: (-np.inf, np.inf),
+  np.sinh: (-np.inf, np.inf),
+  np.tanh: (-np.inf, np.inf),
+  np.arcsinh: (-np.inf, np.inf),
+  np.arccosh: (1, np.inf),
+  np.arctanh: (-1, 1),
+  np.radians: (-np.inf, np.inf),
+  np.degrees: (-np.inf, np.inf),
+  np.floor: (-np.inf, np.inf),
+  np.ceil: (-np.inf, np.inf),
+}
+
+# ...and non-increasing
+decreasing: t.Dict[t.Callable, t.Tuple[float, float]] = {
+  np.negative: (-np.inf, np.inf),
+  np.arccos: (-1, 1),
+}
+
+# functions of booleans
+logical: t.FrozenSet[np.ufunc] = frozenset({
+  np.less, np.greater, np.less_equal, np.greater_equal, np.equal, np.not_equal, np.logical_and, np.logical_or
+})
+
+def _corners(func: t.Callable[[float, float], float], a: Interval, b: Interval) -> Interval:
+  with np.errstate(all = 'ignore'):
+    return Interval.hull(*(float(func(x, y)) for x in a for y in b))
+
+def _absolute(a: Interval) -> Interval:
+  if 0 in a:
+    return Interval(0.0, max(-a.low, a.high))
+  return Interval.hull(abs(a.low), abs(a.high))
+
+def _divide(a: Interval, b: Interval) -> Interval:
+  if 0 in b:
+    return Interval(-np.inf, np.inf)
+  return _corners(np.divide, a, b)
+
+def _power(a: Interval, b: Interval) -> Interval:
+  # x ^ y is exp(y * ln x), extreme at the corners for positive x
+  if a.low >= 0:
+    return _corners(np.float_power, a, b)
+  elif b.low == b.high and float(b.low).is_integer():
+    corners = _corners(np.float_power, a, b)
+    # even powers are least at 0
+    return Interval.hull(*corners, 0.0) if 0 in a else corners
+  raise NotBounded('POW of negative values')
+
+def _binary(func: t.Callable, a: Interval, b: Interval) -> Interval:
+  if func is np.add:
+    return Interval(a.low + b.low, a.high + b.high)
+  elif func is np.subtract:
+    return Interval(a.low - b.high, a.high - b.low)
+  elif func is np.multiply:
+    return _corners(np.multiply, a, b)
+  elif func is np.divide:
+    return _divide(a, b)
+  elif func is np.floor_divide:
+    quotient = _divide(a, b)
+    return Interval(np.floor(quotient.low), np.floor(quotient.high))
+  elif func is np.mod and b.low == b.high and b.low != 0:
+    return Interval.hull(0.0, b.low)
+  elif func is np.float_power:
+    return _power(a, b)
+  raise NotBounded(f"'{getattr(func, '__name__', func)}' has no interval form")
+
+def interval_form(node: FunctionTreeNode, ranges: t.Mapping[str, Interval]) -> Interval:
+  '''
+  Range of a function-call tree over `ranges` of its variables, by interval arithmetic - exact when each variable occurs once, and wider otherwise. Raises `NotBounded` for calls it has no rule for.
+  '''
+  if isinstance(node, lark.Token):
+    # looked up by first character, see `Replacer`
+    if node.type != 'NAME' or node[0] not in ranges:
+      raise NotBounded(f"no range for '{node}'")
+    return ranges[node[0]]
+  elif isinstance(node, (bool, int, float, np.number, np.bool_)):
+    return Interval(float(node), float(node))
+  elif not isinstance(node, lark.Tree) or not callable(node.data):
+    raise NotBounded(f"'{node}' is not a function call")
+  func = node.data
+  args = [interval_form(child, ranges) for child in node.children]
+  if func in increasing and len(args) == 1:
+    arg = args[0].clipped(*increasing[func])
+    with np.errstate(all = 'ignore'):
+      return Interval(float(func(arg.low)), float(func(arg.high)))
+  elif func in decreasing and len(args) == 1:
+    arg = args[0].clipped(*decreasing[func])
+    with np.errstate(all = 'ignore'):
+      return Interval(float(func(arg.high)), float(func(arg.low)))
+  elif func is round and args and all(arg.low == arg.high for arg in args[1:]):
+    # `ROUND(X)`, or `ROUND(X; digits)`
+    digits = int(args[1].low) if len(args) > 1 else 0
+    return Interval(float(np.round(args[0].low, digits)), float(np.round(args[0].high, digits)))
+  elif func is np.absolute and len(args) == 1:
+    return _absolute(args[0])
+  elif func is np.cosh and len(args) == 1:
+    arg = _absolute(args[0])
+    return Interval(float(np.cosh(arg.low)), float(np.cosh(arg.high)))
+  elif func in (np.sin, np.cos) and len(args) == 1:
+    return Interval(-1.0, 1.0)
+  elif func in logical:
+    return Interval(0.0, 1.0)
+  elif func is if_func and len(args) == 3:
+    _, true, false = args
+    return Interval(min(true.low, false.low), max(true.high, false.high))
+  elif func in (sum_args, product_args) and args:
+    binary = np.add if func is sum_args else np.multiply
+    out = args[0]
+    for arg in args[1:]:
+      out = _binary(binary, out, arg)
+    return out
+  elif len(args) == 2:
+    return _binary(func, *args)
+  raise NotBounded(f"'{getattr(func, '__name__', func)}' has no interval form")
+
+def dtype_interval(dtype: np.dtype) -> Interval:
+  '''
+  Raw values of a data type, see `Embedded.memmap_bounds`.
+  '''
+  info = np.finfo(dtype) if dtype.kind == 'f' else np.iinfo(dtype)
+  return Interval(float(info.min), float(info.max))
+
+def conversion_bounds(
+  tree: t.Optional[FunctionTree],
+  variable: t.Optional[str],
+  dtype: np.dtype,
+  forward: t.Callable[[npt.NDArray], NumericArg],
+  ranges: t.Mapping[str, Interval] = {}
+) -> Interval:
+  '''
+  Range of a conversion over the raw values of `dtype` - by `interval_form` of its `tree` where it has one. Otherwise, over 8- and 16-bit integers, the range of every raw value converted - and over larger types, of the bounds of the type, as if the conversion were monotonic.
+  '''
+  raw = dtype_interval(dtype)
+  if tree is not None:
+    try:
+      bounds = interval_form(tree, {**ranges, **({variable: raw} if variable else {})})
+      # e.g. `inf - inf`
+      if not np.isnan(bounds.low) and not np.isnan(bounds.high):
+        return bounds
+    except NotBounded:
+      pass
+  if dtype.kind in 'iu' and dtype.itemsize <= 2:
+    values = np.arange(raw.low, raw.high + 1)
+  else:
+    values = np.array([raw.low, raw.high])
+  with np.errstate(all = 'ignore'):
+    converted = forward(values)
+  try:
+    return Interval.of(converted)
+  except NotBounded:
+    return Interval(-np.inf, np.inf)
@@ -0,0 +1,220 @@
+import typing as t
+import lark
+import numpy as np
+import numpy.typing as npt
+from .FunctionCallTransformer import FunctionTree, FunctionTreeNode, NumericArg, identity, sum_args
+from .Compiler import compile_tree, CompiledEquation
+
+# one step of an inverse - undoes one function call, given the output so far and
+# the values of the other (variable-free) arguments
+InverseStep = t.Callable[[NumericArg, t.Dict[str, t.Any]], NumericArg]
+
+class NotInvertible(ValueError):
+  '''
+  Raised when a function-call tree has no closed-form inverse here - the message says why, see `EquationTrees.numeric_inverses`.
+  '''
+  pass
+
+# function to its inverse, for functions of one argument. Trigonometric inverses
+# are of the principal branch
+unary_inverses: t.Dict[t.Callable, t.Callable[[NumericArg], NumericArg]] = {
+  identity: identity,
+  np.negative: np.negative,
+  np.exp: np.log,
+  np.log: np.exp,
+  np.log10: lambda y: np.float_power(10, y),
+  np.sqrt: np.square,
+  np.sin: np.arcsin,
+  np.cos: np.arccos,
+  np.tan: np.arctan,
+  np.arcsin: np.sin,
+  np.arccos: np.cos,
+  np.arctan: np.tan,
+  np.sinh: np.arcsinh,
+  np.cosh: np.arccosh,
+  np.tanh: np.arctanh,
+  np.arcsinh: np.sinh,
+  np.arccosh: np.cosh,
+  np.arctanh: np.tanh,
+  np.radians: np.degrees,
+  np.degrees: np.radians,
+}
+
+def occurrences(node: FunctionTreeNode, variable: str) -> int:
+  if isinstance(node, lark.Token):
+    # looked up by first character, see `Replacer`
+    return int(node.type == 'NAME' and node[0] == variable)
+  elif isinstance(node, lark.Tree):
+    return sum(occurrences(child, variable) for child in node.children)
+  return 0
+
+def _constant(node: FunctionTreeNode) -> CompiledEquation:
+  # other variables are given to the inverse as keyword arguments
+  return compile_tree(node) if isinstance(node, lark.Tree) else compile_tree(FunctionTree(identity, [node]))
+
+def _steps(node: FunctionTreeNode, variable: str) -> t.Iterator[InverseStep]:
+  '''
+  Inverse steps from `node` down to its only occurrence of `variable`, outermost first.
+  '''
+  while not isinstance(node, lark.Token):
+    if not isinstance(node, lark.Tree) or not callable(node.data):
+      raise NotInvertible(f"'{node}' is not a function call")
+    func, children = node.data, node.children
+    # the child holding the variable, and the constants around it
+    where = [index for index, child in enumerate(children) if occurrences(child, variable)]
+    index, = where
+    others = [_constant(child) for position, child in enumerate(children) if position != index]
+    name = getattr(func, '__name__', repr(func))
+    if func in unary_inverses and len(children) == 1:
+      inverse = unary_inverses[func]
+      yield lambda y, kwargs, inverse=inverse: inverse(y)
+    elif func is sum_args:
+      yield lambda y, kwargs, others=others: np.subtract(y, sum_args(*(other(**kwargs) for other in others)) if others else 0)
+    elif func is np.multiply and len(children) == 2:
+      other, = others
+      yield lambda y, kwargs, other=other: np.divide(y, other(**kwargs))
+    elif func is np.divide and len(children) == 2:
+      other, = others
+      # variable / c, or c / variable
+      if index == 0:
+        yield lambda y, kwargs, other=other: np.multiply(y, other(**kwargs))
+      else:
+        yield lambda y, kwargs, other=other: np.divide(other(**kwargs), y)
+    elif func is np.float_power and len(children) == 2:
+      other, = others
+      # variable ^ c, or c ^ variable
+      if index == 0:
+        yield lambda y, kwargs, other=other: np.float_power(y, np.divide(1, other(**kwargs)))
+      else:
+        yield lambda y, kwargs, other=other: np.divide(np.log(y), np.log(other(**kwargs)))
+    else:
+      raise NotInvertible(f"'{name}' has no inverse")
+    node = children[index]
+
+def inverse_form(tree: FunctionTree, variable: str) -> t.Callable[..., NumericArg]:
+  '''
+  Closed-form inverse in `variable` of a function-call tree, as `inverse(y, **kwargs)` with the other variables as keyword arguments.
+
+  `variable` must occur exactly once, under a chain of invertible calls - sums, products and quotients with the rest of the equation, negation, `POW`, `EXP`/`LOG`/`LOG10`, `SQR` and the trigonometric functions. Raises `NotInvertible` otherwise.
+  '''
+  count = occurrences(tree, variable)
+  if count != 1:
+    raise NotInvertible(f"'{variable}' occurs {count} times")
+  steps = list(_steps(tree, variable))
+  def inverse(y: npt.ArrayLike, **kwargs) -> NumericArg:
+    out = y
+    for step in steps:
+      out = step(out, kwargs)
+    return out
+  return inverse
+
+def _magnitudes(converted: NumericArg) -> npt.NDArray[np.float_]:
+  # values may carry units of linked Vars
+  return np.asarray(getattr(converted, 'magnitude', converted), dtype = np.float_)
+
+class DomainInverse(t.NamedTuple):
+  '''
+  Inverse of a conversion over every raw value of an 8- or 16-bit integer type - the forward conversion of the whole domain, sorted, so writes invert with `searchsorted` rather than root finding.
+
+  Real values invert to the raw value converting nearest to them, ties away from zero - as C `round` of the exact inverse, like TunerPro. Every raw value round trips exactly.
+  '''
+  # raw values, in order of `values`
+  raw: npt.NDArray[np.int_]
+  # forward conversion of `raw`, ascending
+  values: npt.NDArray[np.float_]
+
+  @classmethod
+  def build(cls, forward: t.Callable[[npt.NDArray], NumericArg], dtype: np.dtype) -> t.Optional['DomainInverse']:
+    '''
+    `None` unless `forward` is finite and strictly monotonic over the domain of `dtype`.
+    '''
+    info = np.iinfo(dtype)
+    raw = np.arange(info.min, info.max + 1)
+    with np.errstate(all = 'ignore'):
+      converted = forward(raw.astype(np.float_))
+    values = _magnitudes(converted)
+    if values.shape != raw.shape or not np.all(np.isfinite(values)):
+      return None
+    steps = np.diff(values)
+    if np.all(steps < 0):
+      raw, values = raw[::-1], values[::-1]
+    elif not np.all(steps > 0):
+      return None
+    return cls(raw, values)
+
+  def __call__(self, y: npt.ArrayLike) -> npt.NDArray[np.float_]:
+    y = np.asarray(y, dtype = np.float_)
+    # neighbouring values around each `y`, clamped to the domain
+    upper = np.clip(np.searchsorted(self.values, y), 1, len(self.values) - 1)
+    lower = upper - 1
+    below, above = y - self.values[lower], self.values[upper] - y
+    away_from_zero = np.abs(self.raw[upper]) > np.abs(self.raw[lower])
+    nearest = np.where(
+      (above < below) | ((above == below) & away_from_zero),
+      self.raw[upper],
+      self.raw[lower]
+    )
+    return nearest.astype(np.float_)
+
+class BisectionInverse(t.NamedTuple):
+  '''
+  Numeric inverse of a conversion over the raw values of a data type - bracketed bisection of every element at once, with the whole array given to `forward` on each step.
+
+  Raw values are bisected as integer keys: integers as themselves, and floats by their bits, ordered as the floats are. A 32-bit type is then solved in at most 32 evaluations of `forward`, whatever the array size - to the nearest raw value for integers, and the nearest float of the type otherwise. Real values outside the conversion's range clamp to the bracket.
+
+  `forward` must convert elementwise, and be monotonic between `low` and `high` - otherwise, this converges to one of the raw values converting nearest. Undefined (NaN) conversions are taken as infinite.
+  '''
+  forward: t.Callable[[npt.NDArray], NumericArg]
+  dtype: np.dtype
+  # raw bracket, e.g. the bounds of the data type, see `Embedded.memmap_bounds`
+  low: float
+  high: float
+
+  @property
+  def _bits(self) -> np.dtype:
+    # native signed integer of the same width, to view floats as
+    return np.dtype(f'i{self.dtype.itemsize}')
+
+  def keys(self, raw: npt.ArrayLike) -> npt.NDArray[np.int64]:
+    raw = np.asarray(raw)
+    if self.dtype.kind != 'f':
+      return raw.astype(np.int64)
+    bits = raw.astype(self.dtype.newbyteorder('=')).view(self._bits).astype(np.int64)
+    # negative floats have the sign bit set, and larger magnitudes as larger integers
+    return np.where(bits < 0, np.iinfo(self._bits).min - bits, bits)
+
+  def raw(self, keys: npt.NDArray[np.int64]) -> npt.NDArray[np.float_]:
+    if self.dtype.kind != 'f':
+      return keys.astype(np.float_)
+    bits = np.where(keys < 0, np.iinfo(self._bits).min - keys, keys)
+    return bits.astype(self._bits).view(self.dtype.newbyteorder('=')).astype(np.float_)
+
+  def _convert(self, keys: npt.NDArray[np.int64]) -> npt.NDArray[np.float_]:
+    with np.errstate(all = 'ignore'):
+      values = _magnitudes(self.forward(self.raw(keys)))
+    # undefined values order as overflow, e.g. `MROUND` of an infinite `EXP`
+    return np.where(np.isnan(values), np.inf, values)
+
+  def __call__(self, y: npt.ArrayLike) -> npt.NDArray[np.float_]:
+    y = np.asarray(y, dtype = np.float_)
+    low = np.full(y.shape, self.keys(self.low), dtype = np.int64)
+    high = np.full(y.shape, self.keys(self.high), dtype = np.int64)
+    low_values, high_values = self._convert(low), self._convert(high)
+    increasing = high_values >= low_values
+    while True:
+      # as `high - low > 1`, without overflowing 64-bit keys
+      open = high - 1 > low
+      if not np.any(open):
+        break
+      # floor of the midpoint, without overflowing 64-bit keys
+      middle = (low >> 1) + (high >> 1) + (low & high & 1)
+      values = self._convert(middle)
+      right = open & np.where(increasing, values < y, values > y)
+      left = open & ~right
+      low, low_values = np.where(right, middle, low), np.where(right, values, low_values)
+      high, high_values = np.where(left, middle, high), np.where(left, values, high_values)
+    # nearest of the bracket, ties away from zero as `DomainInverse` - `low` on a step
+    below, above = np.abs(y - low_values), np.abs(high_values - y)
+    away_from_zero = (high_values != low_values) & (np.abs(self.raw(high)) > np.abs(self.raw(low)))
+    nearest = np.where((above < below) | ((above == below) & away_from_zero), high, low)
+    return self.raw(nearest)
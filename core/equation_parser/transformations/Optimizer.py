@@ -0,0 +1,92 @@
+import typing as t
+import lark
+import numpy as np
+from .FunctionCallTransformer import FunctionTree, FunctionTreeNode, default_numeric, identity, sum_args, product_args
+
+# n-ary calls, and the binary call they are a left-to-right chain of
+n_ary: t.Dict[t.Callable, t.Callable] = {
+  sum_args: sum_args,
+  product_args: np.multiply,
+}
+
+def is_pure(func: t.Callable) -> bool:
+  '''
+  Whether calls of `func` depend only on their arguments - not so for entity functions like `CELL` or `ROW`, which read the entity being converted.
+  '''
+  return isinstance(func, np.ufunc) or func in n_ary or func is identity or any(func is numeric for numeric in default_numeric.values())
+
+def _is_literal(node: FunctionTreeNode) -> bool:
+  return isinstance(node, (bool, int, float, np.number, np.bool_))
+
+def _folded(func: t.Callable, args: t.List[FunctionTreeNode]) -> t.Optional[FunctionTreeNode]:
+  # value of a call on literals, if it is a scalar - as evaluation would make it
+  try:
+    with np.errstate(all = 'ignore'):
+      value = func(*args)
+  except Exception:
+    return None
+  return value if _is_literal(value) else None
+
+class Optimizer:
+  '''
+  Simplifies a function-call tree, as made by `FunctionCallTransformer`, before it is compiled - without changing its results, to the bit:
+  - `identity` and single-argument `SUM` calls are dropped, so e.g. `X` compiles to its argument as is
+  - sums, and chains of products, nested on the left are flattened, e.g. `(X*2)*3` -> `product_args(X, 2, 3)`
+  - calls of pure functions on literals are folded, e.g. `-40` -> `np.int64(-40)`, and so are the literals leading an n-ary call, as they are added or multiplied first
+  - equal subtrees of pure calls become the same node, which `Compiler` evaluates once - e.g. `X*0.1` in both branches of an `IF`
+
+  Operands are never reordered or regrouped otherwise, as floating point addition and multiplication are not associative.
+  '''
+  # subtrees by function and the identities of their (already interned) children
+  _interned: t.Dict[t.Tuple[t.Any, ...], FunctionTree]
+
+  def __init__(self):
+    self._interned = {}
+
+  def _key(self, node: FunctionTreeNode) -> t.Tuple[t.Any, ...]:
+    if isinstance(node, lark.Tree):
+      return ('tree', id(node))
+    elif isinstance(node, lark.Token):
+      return ('token', node.type, str(node))
+    return (type(node), node)
+
+  def _flattened(self, func: t.Callable, children: t.List[FunctionTreeNode]) -> t.Tuple[t.Callable, t.List[FunctionTreeNode]]:
+    if func is np.multiply and len(children) == 2:
+      func = product_args
+    if func in n_ary:
+      # only on the left - the chain is evaluated in the same order
+      while children and isinstance(children[0], lark.Tree) and children[0].data in (func, n_ary[func]):
+        children = [*children[0].children, *children[1:]]
+    return func, children
+
+  def optimize(self, node: FunctionTreeNode) -> FunctionTreeNode:
+    if not isinstance(node, lark.Tree) or not callable(node.data):
+      return node
+    func, children = self._flattened(node.data, [self.optimize(child) for child in node.children])
+    if func is identity or (func is sum_args and len(children) == 1):
+      return children[0]
+    pure = is_pure(func)
+    if pure and children and all(_is_literal(child) for child in children):
+      folded = _folded(func, children)
+      if folded is not None:
+        return folded
+    if pure and func in n_ary:
+      leading = 0
+      while leading < len(children) and _is_literal(children[leading]):
+        leading += 1
+      if leading > 1:
+        folded = _folded(func, children[:leading])
+        if folded is not None:
+          children = [folded, *children[leading:]]
+      if len(children) == 1:
+        return children[0]
+    if func is product_args and len(children) == 2:
+      func = np.multiply
+    tree = FunctionTree(func, children)
+    if not pure:
+      return tree
+    key = (func, *(self._key(child) for child in children))
+    return self._interned.setdefault(key, tree)
+
+def optimize(tree: FunctionTree) -> FunctionTreeNode:
+  return Optimizer().optimize(tree)
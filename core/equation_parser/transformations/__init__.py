@@ -1,5 +1,11 @@
 __all__ = [
+  'Affine',
+  'Cell',
+  'Compiler',
   'FunctionCallTransformer',
+  'Interval',
+  'Inverse',
+  'Optimizer',
   'Printer',
   'Replacer',
 ]
\ No newline at end of file
@@ -0,0 +1,492 @@
+import os
+import re
+import sys
+import subprocess
+import tempfile
+import timeit
+import tracemalloc
+import warnings
+import glob
+import typing as t
+from pathlib import Path
+import numpy as np
+import numpy.typing as npt
+from lxml import etree as xml
+import core.entity.Xdf as xdf
+from core import equation_parser as eq
+from core.entity import Cache, Function, Table
+from core.entity.Base import xpath_registry
+from core.entity.Math import equation_trees, SharedParser
+from core.equation_parser.transformations import Replacer, Evaluator, Compiler, Inverse
+
+class BenchTune(t.NamedTuple):
+  xdf: str
+  bin: str
+
+volvo_608 = BenchTune(
+  './cars/volvo-p80-m44-608/rev5b.xdf',
+  './cars/volvo-p80-m44-608/608_rev5b.bin'
+)
+
+corvette = BenchTune(
+  './cars/04-corvette/12587603 - 2004 1mb.xdf',
+  './cars/04-corvette/12587603-2004-Corvette-M6.bin'
+)
+
+silverado = BenchTune(
+  './cars/silverado-53-2002/2002 Definition.xdf',
+  './cars/silverado-53-2002/2002 Silverado 5.3 Truck MT 12212156.bin'
+)
+
+function_parameter = BenchTune(
+  './cars/testing/function-parameter/rev5b.xdf',
+  './cars/testing/function-parameter/608_rev5b.bin'
+)
+
+equation_parser = BenchTune(
+  './cars/testing/equation-parser/rev5b.xdf',
+  './cars/testing/equation-parser/608_rev5b.bin'
+)
+
+def per_call(func: t.Callable[[], t.Any], number: int) -> float:
+  '''
+  Best-of-5 mean time of `func`, in microseconds.
+  '''
+  return min(timeit.repeat(func, number = number, repeat = 5)) / number * 1e6
+
+def print_rows(header: t.Sequence[str], rows: t.Iterable[t.Sequence[t.Any]]):
+  print(('{:<56}' + '{:>12}' * (len(header) - 1)).format(*header))
+  for name, *cells in rows:
+    print(('{:<56}' + '{:>12.2f}' * len(cells)).format(name, *cells))
+
+def bench_xpath(tune: BenchTune, number: int = 2000):
+  '''
+  Per-access cost of every registered query, evaluated as an expression string (before) and precompiled (after), on the first element it matches.
+  '''
+  print(f"\nBENCH XPATH - {tune.xdf}")
+  definition = xdf.Xdf.from_path(tune.xdf, tune.bin)
+  elements = list(definition.iter())
+  rows = []
+  for expression, compiled in sorted(xpath_registry.items()):
+    # dynamic queries need a binding, skip them
+    if '$' in expression:
+      continue
+    context = next((el for el in elements if compiled(el)), None)
+    if context is None:
+      continue
+    before = per_call(lambda: context.xpath(expression), number)
+    after = per_call(lambda: compiled(context), number)
+    rows.append((expression[:56], before, after, before / after))
+  print_rows(('expression', 'string µs', 'compiled µs', 'speedup'), rows)
+  # ...and on the properties built over them
+  table = definition.Tables[0]
+  constant = definition.Constants[0]
+  print_rows(('property', 'µs'), [
+    (name, per_call(func, number)) for name, func in [
+      ('Table.z.unit', lambda: table.z.unit),
+      ('Table.x.unit', lambda: table.x.unit),
+      ('Table.z.digits', lambda: table.z.digits),
+      ('Table.z.output_type', lambda: table.z.output_type),
+      ('Table.z.min', lambda: table.z.min),
+      ('Table.z.EmbeddedData.shape', lambda: table.z.EmbeddedData.shape),
+      ('Constant.min', lambda: constant.min),
+      ('Constant.unit', lambda: constant.unit),
+    ]
+  ])
+
+def import_times(code: str, env: t.Mapping[str, str]) -> t.Dict[str, t.Tuple[int, int]]:
+  '''
+  `python -X importtime` of `code` in a fresh interpreter - module to (self, cumulative) microseconds.
+  '''
+  out = subprocess.run(
+    [sys.executable, '-X', 'importtime', '-c', code],
+    capture_output = True, text = True, env = {**os.environ, **env}, check = True
+  )
+  rows = re.findall(r'import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)', out.stderr)
+  return {name: (int(self), int(cumulative)) for self, cumulative, _, name in rows}
+
+def bench_import(repeat: int = 5):
+  '''
+  Import time of the package in fresh interpreters, and the cost of the unit/enum tables on first use - with the type table cache empty (cold) and filled (warm).
+  '''
+  print("\nBENCH IMPORT")
+  modules = ['core.entity.Xdf', 'core.entity.Base', 'core.equation_parser', 'pint', 'numpy', 'lxml.etree']
+  env = {'XDF_CACHE_DIR': tempfile.mkdtemp()}
+  runs = [import_times('import core.entity.Xdf', env) for _ in range(repeat)]
+  print_rows(('module', 'self ms', 'cumul. ms'), [
+    (module, min(run[module][0] for run in runs) / 1e3, min(run[module][1] for run in runs) / 1e3)
+    for module in modules
+  ])
+  first_use = '''
+import time, core.entity.Xdf
+from core.entity import Base as base
+start = time.perf_counter()
+base.Units[1], base.Measurements[1]
+print((time.perf_counter() - start) * 1e3)
+'''
+  def tables_ms(env):
+    out = subprocess.run([sys.executable, '-c', first_use], capture_output = True, text = True, env = {**os.environ, **env}, check = True)
+    return float(out.stdout)
+  cold = min(tables_ms({'XDF_CACHE_DIR': tempfile.mkdtemp()}) for _ in range(repeat))
+  warm = min(tables_ms(env) for _ in range(repeat))
+  print_rows(('unit/enum tables on first use', 'ms'), [('cold', cold), ('warm', warm)])
+
+def car_equations(cars: str = './cars') -> t.List[str]:
+  '''
+  Distinct `<MATH>` equations of every XML definition under `cars`.
+  '''
+  equations: t.Set[str] = set()
+  for path in glob.glob(os.path.join(cars, '**', '*.xdf'), recursive = True):
+    try:
+      tree = xml.parse(path)
+    # some definitions are in TunerPro's binary format
+    except xml.XMLSyntaxError:
+      continue
+    equations.update(tree.xpath('//MATH/@equation'))
+  return sorted(equations)
+
+def bench_equations(number: int = 200, size: int = 256):
+  '''
+  Per-call cost of every equation in `cars/` on a `size` array, replaced and evaluated over the tree (before) and compiled (after). Equations calling entity functions, like `CELL`, need an entity namespace and are counted but not timed.
+  '''
+  print("\nBENCH EQUATIONS")
+  x = np.linspace(0, 255, size)
+  rows = []
+  bound = 0
+  for equation in car_equations():
+    if equation_trees.shape(equation):
+      bound += 1
+      continue
+    tree = SharedParser.transform(eq.parse(equation))
+    # every name gets the data, as bound vars do
+    kwargs = {call[0]: x for call in tree.scan_values(lambda v: getattr(v, 'type', None) == 'NAME')}
+    walked = lambda: Evaluator.Evaluator().transform(Replacer.Replacer(kwargs).transform(tree))
+    compiled = Compiler.compile_tree(tree)
+    with np.errstate(all = 'ignore'):
+      assert np.array_equal(walked(), compiled(**kwargs), equal_nan = True), equation
+      rows.append((equation[:56], per_call(walked, number), per_call(lambda: compiled(**kwargs), number)))
+  before, after = sum(row[1] for row in rows), sum(row[2] for row in rows)
+  print_rows(('equation', 'tree µs', 'compiled µs'), rows)
+  print_rows(('all equations', 'tree µs', 'compiled µs', 'speedup'), [(f'{len(rows)} timed, {bound} bound', before, after, before / after)])
+
+def bench_inverse(number: int = 20, size: int = 256):
+  '''
+  Per-call cost of inverting every non-affine equation in `cars/` on a `size` array - numerically with `pynverse` (before) and in closed form (after) - then the equations left to numeric inversion, and why. Other variables are given 2.
+  '''
+  from pynverse import inversefunc
+  print("\nBENCH INVERSE")
+  x = np.linspace(1, 200, size)
+  rows = []
+  for equation in car_equations():
+    if equation_trees.affine(equation) is not None:
+      continue
+    # entity functions need an entity namespace - recorded, not timed
+    if equation_trees.shape(equation):
+      equation_trees.inverse(equation, 'X')
+      continue
+    forward = Compiler.compile_tree(SharedParser.transform(eq.parse(equation)))
+    names = forward.__code__.co_varnames[:forward.__code__.co_argcount]
+    variable = next((name for name in names if name in 'Xx'), None)
+    inverse = equation_trees.inverse(equation, variable) if variable else None
+    if inverse is None:
+      continue
+    kwargs = {name: 2.0 for name in names if name != variable}
+    with np.errstate(all = 'ignore'):
+      y = forward(**{variable: x}, **kwargs)
+      assert np.allclose(inverse(y, **kwargs), x), equation
+      numeric = inversefunc(lambda v: forward(**{variable: v}, **kwargs))
+      rows.append((equation[:56], per_call(lambda: numeric(y), 1), per_call(lambda: inverse(y, **kwargs), number)))
+  print_rows(('equation', 'pynverse µs', 'closed µs'), rows)
+  print(f"{len(equation_trees.numeric_inverses)} equations inverted numerically:")
+  for equation, reason in sorted(equation_trees.numeric_inverses.items()):
+    print(f"  {equation[:56]:<58}{reason}")
+
+def bench_bisection(dtype: str = '<u4', shape: t.Tuple[int, int] = (32, 32)):
+  '''
+  Cost of writing a `shape` table of `dtype` through every equation in `cars/` with no closed-form inverse - with `pynverse` (before) and bisecting the whole array (after) - and the number of evaluations of the compiled equation each takes. Other variables are given 2.
+  '''
+  from pynverse import inversefunc
+  print("\nBENCH BISECTION")
+  info = np.iinfo(dtype)
+  rows = []
+  exact = 0
+  for equation in car_equations():
+    if equation_trees.shape(equation) or equation_trees.affine(equation) is not None or equation_trees.inverse(equation, 'X') is not None:
+      continue
+    compiled = Compiler.compile_tree(SharedParser.transform(eq.parse(equation)))
+    names = compiled.__code__.co_varnames[:compiled.__code__.co_argcount]
+    if 'X' not in names:
+      continue
+    evaluations = 0
+    def forward(x):
+      nonlocal evaluations
+      evaluations += 1
+      return compiled(X = x, **{name: 2.0 for name in names if name != 'X'})
+    raw = np.random.default_rng(0).integers(0, 1000, shape).astype(np.float_)
+    with np.errstate(all = 'ignore'), warnings.catch_warnings():
+      warnings.simplefilter('ignore')
+      y = forward(raw)
+      solver = Inverse.BisectionInverse(forward, np.dtype(dtype), info.min, info.max)
+      evaluations = 0
+      start = timeit.default_timer()
+      solved = solver(y)
+      after, bisected = (timeit.default_timer() - start) * 1e6, evaluations
+      evaluations = 0
+      start = timeit.default_timer()
+      try:
+        # as `Math.inverse_conversion_func` did
+        inversefunc(forward)(y)
+        before = (timeit.default_timer() - start) * 1e6
+      except ValueError:
+        before = np.nan
+      pynversed = evaluations
+      exact += np.array_equal(forward(solved), y)
+    rows.append((equation[:56], before, after, pynversed, bisected))
+  # nan where `pynverse` raises
+  print_rows(('equation', 'before µs', 'after µs', 'before n', 'after n'), rows)
+  print(f"{exact} of {len(rows)} bisected to values converting exactly")
+
+def bench_arena(number: int = 50, shape: t.Tuple[int, int] = (256, 256)):
+  '''
+  Per-call cost of every equation in `cars/` with intermediate results, on a `shape` table - compiled (before) and with intermediate results in an `Arena` (after). Allocations are the arrays made per call, and peak the most traced by `tracemalloc` at once, in arrays of the table's size.
+  '''
+  print("\nBENCH ARENA")
+  x = np.random.default_rng(0).uniform(1, 255, shape)
+  rows = []
+  for equation in car_equations():
+    if equation_trees.shape(equation):
+      continue
+    tree = SharedParser.transform(eq.parse(equation))
+    compiled, arena = Compiler.compile_tree(tree), Compiler.compile_tree(tree, arena = True)
+    if arena.__allocations__ == compiled.__allocations__:
+      continue
+    names = compiled.__code__.co_varnames[:compiled.__code__.co_argcount]
+    kwargs = {name: x for name in names}
+    def peak(func: Compiler.CompiledEquation) -> float:
+      tracemalloc.start()
+      func(**kwargs)
+      peak = tracemalloc.get_traced_memory()[1]
+      tracemalloc.stop()
+      return peak / x.nbytes
+    with np.errstate(all = 'ignore'):
+      # first call allocates the arena
+      assert np.array_equal(compiled(**kwargs), arena(**kwargs), equal_nan = True), equation
+      rows.append((
+        equation[:56],
+        per_call(lambda: compiled(**kwargs), number), per_call(lambda: arena(**kwargs), number),
+        compiled.__allocations__, arena.__allocations__,
+        peak(compiled), peak(arena)
+      ))
+  print_rows(('equation', 'before µs', 'after µs', 'before n', 'after n', 'before peak', 'after peak'), rows)
+  before, after = sum(row[1] for row in rows), sum(row[2] for row in rows)
+  print_rows(('all equations', 'before µs', 'after µs', 'before n', 'after n'), [(f'{len(rows)} with temporaries', before, after, sum(row[3] for row in rows), sum(row[4] for row in rows))])
+
+def bench_load(*tunes: BenchTune, number: int = 15):
+  '''
+  Cold load of each definition - `Xdf.from_path` without a `DefinitionCache`, `Cache.compile_definition`, and its analysis of every `<MATH>`, see `Math.analyze`. Process-wide parse trees and analyses are cleared before each, and schema validation is skipped as if known valid.
+  '''
+  print("\nBENCH LOAD")
+  rows = []
+  for tune in tunes:
+    Cache.validated.add(Cache.digest(Path(tune.xdf).read_bytes()))
+    def cold(func: t.Callable[[], t.Any]) -> t.Callable[[], t.Any]:
+      def run():
+        eq.parse_trees.clear()
+        eq.analyses.clear()
+        equation_trees.clear()
+        func()
+      return run
+    definition = xdf.Xdf.from_path(tune.xdf, tune.bin)
+    path = definition.getroottree().getpath
+    rows.append((
+      Path(tune.xdf).name[:56],
+      per_call(cold(lambda: xdf.Xdf.from_path(tune.xdf, tune.bin)), number) / 1e3,
+      per_call(cold(lambda: Cache.compile_definition(definition, '')), number) / 1e3,
+      per_call(cold(lambda: [math.analyze(path) for math in definition.xpath('//MATH')]), number) / 1e3,
+    ))
+  print_rows(('definition', 'load ms', 'compile ms', 'analysis ms'), rows)
+
+def masked_convert(z: Table.ZAxis, x: npt.NDArray) -> npt.NDArray:
+  '''
+  `ZAxis.from_embedded` as before `ZAxis.owner_map` - every `Math` evaluated over the whole table, and put through its mask less the cells of those after it.
+  '''
+  accumulator = x.astype(np.float_)
+  Maths = z.owner_map.Maths
+  uncovered = np.ones(accumulator.shape, dtype = bool)
+  valid = []
+  for math in reversed(Maths):
+    valid.append(np.logical_and(np.logical_not(math.mask), uncovered))
+    uncovered = np.logical_and(uncovered, math.mask)
+  for math, where in zip(Maths, reversed(valid)):
+    np.putmask(accumulator, where, np.array(math.conversion_func(accumulator)))
+  return accumulator
+
+def bench_owner_map(tune: BenchTune, counts: t.Sequence[int] = (0, 16, 64, 256), number: int = 20):
+  '''
+  Conversion of the first 16x16 table, with `count` cell equations added at random - masked over the whole table per equation (before), and over the cells each owns by `ZAxis.owner_map` (after).
+  '''
+  print(f"\nBENCH OWNER MAP - {tune.xdf}")
+  rows = []
+  rng = np.random.default_rng(0)
+  for count in counts:
+    definition = xdf.Xdf.from_path(tune.xdf, tune.bin)
+    z = next(table.z for table in definition.Tables if table.z.EmbeddedData.shape == (16, 16))
+    for flat in rng.choice(256, count, replace = False):
+      math = xml.SubElement(z, 'MATH', row = str(flat // 16 + 1), col = str(flat % 16 + 1), equation = f'X*{flat % 7 + 1}-{flat}')
+      xml.SubElement(math, 'VAR', id = 'X')
+    raw = np.array(z.memory_map)
+    with warnings.catch_warnings():
+      warnings.simplefilter('ignore')
+      assert np.array_equal(masked_convert(z, raw), np.asarray(z.from_embedded(raw))), count
+      rows.append((
+        f'{count} cell equations',
+        per_call(lambda: masked_convert(z, raw), number) / 1e3,
+        per_call(lambda: z.from_embedded(raw), number) / 1e3,
+      ))
+  print_rows(('table', 'before ms', 'after ms'), rows)
+
+def bench_tables(*tunes: BenchTune, number: int = 20):
+  '''
+  Conversion of every table in each definition - through `ZAxis.table_convert` for all (before), and by the whole-table call of `ZAxis.global_only` for tables with only a global equation (after).
+  '''
+  print("\nBENCH TABLES")
+  rows = []
+  for tune in tunes:
+    Cache.validated.add(Cache.digest(Path(tune.xdf).read_bytes()))
+    definition = xdf.Xdf.from_path(tune.xdf, tune.bin)
+    tables = [(table.z, np.array(table.z.memory_map)) for table in definition.Tables]
+    def before():
+      for z, raw in tables:
+        z.table_convert(raw.copy().astype(np.float_))
+    def after():
+      for z, raw in tables:
+        z.from_embedded(raw)
+    with warnings.catch_warnings():
+      warnings.simplefilter('ignore')
+      for z, raw in tables:
+        assert np.array_equal(z.table_convert(raw.copy().astype(np.float_)), z.from_embedded(raw), equal_nan = True), z.getparent().title
+      rows.append((
+        f'{Path(tune.xdf).name[:40]} ({sum(z.global_only is not None for z, _ in tables)}/{len(tables)} global)',
+        per_call(before, number) / 1e3,
+        per_call(after, number) / 1e3,
+      ))
+  print_rows(('definition', 'before ms', 'after ms'), rows)
+
+def bench_cells(tune: BenchTune, number: int = 200):
+  '''
+  Conversion of a 16-cell embedded axis by equations with and without `CELL` - evaluated over a tree bound per conversion, with `CELL(i; FALSE)` through masked arrays (before), and by `Cell.CellForm`, compiled once per equation (after).
+  '''
+  print(f"\nBENCH CELLS - {tune.xdf}")
+  rows = []
+  for equation in ['X + 2', 'X + CELL(3; TRUE)', 'CELL(1; FALSE) + 2', 'CELL(1; FALSE) + CELL(3; TRUE)', 'INDEX() * 2 + CELL(1; FALSE)']:
+    definition = xdf.Xdf.from_path(tune.xdf, tune.bin, xdf.CellEquationCalculationError)
+    axis = definition.Tables[2].x
+    axis.Math.attrib['equation'] = equation
+    xml.SubElement(axis.Math, 'VAR', id = 'X')
+    raw = axis.memory_map.astype(np.float_)
+    before = lambda: xdf.Math.Math._evaluate(axis.Math, {'X': raw})
+    rows.append((
+      equation,
+      per_call(before, number),
+      per_call(lambda: axis.Math._evaluate({'X': raw}), number),
+    ))
+  print_rows(('equation', 'before µs', 'after µs'), rows)
+
+def looped_interpolated(values: npt.NDArray, indices: npt.NDArray) -> npt.NDArray:
+  '''
+  `Function.monotone_interpolated` as before it was vectorized - masked arrays, and a loop over every point and every gap.
+  '''
+  # masked where indices fall below the max so far
+  monotonic = np.ma.masked_array(indices, np.maximum.accumulate(indices) - indices > 0)
+  uninterpolated = np.stack((np.around(monotonic.compressed()), np.ma.masked_array(values, monotonic.mask).compressed()), axis = 1)
+  if monotonic[0] != 0:
+    first_zero = np.argwhere(indices == 0)[0]
+    uninterpolated = np.vstack((np.column_stack((0, values[first_zero])), uninterpolated))
+  pairs = np.lib.stride_tricks.sliding_window_view(uninterpolated[:, 0], 2)
+  gaps = np.hstack((pairs, np.diff(pairs)))
+  gaps = gaps[gaps[:, 2] > 1] + [1, 0, 0]
+  out = np.zeros(values.shape)
+  for index, value in uninterpolated:
+    out[int(index)] = value
+  clean_indices = np.around(indices).astype(np.int_)
+  for start, end, diff in gaps.astype(np.int_):
+    rising = np.flatnonzero(values == out[end])[0] - 1
+    length = abs(clean_indices[rising + 1] - clean_indices[rising])
+    out[start:end] = np.linspace(values[rising], out[end], length, endpoint = False)[-(diff - 1):]
+  return out
+
+def bench_interpolated(tune: BenchTune, number: int = 2000):
+  '''
+  Interpolation of the first `Function`, and the value of an axis linked to it - looped, and made on every access (before), and vectorized, and kept until the x or y memory changes (after).
+  '''
+  print(f"\nBENCH INTERPOLATED - {tune.xdf}")
+  definition = xdf.Xdf.from_path(tune.xdf, tune.bin)
+  function = definition.Functions[0]
+  axis = next(table.y for table in definition.Tables if table.y.linked is function)
+  values, indices = function.x.value.magnitude, function.y.value.magnitude
+  assert np.array_equal(looped_interpolated(values, indices), Function.monotone_interpolated(values, indices))
+  # ...and of the same function, repeated 16 times over 256 points
+  long_values = np.arange(1.0, 257.0) * 10
+  long_indices = np.concatenate([np.where(indices == 0, 0, indices + 16 * block) for block in range(16)])
+  assert np.array_equal(looped_interpolated(long_values, long_indices), Function.monotone_interpolated(long_values, long_indices))
+  rows = [
+    ('monotone_interpolated', per_call(lambda: looped_interpolated(values, indices), number), per_call(lambda: Function.monotone_interpolated(values, indices), number)),
+    ('monotone_interpolated, 256 points', per_call(lambda: looped_interpolated(long_values, long_indices), number // 10), per_call(lambda: Function.monotone_interpolated(long_values, long_indices), number // 10)),
+    ('linked axis value', per_call(lambda: looped_interpolated(function.x.value.magnitude, function.y.value.magnitude), number), per_call(lambda: axis.value, number)),
+  ]
+  print_rows(('function', 'before µs', 'after µs'), rows)
+
+def looped_lookup(x: npt.NDArray, y: npt.NDArray, z: npt.NDArray, at_x: npt.NDArray, at_y: npt.NDArray) -> npt.NDArray:
+  '''
+  Bilinear lookup a sample at a time, with `np.interp` along each axis - as done without `Table.lookup`.
+  '''
+  out = np.empty(len(at_x))
+  for i, (a, b) in enumerate(zip(at_x, at_y)):
+    column = np.array([np.interp(a, x, row) for row in z])
+    out[i] = np.interp(b, y, column)
+  return out
+
+def bench_lookup(tune: BenchTune, samples: int = 1000, number: int = 20):
+  '''
+  Lookups over the first 2D table with rising axes - a sample at a time (before), and vectorized over a grid kept until the binary is written to (after). Per sample, in nanoseconds.
+  '''
+  print(f"\nBENCH LOOKUP - {tune.xdf}")
+  definition = xdf.Xdf.from_path(tune.xdf, tune.bin)
+  table = next(
+    table for table in definition.Tables
+    if len(table.z.value.shape) == 2 and all(np.all(np.diff(axis.value.magnitude) > 0) for axis in (table.x, table.y))
+  )
+  x, y, z = (axis.value.magnitude for axis in (table.x, table.y, table.z))
+  rng = np.random.default_rng(0)
+  at_x, at_y = rng.uniform(x[0], x[-1], samples), rng.uniform(y[0], y[-1], samples)
+  assert np.allclose(looped_lookup(x, y, z, at_x, at_y), table.lookup(at_x, at_y).magnitude, rtol = 0, atol = 1e-9)
+  many_x, many_y = rng.uniform(x[0], x[-1], samples * 1000), rng.uniform(y[0], y[-1], samples * 1000)
+  looped = per_call(lambda: looped_lookup(x, y, z, at_x, at_y), 1) * 1e3 / samples
+  def cold():
+    # as after a write to the table
+    definition._context.writes += 1
+    return table.lookup(at_x, at_y)
+  rows = [
+    (f'bilinear, {samples} samples', looped, per_call(lambda: table.lookup(at_x, at_y), number) * 1e3 / samples),
+    (f'bilinear, {samples} samples, grid made again', looped, per_call(cold, number) * 1e3 / samples),
+    (f'nearest, {samples} samples', looped, per_call(lambda: table.lookup(at_x, at_y, method = 'nearest'), number) * 1e3 / samples),
+    (f'bilinear, {samples * 1000} samples', looped, per_call(lambda: table.lookup(many_x, many_y), 1) * 1e3 / (samples * 1000)),
+  ]
+  print(table.title)
+  print_rows(('lookup', 'before ns', 'after ns'), rows)
+
+if __name__ == '__main__':
+  # e.g. `python xdf_bench.py > bench_output.txt`
+  #bench_xpath(volvo_608)
+  #bench_import()
+  #bench_equations()
+  #bench_inverse()
+  #bench_bisection()
+  #bench_arena()
+  #bench_load(corvette, silverado)
+  #bench_owner_map(volvo_608)
+  #bench_tables(corvette, silverado)
+  #bench_cells(equation_parser)
+  #bench_interpolated(function_parameter)
+  bench_lookup(volvo_608)
+  pass
@@ -3,8 +3,12 @@ from pathlib import Path, PosixPath
 import re
 import typing as t
 import itertools as it
+import tempfile
 import core.entity.Xdf as xdf
+from core.entity.Cache import DefinitionCache
+from core.entity.Lookup import NotMonotonic
 import numpy as np
+from lxml import etree as xml
 
 class TuneFolder(t.NamedTuple):
   xdfs: t.List[Path]
@@ -84,6 +88,11 @@ def test_patch(folder: TuneFolder):
   # TODO: before and after
   reversible_patch.apply_all()
   reversible_patch.remove_all()
+  # ...entries map the binary again when moved
+  entry = reversible_patch.xpath('./XDFPATCHENTRY')[0]
+  offset = entry.memory_map.offset
+  entry.attrib['address'] = hex(entry.address + 2)
+  assert entry.memory_map.offset == offset + 2
   # ...this should break
   unreversible_patch.apply_all()
   try:
@@ -102,6 +111,21 @@ def test_function(folder: TuneFolder):
   function = func_test.Functions[0]
   normalized = ignition_map.y.value
   # TODO - verify this against printout
+  expected = [90, 10, 20, 30, 60, 70, 80, 118.75, 120, 130, 140, 157 + 1/3, 158, 158 + 2/3, 159 + 1/3, 160]
+  assert np.allclose(normalized.magnitude, expected, rtol = 0, atol = 1e-12)
+  # kept until the x or y memory changes
+  assert function.interpolated is function.interpolated
+  cached = function.interpolated
+  function.y.value = np.concatenate(([0], function.y.value[1:]))
+  assert function.interpolated is not cached and function.interpolated[0] == 10
+  function.y.memory_map[0] = 1
+  func_test.edited()
+  assert np.array_equal(function.interpolated, cached)
+  # ...or the equations of the axes
+  math = function.x.Math
+  math.attrib['equation'] = f"({math.attrib['equation']})*2"
+  func_test.edited()
+  assert np.allclose(function.interpolated, cached*2)
 
 def test_write_bounds(folder: TuneFolder):
   print("\nTEST WRITE BOUNDS")
@@ -118,7 +142,8 @@ def test_write_bounds(folder: TuneFolder):
   try:
     #zwb.value = 12.24 + 20
     ignition_map = tune.Tables[0]
-    ignition_map.value += 20
+    # past the top of X*.75-22.5 over uint8, 168.75 degrees
+    ignition_map.value *= 5
   except xdf.EmbeddedValueError as e:
     print_exception(e, folder)
 
@@ -142,6 +167,377 @@ def test_list_values(folder: TuneFolder):
       pass
       raise(e)
 
+def test_cache(folder: TuneFolder):
+  print("\nTEST DEFINITION CACHE")
+  test_xdf, test_bin = folder.xdfs[0], folder.bins[0]
+  cache = DefinitionCache(Path(tempfile.mkdtemp()))
+  # first open compiles and stores, second open loads the compiled definition
+  cold, warm = (
+    xdf.Xdf.from_path(test_xdf, test_bin, cache=cache) for _ in range(2)
+  )
+  for cold_table, warm_table in zip(cold.Tables, warm.Tables):
+    assert np.array_equal(cold_table.z.value.magnitude, warm_table.z.value.magnitude)
+  print(f"{len(warm.Tables)} tables match after warm reopen")
+
+def test_lazy(folder: TuneFolder):
+  print("\nTEST LAZY LOADING")
+  test_xdf, test_bin = folder.xdfs[0], folder.bins[0]
+  eager = xdf.Xdf.from_path(test_xdf, test_bin)
+  cache = DefinitionCache(Path(tempfile.mkdtemp()))
+  # load-time checks need every parameter - the first open materializes them all, and stores the compiled definition...
+  cold = xdf.Xdf.from_path(test_xdf, test_bin, cache=cache, lazy=True)
+  assert cold._context.compiled is not None and cold._context.lazy.pending == 0
+  # ...so later opens check without materializing any, as do those opting out of the checks
+  for lazy in (xdf.Xdf.from_path(test_xdf, test_bin, cache=cache, lazy=True), xdf.Xdf.from_path(test_xdf, test_bin, lazy=True, check=False)):
+    assert lazy._context.lazy.pending == len(lazy.index)
+  # pick a table from the index without touching the others
+  entry = next(filter(lambda e: e.tag == 'XDFTABLE', lazy.index))
+  table = lazy.parameter(entry.uniqueid)
+  assert np.array_equal(table.value.magnitude, eager.parameter(entry.uniqueid).value.magnitude)
+  print(f"'{entry.title}' materialized, {lazy._context.lazy.pending} of {len(lazy.index)} parameters pending")
+
+def test_index(folder: TuneFolder):
+  print("\nTEST UNIQUEID INDEX")
+  test_xdf, test_bin = folder.xdfs[0], folder.bins[0]
+  tune = xdf.Xdf.from_path(test_xdf, test_bin)
+  first, second = tune.Tables[0], tune.Tables[1]
+  assert tune.parameter(first.id) is first
+  # index follows edits to the definition
+  second.set('uniqueid', '0xBEEF')
+  assert tune.parameter('0xBEEF') is second
+  layout, math = second.z.EmbeddedData.layout, second.z.Math[0]
+  tune.remove(first)
+  assert first.id not in tune.parameters_by_id
+  # compiled layouts and analyses follow the elements, not their old paths
+  assert tune._layout(second.z.EmbeddedData) == layout
+  assert math.analysis == math.analyze(math.getroottree().getpath)
+  print(f"{len(tune.parameters_by_id)} parameters indexed after edits")
+
+def test_side_table(folder: TuneFolder):
+  print("\nTEST SIDE TABLE")
+  test_xdf, test_bin = folder.xdfs[0], folder.bins[0]
+  tune = xdf.Xdf.from_path(test_xdf, test_bin)
+  # proxies are dropped between passes, cached memory maps must not be
+  for _ in range(2):
+    for table in tune.Tables:
+      table.value
+  stats = tune.cache_stats['Embedded.memory_map']
+  assert stats.hits >= stats.misses
+  print(f"memory maps: {stats.misses} built, {stats.hits} reused")
+
+def test_validation(folder: TuneFolder):
+  print("\nTEST DEFERRED VALIDATION")
+  test_xdf, test_bin = folder.xdfs[0], folder.bins[0]
+  directory = Path(tempfile.mkdtemp())
+  cache = DefinitionCache(directory / 'cache')
+  status = xdf.Validation.ValidationStatus
+  source = test_xdf.read_bytes()
+  # content not seen before in this process, so it is validated rather than known valid
+  unique = directory / 'unique.xdf'
+  unique.write_bytes(source + f'<!-- {directory} -->'.encode())
+  # usable straight away, validated in the background
+  deferred = xdf.Xdf.from_path(unique, test_bin, cache=cache, defer_validation=True)
+  assert deferred.validation.status is status.PENDING
+  deferred.Tables[0].value
+  deferred.validation.result()
+  assert deferred.validation.status is status.VALID and not deferred.validation.cached
+  # ...after which the content hash is known valid
+  reopened = xdf.Xdf.from_path(unique, test_bin, cache=cache)
+  assert reopened.validation.cached
+  print(f"{deferred.validation}, then {reopened.validation}")
+  # an invalid definition is reported, rather than raised - here, a <MATH> missing its required equation
+  invalid = directory / 'invalid.xdf'
+  invalid.write_bytes(re.sub(rb'(<MATH[^>]*?) equation="[^"]*"', rb'\1', source, count = 1))
+  broken = xdf.Xdf.from_path(invalid, test_bin, defer_validation=True)
+  assert broken.validation.wait() is status.INVALID and broken.validation.error is not None
+  try:
+    broken.validation.result()
+    assert False, 'invalid definition validated'
+  except xml.DocumentInvalid as e:
+    print_exception(e, folder)
+
+def test_equation_trees(folder: TuneFolder):
+  print("\nTEST EQUATION TREES")
+  test_xdf, test_bin = folder.xdfs[0], folder.bins[0]
+  tune = xdf.Xdf.from_path(test_xdf, test_bin)
+  before = tune.cache_stats['Math.equation']
+  for math in tune.xpath('//MATH'):
+    math.equation
+  stats = tune.cache_stats['Math.equation']
+  # duplicate equations are transformed once
+  assert stats.hits - before.hits > 0
+  print(f"equation trees: {stats.size} interned, {stats.hits} hits, {stats.misses} misses")
+  # converters are built again once their equation is edited
+  constant = tune.Constants[0]
+  equation, before = constant.Math.attrib['equation'], constant.value
+  constant.Math.attrib['equation'] = f'({equation})*2'
+  assert np.allclose(constant.value.magnitude, 2*before.magnitude)
+  constant.Math.attrib['equation'] = equation
+  assert np.array_equal(constant.value.magnitude, before.magnitude)
+
+def test_optimizer(folder: TuneFolder):
+  print("\nTEST OPTIMIZER")
+  from core.equation_parser.transformations import Compiler, Optimizer
+  from core.entity.Math import equation_trees
+  test_xdf, test_bin = folder.xdfs[0], folder.bins[0]
+  tune = xdf.Xdf.from_path(test_xdf, test_bin)
+  x = np.linspace(-255, 255, 511)
+  # entity functions like `CELL` need their entity's data - see `EquationTrees.shape`
+  equations = {math.attrib['equation']: math for math in tune.xpath('//MATH') if not equation_trees.shape(math.attrib['equation'])}
+  for equation, math in equations.items():
+    tree = math.equation
+    compiled, optimized = Compiler.compile_tree(tree), Compiler.compile_tree(Optimizer.optimize(tree))
+    names = compiled.__code__.co_varnames[:compiled.__code__.co_argcount]
+    kwargs = {name: x for name in names}
+    # same results, to the bit
+    with np.errstate(all = 'ignore'):
+      assert np.array_equal(compiled(**kwargs), optimized(**kwargs), equal_nan = True), equation
+    assert optimized.__allocations__ <= compiled.__allocations__
+  # identity math returns its data as is
+  assert Compiler.compile_tree(Optimizer.optimize(tune.xpath('//MATH[@equation="X"]')[0].equation))(X = x) is x
+  print(f"{len(equations)} equations optimized")
+  # arena buffers are per thread, so concurrent evaluations keep their own results
+  import threading
+  from core.entity.Math import equation_trees, SharedParser
+  equation = 'X*0.5 + X*X - 40'
+  arena, compiled = equation_trees.compiled(equation, lambda: SharedParser), Compiler.compile_tree(equation_trees.get(equation, lambda: SharedParser))
+  mismatches = []
+  def evaluate(seed: int):
+    rng = np.random.default_rng(seed)
+    for _ in range(300):
+      x = rng.uniform(-100, 100, (64, 64))
+      if not np.array_equal(arena(X = x), compiled(X = x)):
+        mismatches.append(seed)
+  threads = [threading.Thread(target = evaluate, args = (seed,)) for seed in range(4)]
+  for thread in threads:
+    thread.start()
+  for thread in threads:
+    thread.join()
+  assert not mismatches
+
+def test_batch_values(folder: TuneFolder):
+  print("\nTEST BATCH VALUES")
+  test_xdf, test_bin = folder.xdfs[0], folder.bins[0]
+  tune = xdf.Xdf.from_path(test_xdf, test_bin)
+  constants = tune.Constants
+  # affine constants are converted together, and must match one by one conversion
+  for constant, value in zip(constants, tune.values()):
+    assert np.array_equal(constant.value.magnitude, value, equal_nan=True)
+  affine = sum(constant.Math.affine is not None for constant in constants)
+  print(f"{len(constants)} constants, {affine} affine")
+  # ...and affine forms must match evaluating their tree, to the bit
+  from core.equation_parser.transformations import Compiler
+  x = np.concatenate([np.arange(-70000, 70000, dtype = np.float_), [-0.0]])
+  for math in tune.xpath('//MATH'):
+    form = math.affine
+    if form is not None:
+      evaluated = Compiler.compile_tree(math.equation)(**{form.variable: x})
+      assert np.array_equal(form(x), evaluated) and np.array_equal(np.signbit(form(x)), np.signbit(evaluated)), math.attrib['equation']
+
+def test_domain_inverse(folder: TuneFolder):
+  print("\nTEST DOMAIN INVERSE")
+  test_xdf, test_bin = folder.xdfs[0], folder.bins[0]
+  tune = xdf.Xdf.from_path(test_xdf, test_bin)
+  tables = [table for table in tune.Tables if table.z.global_Math.domain_inverse is not None]
+  # values invert back to the binary as it is
+  for table in tables:
+    assert np.array_equal(table.z.to_embedded(table.value.magnitude), table.z.memory_map)
+  print(f"{len(tables)} of {len(tune.Tables)} tables invert exactly")
+  # ...and follow edits to the equation, and the values of its linked Vars
+  table, constant = tables[0], tune.Constants[0]
+  math = table.z.global_Math
+  math.attrib['equation'] = 'X+A'
+  xml.SubElement(math, 'VAR', id = 'A', type = 'link', linkid = constant.id)
+  tune.edited()
+  for _ in range(2):
+    values = np.asarray(math.conversion_func(table.z.memory_map))
+    assert np.array_equal(table.z.to_embedded(values), table.z.memory_map)
+    constant.Math.attrib['equation'] = f"({constant.Math.attrib['equation']})*2"
+
+def test_bisection_inverse(folder: TuneFolder):
+  print("\nTEST BISECTION INVERSE")
+  test_xdf, test_bin = folder.xdfs[0], folder.bins[0]
+  tune = xdf.Xdf.from_path(test_xdf, test_bin)
+  solvers = [(table, table.z.global_Math.bisection_inverse) for table in tune.Tables]
+  solvers = [(table, solver) for table, solver in solvers if solver is not None]
+  # the solver alone inverts values back to the binary, in one bisection per table
+  for table, solver in solvers:
+    evaluations = 0
+    def forward(x, forward = solver.forward):
+      nonlocal evaluations
+      evaluations += 1
+      return forward(x)
+    raw = solver._replace(forward = forward)(table.value.magnitude)
+    assert np.array_equal(raw, table.z.memory_map)
+    assert evaluations <= 2 + 8 * solver.dtype.itemsize
+  print(f"{len(solvers)} of {len(tune.Tables)} tables solved exactly")
+
+def test_logical_bounds(folder: TuneFolder):
+  print("\nTEST LOGICAL BOUNDS")
+  test_xdf, test_bin = folder.xdfs[0], folder.bins[0]
+  tune = xdf.Xdf.from_path(test_xdf, test_bin)
+  embeddeds = [*tune.Constants, *(table.z for table in tune.Tables)]
+  # values in the binary are in range of their conversions
+  for embedded in embeddeds:
+    min, max = embedded.logical_bounds
+    value = np.asarray(getattr(embedded.value, 'magnitude', embedded.value))
+    assert not xdf.EmbeddedData.Embedded.out_of_bounds(value, min, max), embedded.title
+  scalar = sum(np.ndim(embedded.logical_bounds[0]) == 0 for embedded in embeddeds)
+  print(f"{len(embeddeds)} values in bounds, {scalar} by a single equation")
+  # bounds follow edits to the equation
+  constant, z = tune.Constants[0], tune.Tables[0].z
+  for embedded, math in ((constant, constant.Math), (z, z.Math[0])):
+    low, high = embedded.logical_bounds
+    math.attrib['equation'] = f"({math.attrib['equation']})*2"
+    assert np.array_equal(embedded.logical_bounds, (2*low, 2*high))
+
+def test_analysis(folder: TuneFolder):
+  print("\nTEST ANALYSIS")
+  test_xdf, test_bin = folder.xdfs[0], folder.bins[0]
+  # checked at open, lazily loaded or not - more than one CELL(i; FALSE) crashes TunerPro
+  for lazy in (False, True):
+    try:
+      xdf.Xdf.from_path(test_xdf, test_bin, xdf.Math.MathInterdependence, lazy=lazy)
+      assert False, 'more than one CELL(i; FALSE) opened'
+    except xdf.CellEquationCalculationError:
+      pass
+  tune = xdf.Xdf.from_path(test_xdf, test_bin, xdf.CellEquationCalculationError, xdf.Math.MathInterdependence)
+  maths = tune._context.compiled.maths
+  graph = xdf.Math.Math.dependency_graph(tune)
+  path = tune.getroottree().getpath
+  for math in tune.xpath('//MATH'):
+    analysis = math.analysis
+    assert analysis is maths[path(math)]
+    # the same variables, functions and links as the transformed equation
+    names = math.equation.scan_values(lambda v: isinstance(v, xdf.Axis.lark.Token) and v.type == 'NAME')
+    assert analysis.equation.variables == {name[0] for name in names}, math.attrib['equation']
+    assert analysis.equation.calls >= xdf.Math.equation_trees.shape(math.attrib['equation'])
+    assert list(analysis.dependencies) == [path(linked) for linked in graph.get(math, [])]
+  uncalculated = sum(analysis.equation.uncalculated_cells > 1 for analysis in maths.values())
+  print(f"{len(maths)} equations analyzed, {len(tune._context.compiled.math_graph)} with links, {uncalculated} with more than one CELL(i; FALSE)")
+
+def test_owner_map(folder: TuneFolder):
+  print("\nTEST OWNER MAP")
+  test_xdf, test_bin = folder.xdfs[0], folder.bins[0]
+  tune = xdf.Xdf.from_path(test_xdf, test_bin, xdf.CellEquationCalculationError)
+  for table in tune.Tables:
+    owner_map = table.z.owner_map
+    # each cell is converted by the highest precedence equation defined over it
+    expected = np.full(table.z.EmbeddedData.shape, -1)
+    for rank in [xdf.Table.GlobalMath, xdf.Table.ColumnMath, xdf.Table.RowMath, xdf.Table.CellMath]:
+      for index, math in enumerate(owner_map.Maths):
+        if type(math) is rank:
+          expected[np.logical_not(math.mask)] = index
+    assert np.array_equal(owner_map.owner, expected), table.title
+    assert sum(map(len, owner_map.cells)) == owner_map.owner.size
+  grids = [table for table in tune.Tables if len(table.z.owner_map.Maths) > 1]
+  print(f"{len(tune.Tables)} tables, {len(grids)} with an equation grid: {', '.join(table.title for table in grids)}")
+  for table in grids:
+    print(table.z.owner_map.owner)
+  # a cell under both a row and a cell equation is converted once, from raw, by the cell equation
+  table = next(table for table in tune.Tables if len(table.z.Math) == 1 and min(table.z.EmbeddedData.shape) > 1)
+  raw = np.array(table.z.memory_map, dtype = np.float_)
+  for attributes in ({'row': '1', 'equation': 'X*2'}, {'row': '1', 'col': '1', 'equation': 'X+1'}):
+    xml.SubElement(xml.SubElement(table.z, 'MATH', **attributes), 'VAR', id = 'X')
+  tune.edited()
+  value = table.z.value.magnitude
+  assert value[0, 0] == raw[0, 0] + 1 and np.array_equal(value[0, 1:], raw[0, 1:]*2)
+
+def test_global_only(folder: TuneFolder):
+  print("\nTEST GLOBAL ONLY")
+  test_xdf, test_bin = folder.xdfs[0], folder.bins[0]
+  tune = xdf.Xdf.from_path(test_xdf, test_bin, xdf.CellEquationCalculationError)
+  # tables with only a global equation skip `table_convert`, and must match it
+  for table in tune.Tables:
+    raw = np.array(table.z.memory_map)
+    assert np.array_equal(table.z.from_embedded(raw), table.z.table_convert(raw.astype(np.float_)), equal_nan=True), table.title
+  # ...and join the affine batch
+  for table, value in zip(tune.Tables, tune.values(table.z for table in tune.Tables)):
+    assert np.array_equal(table.z.value.magnitude, value, equal_nan=True), table.title
+  global_only = [table for table in tune.Tables if table.z.global_only is not None]
+  print(f"{len(tune.Tables)} tables, {len(global_only)} with only a global equation")
+  # ...resolved again when the axis is edited, see `Xdf.edited`
+  table = global_only[0]
+  raw, before = np.array(table.z.memory_map, dtype = np.float_), table.z.value.magnitude
+  math = table.z.global_Math
+  math.attrib['equation'] = f"({math.attrib['equation']})*2"
+  assert np.allclose(table.z.value.magnitude, before*2)
+  xml.SubElement(xml.SubElement(table.z, 'MATH', row = '1', equation = 'X+1'), 'VAR', id = 'X')
+  tune.edited()
+  assert table.z.global_only is None and np.array_equal(table.z.value.magnitude[0], raw[0] + 1)
+
+def test_cell_form(folder: TuneFolder):
+  print("\nTEST CELL FORM")
+  test_xdf, test_bin = folder.xdfs[0], folder.bins[0]
+  tune = xdf.Xdf.from_path(test_xdf, test_bin, xdf.CellEquationCalculationError)
+  tlw = tune.Tables[2]
+  raw = np.array(tlw.x.memory_map, dtype=np.float_)
+  # CELL(1; FALSE) + 2 - cell 1 is 0 + 2, and the rest 2 + 2
+  expected = np.full(raw.shape, 4.0)
+  expected[1] = 2
+  assert np.array_equal(tlw.x.value.magnitude, expected)
+  # CELL(1; FALSE) + CELL(3; TRUE) - cell 1 is 0 + raw[3], and the rest twice that
+  expected = np.full(raw.shape, 2 * tlw.y.memory_map[3])
+  expected[1] = tlw.y.memory_map[3]
+  assert np.array_equal(tlw.y.value.magnitude, expected)
+  # ...compiled once per equation, with bound and entity values as arguments
+  math = tlw.x.Math
+  math.append(math.makeelement('VAR', id = 'X'))
+  tune.edited()
+  for equation, expected in [
+    ('X * CELL(2; FALSE) - 1', np.where(np.arange(len(raw)) == 2, -1, -raw - 1)),
+    ('CELL(0; TRUE) + INDEX() + INDEXES()', raw[0] + np.arange(len(raw)) + len(raw)),
+  ]:
+    math.attrib['equation'] = equation
+    assert np.array_equal(tlw.x.value.magnitude, expected), equation
+  print(f"{len(xdf.Math.equation_trees._cell_forms)} axis equations compiled with CELL")
+
+def test_lookup(folder: TuneFolder):
+  print("\nTEST LOOKUP")
+  test_xdf, test_bin = folder.xdfs[0], folder.bins[0]
+  tune = xdf.Xdf.from_path(test_xdf, test_bin)
+  ignition_map = tune.Tables[0]
+  x, y, z = (axis.value.magnitude for axis in (ignition_map.x, ignition_map.y, ignition_map.z))
+  # breakpoints give the table back, by either method
+  xs, ys = np.meshgrid(x, y)
+  for method in ('bilinear', 'nearest'):
+    assert np.array_equal(ignition_map.lookup(xs, ys, method = method).magnitude, z), method
+  # ...between them, linear along each axis
+  rng = np.random.default_rng(0)
+  at_x, at_y = rng.uniform(x[0], x[-1], 1000), rng.uniform(y[0], y[-1], 1000)
+  along_x = np.array([np.interp(at_x, x, row) for row in z])
+  expected = np.array([np.interp(at_y[i], y, along_x[:, i]) for i in range(len(at_x))])
+  assert np.allclose(ignition_map.lookup(at_x, at_y).magnitude, expected, rtol = 0, atol = 1e-9)
+  # ...clamped at the edges, and halfway rounds up for `nearest`
+  assert ignition_map.lookup(-1e9, 1e9).magnitude == z[-1, 0]
+  assert ignition_map.lookup((x[0] + x[1]) / 2, y[0], method = 'nearest').magnitude == z[0, 1]
+  # ...in the units of the axes, for quantities
+  assert ignition_map.lookup(ignition_map.x.value[2], y[3]).magnitude == z[3, 2]
+  # grids are kept until the binary is written to
+  grid = ignition_map.grid
+  assert ignition_map.grid is grid
+  ignition_map.value = ignition_map.value
+  assert ignition_map.grid is not grid
+  # ...or the table is edited
+  grid, math = ignition_map.grid, ignition_map.z.global_Math
+  math.attrib['equation'] = f"({math.attrib['equation']})*2"
+  tune.edited()
+  assert ignition_map.grid is not grid and np.allclose(ignition_map.lookup(x[2], y[3]).magnitude, 2*z[3, 2])
+  # 1D tables are looked up along y
+  wot = tune.Tables[6]
+  assert np.allclose(wot.lookup(0, at_y * 1000).magnitude, np.interp(at_y * 1000, wot.y.value.magnitude, wot.z.value.magnitude))
+  # axes that fall as well as rise have no lookup, e.g. [0, 2, 0, ...]
+  try:
+    tune.Tables[4].grid
+    assert False, 'Major RPM axis is not monotonic'
+  except NotMonotonic:
+    pass
+  # functions, by x
+  function = tune.Functions[0]
+  fx, fy = function.x.value.magnitude, function.y.value.magnitude
+  at = rng.uniform(fx[0] - 10, fx[-1] + 10, 1000)
+  assert np.allclose(function.lookup(at).magnitude, np.interp(at, fx, fy))
+
 def test_cyclicality():
   # EXCEPTION SANITY TESTS
   folder_to_exception = {
@@ -207,5 +603,21 @@ if __name__ == '__main__':
   #test_function(car_to_path['function-parameter'])
   #test_patch(car_to_path['patch-parameter'])
   #test_flag(car_to_path['flag-parameter'])
+  #test_cache(car_to_path['bounds-checking'])
+  #test_lazy(car_to_path['bounds-checking'])
+  #test_index(car_to_path['bounds-checking'])
+  #test_side_table(car_to_path['bounds-checking'])
+  #test_validation(car_to_path['bounds-checking'])
+  #test_equation_trees(car_to_path['bounds-checking'])
+  #test_optimizer(car_to_path['bounds-checking'])
+  #test_batch_values(car_to_path['bounds-checking'])
+  #test_domain_inverse(car_to_path['bounds-checking'])
+  #test_bisection_inverse(car_to_path['bounds-checking'])
+  #test_logical_bounds(car_to_path['bounds-checking'])
+  #test_analysis(car_to_path['equation-parser'])
+  #test_owner_map(car_to_path['equation-parser'])
+  #test_global_only(car_to_path['equation-parser'])
+  #test_cell_form(car_to_path['equation-parser'])
+  #test_lookup(car_to_path['bounds-checking'])
   test_equation_parser(car_to_path['equation-parser'])
   pass
\ No newline at end of file